@@ -0,0 +1,141 @@
+"""
+Persistent alert deduplication
+Remembers when each (symbol, level type, condition) alert was last sent so
+it is not repeated within its cooldown, also across restarts. Entries live
+in memory for O(1) lookups and expire with their cooldown, so memory only
+holds alerts sent within the longest cooldown; every change is written to
+a SQLite database in WAL mode, which survives a crash mid-write. The
+database is opened on first use, so monitors that never alert (shard
+workers) never touch it.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# An alert kind is stored as its index in this list instead of two strings
+ALERT_KINDS = [(level_type, condition) for level_type in ('support', 'resistance')
+               for condition in ('OVERSOLD', 'OVERBOUGHT')]
+_KIND_INDEX = {kind: index for index, kind in enumerate(ALERT_KINDS)}
+
+
+def parse_cooldowns(text):
+    """
+    Cooldown overrides from 'KEY=SECONDS,...', where a key is a condition
+    (OVERSOLD), a level type (resistance) or both (resistance_OVERSOLD)
+    """
+    cooldowns = {}
+    for item in (text or '').split(','):
+        if '=' in item:
+            key, seconds = item.split('=', 1)
+            cooldowns[key.strip()] = float(seconds)
+    return cooldowns
+
+
+class AlertStore:
+    def __init__(self, path=None, cooldown=3600, cooldowns=None):
+        """
+        path: SQLite file, None keeps the history in memory only
+        cooldown: seconds before the same alert can be sent again
+        cooldowns: overrides per alert kind, see parse_cooldowns
+        """
+        overrides = cooldowns or {}
+        self.cooldowns = [overrides.get(f"{level_type}_{condition}",
+                                        overrides.get(condition, overrides.get(level_type, cooldown)))
+                          for level_type, condition in ALERT_KINDS]
+        self.lock = threading.Lock()
+        
+        # (symbol, kind) -> expiry time, plus (expiry, key) queues in expiry order
+        # (one per kind, each kind has a fixed cooldown) for eviction
+        self.expires = {}
+        self.queues = [deque() for _ in ALERT_KINDS]
+        
+        self.path = path
+        self.db = None
+    
+    def _open(self):
+        """Open (or create) the database once and load the alerts still in cooldown"""
+        path, self.path = self.path, None
+        if not path:
+            return
+        try:
+            db = sqlite3.connect(path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("CREATE TABLE IF NOT EXISTS alerts (symbol TEXT NOT NULL, kind INTEGER NOT NULL, "
+                       "sent_at REAL NOT NULL, PRIMARY KEY (symbol, kind)) WITHOUT ROWID")
+            rows = db.execute("SELECT symbol, kind, sent_at FROM alerts ORDER BY sent_at").fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Error opening alert store {path}, duplicates are tracked in memory only: {e}")
+            return
+        
+        self.db = db
+        # Cooldowns may have changed since the alerts were sent, expiry uses the current ones
+        for symbol, kind, sent_at in rows:
+            if 0 <= kind < len(ALERT_KINDS):
+                self._remember((symbol, kind), sent_at + self.cooldowns[kind])
+        self._evict(time.time())
+        logger.info(f"Loaded {len(self.expires)} recent alerts")
+    
+    def close(self):
+        with self.lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+    
+    def __len__(self):
+        """Alerts still in cooldown"""
+        with self.lock:
+            self._open()
+            self._evict(time.time())
+            return len(self.expires)
+    
+    def _remember(self, key, expires):
+        self.expires[key] = expires
+        self.queues[key[1]].append((expires, key))
+    
+    def _evict(self, now):
+        """Drop expired alerts from memory and disk, O(1) per evicted entry"""
+        expired = []
+        for queue in self.queues:
+            while queue and queue[0][0] <= now:
+                expires, key = queue.popleft()
+                # A resent alert has a newer entry further back in the queue
+                if self.expires.get(key) == expires:
+                    del self.expires[key]
+                    expired.append(key)
+        
+        if expired and self.db is not None:
+            try:
+                self.db.executemany("DELETE FROM alerts WHERE symbol = ? AND kind = ?", expired)
+                self.db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error evicting alerts: {e}")
+    
+    def claim(self, symbol, level_type, condition, now=None):
+        """
+        True if this alert may be sent, and record it as sent; False if the
+        same alert was sent within its cooldown
+        """
+        now = time.time() if now is None else now
+        kind = _KIND_INDEX[(level_type, condition)]
+        key = (symbol, kind)
+        
+        with self.lock:
+            self._open()
+            self._evict(now)
+            if key in self.expires:
+                return False
+            
+            self._remember(key, now + self.cooldowns[kind])
+            if self.db is not None:
+                try:
+                    self.db.execute("INSERT OR REPLACE INTO alerts (symbol, kind, sent_at) VALUES (?, ?, ?)",
+                                    (symbol, kind, now))
+                    self.db.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Error saving alert {symbol}: {e}")
+            return True
@@ -0,0 +1,424 @@
+"""
+Offline replay of the alert logic over stored candles
+Replays what check_symbol decides after every 4h candle: RSI(4H), the
+provisional RSI(1D) at the 4h close and the weekly/monthly support and
+resistance levels, then the same RSI/level conditions and per-symbol
+duplicate suppression as evaluate_alerts/dispatch_alerts. Indicators are
+computed once per symbol for the whole history (RSI over the trailing
+100-bar window of every bar, pivots once per day), so replaying another parameter set only re-runs the comparisons,
+and ReplayEngine.sweep() scores a whole grid of settings in one pass.
+
+Usage: python backtest.py [SYMBOL ...]   (default: every stored symbol)
+"""
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from candle_cache import timeframe_ms
+from candle_store import CandleStore, file_name
+from indicators import cluster_levels, pivot_levels, rsi_peek_series, rsi_series
+from markets_cache import cached_markets
+from resample import bucket_starts
+
+logger = logging.getLogger(__name__)
+
+DAY_MS = 86400 * 1000
+
+# Same shape as the live monitor: levels from the last 100 weekly/monthly
+# candles, none until 15 of them exist
+LEVEL_TIMEFRAMES = ('1w', '1M')
+LEVEL_BARS = 100
+LEVEL_MIN_BARS = 15
+
+
+def pivot_snapshots(daily, timeframe, window=5):
+    """
+    Pivots of the `timeframe` candles resampled from the completed daily
+    candles before each day, the last one partial like the forming candle.
+    Returns (snapshot id per day, [(prices, is_resistance)]) where
+    consecutive days with the same pivots share a snapshot.
+    """
+    count = len(daily)
+    ids = np.zeros(count + 1, dtype=np.intp)
+    empty = (np.empty(0), np.empty(0, dtype=bool))
+    snapshots = [empty]
+    if count == 0:
+        return ids, snapshots
+    
+    buckets = bucket_starts(daily['timestamp'], timeframe)
+    new_bucket = np.r_[True, buckets[1:] != buckets[:-1]]
+    bucket_of_day = np.cumsum(new_bucket) - 1
+    # resample_candles drops a leading bucket the data only partly covers
+    dropped = int(daily['timestamp'][0] != buckets[0])
+    
+    starts = np.flatnonzero(new_bucket)
+    highs = np.maximum.reduceat(daily['high'], starts)
+    lows = np.minimum.reduceat(daily['low'], starts)
+    
+    running_high = running_low = None
+    for day in range(count):
+        # Candles known after `day` closed: complete buckets, then the partial current one
+        bucket = bucket_of_day[day]
+        if new_bucket[day]:
+            running_high, running_low = daily['high'][day], daily['low'][day]
+        else:
+            running_high = max(running_high, daily['high'][day])
+            running_low = min(running_low, daily['low'][day])
+        
+        first = max(dropped, bucket + 1 - LEVEL_BARS)
+        if bucket + 1 - first < LEVEL_MIN_BARS:
+            ids[day + 1] = 0
+            continue
+        
+        prices, is_resistance = pivot_levels(np.r_[highs[first:bucket], running_high],
+                                             np.r_[lows[first:bucket], running_low], window)
+        
+        last_prices, last_is_resistance = snapshots[ids[day]]
+        if ids[day] and np.array_equal(prices, last_prices) and np.array_equal(is_resistance, last_is_resistance):
+            ids[day + 1] = ids[day]
+        else:
+            snapshots.append((prices, is_resistance))
+            ids[day + 1] = len(snapshots) - 1
+    
+    return ids, snapshots
+
+
+class SymbolHistory:
+    """
+    Threshold-independent replay inputs of one symbol, one entry per 4h bar:
+    close price, RSI(4H), provisional RSI(1D), forward return and the pivot
+    snapshot of each level timeframe
+    """
+    
+    def __init__(self, symbol, candles_4h, candles_1d, horizon=6, period=6, window=5):
+        self.symbol = symbol
+        self.horizon = horizon
+        
+        # Bars need at least one completed day before them
+        day_open = candles_4h['timestamp'] // DAY_MS * DAY_MS
+        days_before = np.searchsorted(candles_1d['timestamp'], day_open, side='left')
+        usable = days_before > 0
+        
+        price = np.asarray(candles_4h['close'], dtype=np.float64)
+        forward = np.full(len(price), np.nan)
+        if horizon < len(price):
+            forward[:len(price) - horizon] = price[horizon:] / price[:-horizon] - 1
+        
+        self.timestamp = np.asarray(candles_4h['timestamp'])[usable]
+        self.price = price[usable]
+        self.forward = forward[usable]
+        self.rsi_4h = rsi_series(price, period)[usable]
+        self.rsi_1d = rsi_peek_series(candles_1d['close'], days_before[usable] - 1, self.price, period)
+        
+        self.snapshot_ids = {}
+        self.snapshots = {}
+        for timeframe in LEVEL_TIMEFRAMES:
+            ids, snapshots = pivot_snapshots(candles_1d, timeframe, window)
+            self.snapshot_ids[timeframe] = ids[days_before[usable]]
+            self.snapshots[timeframe] = snapshots
+    
+    def __len__(self):
+        return len(self.price)
+    
+    def levels(self, sr_threshold):
+        """{timeframe: [(level prices, is_resistance)] per snapshot} clustered at sr_threshold"""
+        result = {}
+        for timeframe, snapshots in self.snapshots.items():
+            clustered = []
+            for prices, is_resistance in snapshots:
+                levels = cluster_levels(prices, is_resistance, sr_threshold)
+                clustered.append((np.array([level for level, _ in levels]),
+                                  np.array([level_type == 'resistance' for _, level_type in levels], dtype=bool)))
+            result[timeframe] = clustered
+        return result
+
+
+def near_pairs(history, levels, sr_threshold, bars):
+    """
+    (bar, level, is_resistance, order) of every level near the price of the
+    given bars, `order` ranking them like near_levels: weekly then monthly,
+    each by level
+    """
+    found = []
+    for rank, timeframe in enumerate(LEVEL_TIMEFRAMES):
+        ids = history.snapshot_ids[timeframe][bars]
+        for snapshot in np.unique(ids):
+            prices, is_resistance = levels[timeframe][snapshot]
+            if len(prices) == 0:
+                continue
+            group = bars[ids == snapshot]
+            price = history.price[group]
+            near = np.abs(price[:, np.newaxis] - prices) / prices < sr_threshold
+            rows, cols = np.nonzero(near)
+            found.append((group[rows], prices[cols], is_resistance[cols], rank * 1_000_000 + cols))
+    
+    if not found:
+        return np.empty(0, dtype=np.intp), np.empty(0), np.empty(0, dtype=bool), np.empty(0, dtype=np.intp)
+    return tuple(np.concatenate(column) for column in zip(*found))
+
+
+def replay(history, rsi_overbought, rsi_oversold, sr_threshold, levels=None):
+    """
+    Alert timeline of one symbol for one parameter set, as a dict of arrays
+    (bar, timestamp, price, level, level_type, condition, rsi_4h, rsi_1d,
+    forward_return, hit), ordered like the live monitor would send them
+    """
+    if levels is None:
+        levels = history.levels(sr_threshold)
+    
+    # Same conditions (and labels) as evaluate_alerts
+    high = (history.rsi_4h > rsi_overbought) | (history.rsi_1d > rsi_overbought)
+    low = (history.rsi_4h < rsi_oversold) | (history.rsi_1d < rsi_oversold)
+    bars = np.flatnonzero(high | low)
+    
+    bar, level, is_resistance, order = near_pairs(history, levels, sr_threshold, bars)
+    ranked = np.lexsort((order, bar))
+    bar, level, is_resistance = bar[ranked], level[ranked], is_resistance[ranked]
+    
+    # dispatch_alerts keys alerts by symbol, level type and condition for an
+    # hour, so within one 4h bar only the first level of each type is sent
+    first = np.ones(len(bar), dtype=bool)
+    for resistance in (False, True):
+        of_type = np.flatnonzero(is_resistance == resistance)
+        first[of_type[1:]] = bar[of_type[1:]] != bar[of_type[:-1]]
+    bar, level, is_resistance = bar[first], level[first], is_resistance[first]
+    
+    forward = history.forward[bar]
+    # A support alert is right if the price rose over the horizon, a resistance alert if it fell
+    signed = np.where(is_resistance, -forward, forward)
+    return {
+        'bar': bar,
+        'timestamp': history.timestamp[bar],
+        'price': history.price[bar],
+        'level': level,
+        'level_type': np.where(is_resistance, 'resistance', 'support'),
+        'condition': np.where(high[bar], 'OVERSOLD', 'OVERBOUGHT'),
+        'rsi_4h': history.rsi_4h[bar],
+        'rsi_1d': history.rsi_1d[bar],
+        'forward_return': forward,
+        'signed_return': signed,
+        'hit': signed > 0,
+    }
+
+
+def summarize(timelines):
+    """Hit statistics over alert timelines; alerts too recent for the horizon are not scored"""
+    signed = np.concatenate([timeline['signed_return'] for timeline in timelines]) if timelines else np.empty(0)
+    scored = signed[~np.isnan(signed)]
+    hits = int((scored > 0).sum())
+    return {
+        'alerts': len(signed),
+        'scored': len(scored),
+        'hits': hits,
+        'hit_rate': hits / len(scored) if len(scored) else float('nan'),
+        'mean_return': float(scored.mean()) if len(scored) else float('nan'),
+    }
+
+
+def _replay_symbol(history, param_sets, timelines):
+    """Every parameter set on one symbol, clustering once per sr_threshold"""
+    levels_by_threshold = {}
+    results = []
+    for params in param_sets:
+        threshold = params['sr_threshold']
+        if threshold not in levels_by_threshold:
+            levels_by_threshold[threshold] = history.levels(threshold)
+        timeline = replay(history, params['rsi_overbought'], params['rsi_oversold'], threshold,
+                          levels_by_threshold[threshold])
+        results.append(timeline if timelines else {'signed_return': timeline['signed_return']})
+    return results
+
+
+def near_types(history, levels, sr_threshold):
+    """(near support, near resistance) per bar, whatever the RSI"""
+    bar, _, is_resistance, _ = near_pairs(history, levels, sr_threshold, np.arange(len(history)))
+    support = np.bincount(bar[~is_resistance], minlength=len(history)) > 0
+    resistance = np.bincount(bar[is_resistance], minlength=len(history)) > 0
+    return support, resistance
+
+
+def _sweep_symbol(history, rsi_overbought, rsi_oversold, sr_threshold):
+    """
+    alerts, scored, hits and summed signed return of one symbol for every
+    (overbought, oversold, threshold) combination, each an array of that shape
+    
+    An alert fires on a bar when max(RSI) > overbought or min(RSI) < oversold,
+    so each bar only needs its rank among the sorted overbought and oversold
+    values: a bar stays quiet for every overbought at or above its max RSI
+    combined with every oversold at or below its min RSI. Bars are binned by
+    those two ranks once, then 2D cumulative sums give every combination.
+    """
+    ob_order, os_order = np.argsort(rsi_overbought), np.argsort(rsi_oversold)
+    ob_sorted, os_sorted = rsi_overbought[ob_order], rsi_oversold[os_order]
+    n_ob, n_os, n_thr = len(ob_sorted), len(os_sorted), len(sr_threshold)
+    
+    # Quiet for the sorted overbought values from ob_rank on and oversold values before os_rank
+    ob_rank = np.searchsorted(ob_sorted, np.maximum(history.rsi_4h, history.rsi_1d), side='left')
+    os_rank = np.searchsorted(os_sorted, np.minimum(history.rsi_4h, history.rsi_1d), side='right')
+    cell = ob_rank * (n_os + 1) + os_rank
+    
+    # Per threshold, what an alerting bar would send: one alert per level type near the price
+    forward = history.forward
+    scored = ~np.isnan(forward)
+    forward = np.where(scored, forward, 0)
+    weights = []
+    for threshold in sr_threshold:
+        support, resistance = near_types(history, history.levels(threshold), threshold)
+        alerts = support.astype(np.float64) + resistance
+        weights += [alerts, alerts * scored, support * (forward > 0) + resistance * (forward < 0),
+                    (support.astype(np.float64) - resistance) * forward]
+    
+    # One histogram of (weight, ob rank, os rank) for every weight at once
+    cells = (n_ob + 1) * (n_os + 1)
+    index = (np.arange(len(weights))[:, np.newaxis] * cells + cell).ravel()
+    binned = np.bincount(index, weights=np.concatenate(weights), minlength=len(weights) * cells)
+    binned = binned.reshape(n_thr, 4, n_ob + 1, n_os + 1)
+    
+    # quiet[a, b] = bins with ob rank <= a and os rank > b
+    quiet = np.cumsum(binned, axis=2)[:, :, :n_ob]
+    quiet = np.cumsum(quiet[..., ::-1], axis=3)[..., ::-1][..., 1:]
+    fired = binned.sum(axis=(2, 3))[:, :, np.newaxis, np.newaxis] - quiet
+    
+    # Back to the given value order, as (overbought, oversold, threshold)
+    fired = fired[:, :, np.argsort(ob_order)][:, :, :, np.argsort(os_order)]
+    fired = fired.transpose(1, 2, 3, 0)
+    return {
+        'alerts': np.rint(fired[0]).astype(np.int64),
+        'scored': np.rint(fired[1]).astype(np.int64),
+        'hits': np.rint(fired[2]).astype(np.int64),
+        'signed_sum': fired[3],
+    }
+
+
+class ReplayEngine:
+    """
+    Replays parameter sets over many symbols. Parameter sets are dicts with
+    rsi_overbought, rsi_oversold and sr_threshold, like the monitor settings.
+    """
+    
+    def __init__(self, histories, workers=None):
+        self.histories = {history.symbol: history for history in histories}
+        self.workers = workers if workers is not None else int(os.getenv('BACKTEST_WORKERS', os.cpu_count() or 1))
+    
+    @classmethod
+    def from_store(cls, store, exchange_name, symbols, horizon=6, workers=None):
+        """Histories of symbols from a CandleStore, symbols without both timeframes are skipped"""
+        histories = []
+        for symbol in symbols:
+            candles_4h = store.read(exchange_name, symbol, '4h')
+            candles_1d = store.read(exchange_name, symbol, '1d')
+            if candles_4h is None or candles_1d is None:
+                logger.warning(f"No stored 4h and 1d candles for {symbol}, skipped")
+                continue
+            histories.append(SymbolHistory(symbol, np.array(candles_4h), np.array(candles_1d), horizon))
+        return cls(histories, workers)
+    
+    def run(self, param_sets, timelines=False):
+        """
+        Replay every parameter set over every symbol
+        Returns one {'params', 'stats', 'timelines'} dict per parameter set,
+        timelines ({symbol: timeline}) only when asked for
+        """
+        param_sets = list(param_sets)
+        symbols = list(self.histories)
+        histories = [self.histories[symbol] for symbol in symbols]
+        
+        if self.workers > 1 and len(histories) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(histories))) as executor:
+                per_symbol = list(executor.map(_replay_symbol, histories, [param_sets] * len(histories),
+                                               [timelines] * len(histories)))
+        else:
+            per_symbol = [_replay_symbol(history, param_sets, timelines) for history in histories]
+        
+        results = []
+        for i, params in enumerate(param_sets):
+            symbol_timelines = {symbol: per_symbol[s][i] for s, symbol in enumerate(symbols)}
+            result = {'params': params, 'stats': summarize(list(symbol_timelines.values()))}
+            if timelines:
+                result['timelines'] = symbol_timelines
+            results.append(result)
+        return results
+    
+    def sweep(self, rsi_overbought, rsi_oversold, sr_threshold):
+        """
+        Statistics of every combination of the given overbought, oversold and
+        threshold values, as arrays of shape (overbought, oversold, threshold)
+        next to the swept values. Levels are clustered once per threshold and
+        the RSI grid costs one histogram per symbol, so a large grid costs
+        about as much as one run per threshold.
+        """
+        grid = [np.asarray(values, dtype=np.float64).ravel()
+                for values in (rsi_overbought, rsi_oversold, sr_threshold)]
+        histories = list(self.histories.values())
+        
+        if self.workers > 1 and len(histories) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(histories))) as executor:
+                per_symbol = list(executor.map(_sweep_symbol, histories,
+                                               *([values] * len(histories) for values in grid)))
+        else:
+            per_symbol = [_sweep_symbol(history, *grid) for history in histories]
+        
+        shape = tuple(len(values) for values in grid)
+        totals = {key: sum((counts[key] for counts in per_symbol), np.zeros(shape, dtype=np.int64))
+                  for key in ('alerts', 'scored', 'hits')}
+        signed_sum = sum((counts['signed_sum'] for counts in per_symbol), np.zeros(shape))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            totals['hit_rate'] = np.where(totals['scored'] > 0, totals['hits'] / totals['scored'], np.nan)
+            totals['mean_return'] = np.where(totals['scored'] > 0, signed_sum / totals['scored'], np.nan)
+        totals.update(rsi_overbought=grid[0], rsi_oversold=grid[1], sr_threshold=grid[2])
+        return totals
+
+
+def stored_symbols(store, exchange_name):
+    """
+    Symbols with candles in the store. Directory names are mapped back to
+    symbols through the cached markets (of any age), or BASE-QUOTE read as
+    BASE/QUOTE for markets no longer listed.
+    """
+    root = os.path.join(store.root, exchange_name)
+    if not os.path.isdir(root):
+        return []
+    names = {file_name(symbol): symbol for symbol in cached_markets(exchange_name, float('inf')) or {}}
+    return sorted(names.get(name, name.replace('-', '/', 1)) for name in os.listdir(root)
+                  if os.path.exists(os.path.join(root, name, '4h.bin'))
+                  and os.path.exists(os.path.join(root, name, '1d.bin')))
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    
+    exchange_name = os.getenv('EXCHANGE', 'binance')
+    store = CandleStore(os.getenv('CANDLE_STORE_DIR', 'candle_data'))
+    symbols = sys.argv[1:] or stored_symbols(store, exchange_name)
+    params = {
+        'rsi_overbought': float(os.getenv('RSI_OVERBOUGHT', 90)),
+        'rsi_oversold': float(os.getenv('RSI_OVERSOLD', 10)),
+        'sr_threshold': float(os.getenv('SR_THRESHOLD', 0.02)),
+    }
+    horizon = int(os.getenv('BACKTEST_HORIZON_BARS', 6))
+    
+    start = time.time()
+    engine = ReplayEngine.from_store(store, exchange_name, symbols, horizon)
+    result = engine.run([params], timelines=True)[0]
+    
+    for symbol, timeline in result['timelines'].items():
+        for i in range(len(timeline['bar'])):
+            when = time.strftime('%Y-%m-%d %H:%M', time.gmtime(timeline['timestamp'][i] / 1000))
+            logger.info(f"{when} {symbol} {timeline['condition'][i]} near {timeline['level_type'][i]} "
+                        f"${timeline['level'][i]:.4f} at ${timeline['price'][i]:.4f}, "
+                        f"{horizon * timeframe_ms('4h') // 3600000}h later {timeline['forward_return'][i]:+.2%}")
+    
+    stats = result['stats']
+    logger.info(f"{stats['alerts']} alerts on {len(engine.histories)} symbols, {stats['hits']}/{stats['scored']} hits "
+                f"({stats['hit_rate']:.1%}), mean signed return {stats['mean_return']:+.2%}, "
+                f"replayed in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Incremental OHLCV candle cache
+Keeps the last bars of every (exchange, symbol, timeframe) in memory and only
+downloads candles newer than the last cached one
+"""
+import threading
+import time
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+OHLCV_FIELDS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+# One record per candle, timestamp in milliseconds like ccxt
+OHLCV_DTYPE = np.dtype([
+    ('timestamp', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+])
+
+
+# Most exchanges return at most this many candles per request
+MAX_BARS_PER_REQUEST = 1000
+
+# Longest possible duration of each timeframe unit, in milliseconds
+TIMEFRAME_UNITS_MS = {
+    's': 1000,
+    'm': 60 * 1000,
+    'h': 3600 * 1000,
+    'd': 86400 * 1000,
+    'w': 7 * 86400 * 1000,
+    'M': 31 * 86400 * 1000,
+    'y': 366 * 86400 * 1000,
+}
+
+
+def timeframe_ms(timeframe):
+    """Duration of a ccxt timeframe string like '4h' or '1M' in milliseconds"""
+    return int(timeframe[:-1]) * TIMEFRAME_UNITS_MS[timeframe[-1]]
+
+
+def rows_to_array(rows):
+    """Convert ccxt OHLCV rows ([ts, o, h, l, c, v] lists) to a structured array"""
+    values = np.asarray(rows, dtype=np.float64).reshape(-1, len(OHLCV_FIELDS))
+    candles = np.empty(len(values), dtype=OHLCV_DTYPE)
+    for i, name in enumerate(OHLCV_FIELDS):
+        candles[name] = values[:, i]
+    return candles
+
+
+def merge_candles(cached, new):
+    """
+    Append new candles to cached ones. The first new candle replaces any
+    cached candle at or after its timestamp (the still-forming bar).
+    """
+    if cached is None or len(cached) == 0:
+        return new
+    if len(new) == 0:
+        return cached
+    keep = np.searchsorted(cached['timestamp'], new['timestamp'][0], side='left')
+    return np.concatenate([cached[:keep], new])
+
+
+class Candles:
+    """
+    Candle series backed by one OHLCV_DTYPE array
+    Columns are numpy views and slices are views too: no index, no datetime
+    conversion and no copies, unlike a DataFrame per fetch
+    """
+    
+    __slots__ = ('data',)
+    
+    def __init__(self, data):
+        self.data = data.data if isinstance(data, Candles) else data
+    
+    def __len__(self):
+        return len(self.data)
+    
+    def __getitem__(self, key):
+        """candles['close'] is a column, candles[-100:] a shorter series"""
+        if isinstance(key, str):
+            return self.data[key]
+        return Candles(self.data[key])
+    
+    @property
+    def timestamp(self):
+        return self.data['timestamp']
+    
+    @property
+    def open(self):
+        return self.data['open']
+    
+    @property
+    def high(self):
+        return self.data['high']
+    
+    @property
+    def low(self):
+        return self.data['low']
+    
+    @property
+    def close(self):
+        return self.data['close']
+    
+    @property
+    def volume(self):
+        return self.data['volume']
+    
+    def to_dataframe(self):
+        """pandas DataFrame with datetime timestamps, for display and analysis"""
+        import pandas as pd
+        df = pd.DataFrame(self.data, columns=list(OHLCV_FIELDS))
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
+
+
+class CandleCache:
+    def __init__(self, exchange_name, store=None):
+        self.exchange_name = exchange_name
+        # Optional CandleStore, written through on every update
+        self.store = store
+        self._series = {}
+        # Window size each series was last fully downloaded with
+        self._windows = {}
+        self.lock = threading.Lock()
+    
+    def _key(self, symbol, timeframe):
+        return (self.exchange_name, symbol, timeframe)
+    
+    def get(self, symbol, timeframe):
+        """Cached candles for a symbol/timeframe, or None"""
+        return self._series.get(self._key(symbol, timeframe))
+    
+    def warm_up(self, symbols, timeframes, limit=100):
+        """
+        Load the last `limit` candles of each series from the store, no network calls
+        timeframes may be a list, or a {timeframe: limit} dict
+        """
+        if self.store is None:
+            return 0
+        if not isinstance(timeframes, dict):
+            timeframes = {timeframe: limit for timeframe in timeframes}
+        
+        loaded = 0
+        for symbol in symbols:
+            for timeframe, window in timeframes.items():
+                if self.get(symbol, timeframe) is not None:
+                    continue
+                candles = self.store.read(self.exchange_name, symbol, timeframe, window)
+                if candles is not None:
+                    # A stored window shorter than `limit` still needs a full download
+                    self.put(symbol, timeframe, candles, window=len(candles))
+                    loaded += 1
+        
+        logger.info(f"Warmed up {loaded} candle series from disk")
+        return loaded
+    
+    def put(self, symbol, timeframe, candles, window=None):
+        """Replace the cached candles for a symbol/timeframe"""
+        key = self._key(symbol, timeframe)
+        with self.lock:
+            self._series[key] = candles
+            if window is not None:
+                self._windows[key] = window
+    
+    def evict(self, symbol):
+        """Drop every timeframe cached for a symbol"""
+        with self.lock:
+            for key in [k for k in self._series if k[1] == symbol]:
+                del self._series[key]
+                self._windows.pop(key, None)
+    
+    def since(self, symbol, timeframe, limit):
+        """
+        Timestamp to pass as `since` for an incremental fetch, or None when
+        the full window has to be downloaded
+        """
+        key = self._key(symbol, timeframe)
+        cached = self._series.get(key)
+        if cached is None or len(cached) == 0 or self._windows.get(key, 0) < limit:
+            return None
+        # Re-download the last cached (possibly still forming) bar
+        return int(cached['timestamp'][-1])
+    
+    def update(self, symbol, timeframe, rows, limit, incremental):
+        """
+        Merge fetched rows into the cache, returns the last `limit` candles
+        Returns None if an incremental fetch came back full, since bars may
+        be missing between the cache and the new data
+        """
+        new = rows_to_array(rows)
+        if incremental and len(new) >= min(limit, MAX_BARS_PER_REQUEST):
+            return None
+        
+        if incremental:
+            candles = merge_candles(self.get(symbol, timeframe), new)[-limit:]
+            self.put(symbol, timeframe, candles)
+        else:
+            candles = new[-limit:]
+            self.put(symbol, timeframe, candles, window=limit)
+        
+        # Written after the cache stops referencing any mapped view of the file
+        if self.store is not None:
+            self.store.write(self.exchange_name, symbol, timeframe, new)
+        return candles
+    
+    def merge(self, symbol, timeframe, rows, limit):
+        """
+        Merge streamed rows into the cached candles, in memory only
+        Returns the last `limit` candles, or None if nothing is cached yet or
+        the rows leave a gap after the cache (to be filled with fetch())
+        """
+        cached = self.get(symbol, timeframe)
+        new = rows_to_array(rows)
+        if cached is None or len(cached) == 0 or len(new) == 0:
+            return None
+        if new['timestamp'][0] > cached['timestamp'][-1] + timeframe_ms(timeframe):
+            return None
+        candles = merge_candles(cached, new)[-limit:]
+        self.put(symbol, timeframe, candles)
+        return candles
+    
+    def fetch(self, exchange, symbol, timeframe, limit=100):
+        """Fetch the last `limit` candles, downloading only what is new"""
+        since = self.since(symbol, timeframe, limit)
+        if since is not None:
+            rows = exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=min(limit, MAX_BARS_PER_REQUEST))
+            candles = self.update(symbol, timeframe, rows, limit, incremental=True)
+            if candles is not None:
+                return candles
+        
+        if limit <= MAX_BARS_PER_REQUEST:
+            rows = exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+        else:
+            # Long windows are downloaded page by page, oldest first
+            rows = []
+            since = self._history_start(timeframe, limit)
+            while True:
+                page = exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=MAX_BARS_PER_REQUEST)
+                since = self._next_page(rows, page, timeframe)
+                if since is None:
+                    break
+        return self.update(symbol, timeframe, rows, limit, incremental=False)
+    
+    def _history_start(self, timeframe, limit):
+        """`since` for the first page of a `limit`-bar window ending now"""
+        return int(time.time() * 1000) - limit * timeframe_ms(timeframe)
+    
+    def _next_page(self, rows, page, timeframe):
+        """Collect a page, returns `since` for the next one or None when caught up"""
+        if rows and page:
+            page = [row for row in page if row[0] > rows[-1][0]]
+        if not page:
+            return None
+        rows.extend(page)
+        last = page[-1][0]
+        if last >= time.time() * 1000 - timeframe_ms(timeframe):
+            return None
+        return last + 1
+    
+    async def fetch_async(self, exchange, symbol, timeframe, limit=100):
+        """fetch() for ccxt.async_support exchanges"""
+        since = self.since(symbol, timeframe, limit)
+        if since is not None:
+            rows = await exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=min(limit, MAX_BARS_PER_REQUEST))
+            candles = self.update(symbol, timeframe, rows, limit, incremental=True)
+            if candles is not None:
+                return candles
+        
+        if limit <= MAX_BARS_PER_REQUEST:
+            rows = await exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+        else:
+            rows = []
+            since = self._history_start(timeframe, limit)
+            while True:
+                page = await exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=MAX_BARS_PER_REQUEST)
+                since = self._next_page(rows, page, timeframe)
+                if since is None:
+                    break
+        return self.update(symbol, timeframe, rows, limit, incremental=False)
@@ -0,0 +1,82 @@
+"""
+Persistent on-disk candle store
+One append-only binary file of fixed-size OHLCV records per
+(exchange, symbol, timeframe), read back through numpy.memmap
+"""
+import os
+import re
+import threading
+import logging
+import numpy as np
+
+from candle_cache import OHLCV_DTYPE, timeframe_ms
+
+logger = logging.getLogger(__name__)
+
+
+def file_name(symbol):
+    """Directory name of a symbol in the store, e.g. BTC-USDT for BTC/USDT"""
+    return re.sub(r'[^A-Za-z0-9._-]', '-', symbol)
+
+
+class CandleStore:
+    def __init__(self, root='candle_data'):
+        self.root = root
+        self.lock = threading.Lock()
+    
+    def path(self, exchange_name, symbol, timeframe):
+        """File holding one series, e.g. candle_data/binance/BTC-USDT/1d.bin"""
+        return os.path.join(self.root, exchange_name, file_name(symbol), f"{timeframe}.bin")
+    
+    def read(self, exchange_name, symbol, timeframe, limit=None):
+        """
+        Memory-mapped view of the stored candles (last `limit` if given)
+        Slicing the result does not copy; returns None if nothing is stored
+        """
+        path = self.path(exchange_name, symbol, timeframe)
+        try:
+            count = os.path.getsize(path) // OHLCV_DTYPE.itemsize
+        except OSError:
+            return None
+        if count == 0:
+            return None
+        
+        candles = np.memmap(path, dtype=OHLCV_DTYPE, mode='r', shape=(count,))
+        return candles[-limit:] if limit else candles
+    
+    def write(self, exchange_name, symbol, timeframe, candles):
+        """
+        Store freshly fetched candles. Candles overlapping the end of the file
+        overwrite it from the first overlapping timestamp (the forming bar),
+        newer ones are appended. A gap since the last stored candle starts the
+        file over, so stored series are always contiguous.
+        """
+        if candles is None or len(candles) == 0:
+            return
+        
+        path = self.path(exchange_name, symbol, timeframe)
+        itemsize = OHLCV_DTYPE.itemsize
+        data = np.ascontiguousarray(candles, dtype=OHLCV_DTYPE)
+        
+        with self.lock:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                mode = 'r+b' if os.path.exists(path) else 'w+b'
+                with open(path, mode) as f:
+                    count = os.fstat(f.fileno()).st_size // itemsize
+                    position = 0
+                    
+                    if count:
+                        stored = np.memmap(f, dtype=OHLCV_DTYPE, mode='r', shape=(count,))
+                        stored_ts = stored['timestamp']
+                        first = int(data['timestamp'][0])
+                        if first <= int(stored_ts[-1]) + timeframe_ms(timeframe):
+                            position = int(np.searchsorted(stored_ts, first, side='left'))
+                        del stored, stored_ts
+                    
+                    f.seek(position * itemsize)
+                    f.write(data.tobytes())
+                    if position + len(data) < count:
+                        f.truncate()
+            except OSError as e:
+                logger.error(f"Error writing candle store for {symbol} {timeframe}: {e}")
@@ -1,25 +1,24 @@
 """
 Cryptocurrency Price Monitor with Support/Resistance and RSI Alerts
 """
-import ccxt
-import pandas as pd
-import numpy as np
-from datetime import datetime
 import time
 import os
 from dotenv import load_dotenv
-from plyer import notification
 import logging
+from rate_limiter import RateLimitedExchange, create_exchange, get_limiter
+from candle_cache import CandleCache, Candles
+from candle_store import CandleStore
+from resample import resample_candles
+from level_index import LevelIndex
+from indicators import rsi_last, support_resistance
+from alert_store import AlertStore, parse_cooldowns
+from notifier import NotificationDispatcher, create_sinks
+from log_setup import setup_logging, log_check
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('crypto_monitor.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configure logging: records are queued and written by a background thread
+# to the console and a rotating crypto_monitor.log
+load_dotenv()
+setup_logging()
 logger = logging.getLogger(__name__)
 
 
@@ -34,106 +33,76 @@ class CryptoMonitor:
         self.rsi_overbought = float(os.getenv('RSI_OVERBOUGHT', 90))
         self.rsi_oversold = float(os.getenv('RSI_OVERSOLD', 10))
         self.sr_threshold = float(os.getenv('SR_THRESHOLD', 0.02))
-        
-        # Initialize exchange
-        self.exchange = getattr(ccxt, self.exchange_name)()
-        
-        # Alert tracking to avoid duplicate notifications
-        self.last_alerts = {}
+        self.candle_store_dir = os.getenv('CANDLE_STORE_DIR', 'candle_data')
+        # Daily bars kept per symbol, weekly/monthly candles are built from them
+        self.daily_history = int(os.getenv('DAILY_HISTORY', 3100))
+        self.fetch_limits = {'4h': 100, '1d': self.daily_history}
+        # Seconds before the same alert is repeated, optionally per alert kind
+        self.alert_cooldown = float(os.getenv('ALERT_COOLDOWN', 3600))
+        self.alert_cooldowns = parse_cooldowns(os.getenv('ALERT_COOLDOWNS'))
+        self.alert_store_file = os.getenv('ALERT_STORE_FILE', 'alerts.db')
+        # Where alerts are delivered: desktop, file and/or webhook, coalesced per check cycle
+        self.notify_sinks = os.getenv('NOTIFY_SINKS', 'desktop').split(',')
+        self.notify_file = os.getenv('NOTIFY_FILE', 'alerts.log')
+        self.notify_webhook_url = os.getenv('NOTIFY_WEBHOOK_URL')
+        self.notify_window = float(os.getenv('NOTIFY_COALESCE_SECONDS', 2))
+        self.notify_queue_size = int(os.getenv('NOTIFY_QUEUE_SIZE', 500))
+        self.notify_retries = int(os.getenv('NOTIFY_RETRIES', 3))
+        
+        # Initialize exchange, every call goes through the shared rate limiter
+        exchange = create_exchange(self.exchange_name)
+        self.exchange = RateLimitedExchange(exchange, get_limiter(self.exchange_name, exchange))
+        
+        # Candles are cached (and persisted to disk) so each cycle only downloads the newest bars
+        store = CandleStore(self.candle_store_dir) if self.candle_store_dir else None
+        self.candle_cache = CandleCache(self.exchange_name, store)
+        
+        # Support/resistance levels per (symbol, timeframe), updated as candles arrive
+        self.level_index = LevelIndex()
+        
+        # Alert tracking to avoid duplicate notifications, kept across restarts
+        self.alert_store = AlertStore(self.alert_store_file or None, self.alert_cooldown, self.alert_cooldowns)
+        
+        # Alerts are queued here and delivered by background threads, the scan never waits on them
+        self.notifier = NotificationDispatcher(create_sinks(self.notify_sinks, self.notify_file, self.notify_webhook_url),
+                                               self.notify_window, self.notify_queue_size, self.notify_retries)
         
         logger.info(f"Initialized CryptoMonitor for {self.symbols} on {self.exchange_name}")
     
-    def fetch_ohlcv(self, symbol, timeframe, limit=200):
-        """Fetch OHLCV data from exchange"""
+    def fetch_candles(self, symbol, timeframe, limit=200):
+        """Fetch OHLCV candles (structured array) from exchange"""
         try:
-            ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            return df
+            return self.candle_cache.fetch(self.exchange, symbol, timeframe, limit)
         except Exception as e:
             logger.error(f"Error fetching data for {symbol} {timeframe}: {e}")
             return None
     
+    def fetch_ohlcv(self, symbol, timeframe, limit=200):
+        """Fetch OHLCV data from exchange as a Candles series"""
+        candles = self.fetch_candles(symbol, timeframe, limit)
+        return Candles(candles) if candles is not None else None
+    
+    def to_dataframe(self, ohlcv):
+        """Convert OHLCV candles to a DataFrame"""
+        if ohlcv is None:
+            return None
+        if isinstance(ohlcv, Candles):
+            return ohlcv.to_dataframe()
+        import pandas as pd
+        df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
+    
     def calculate_rsi(self, prices, period=6):
         """Calculate RSI indicator"""
-        deltas = np.diff(prices)
-        gains = np.where(deltas > 0, deltas, 0)
-        losses = np.where(deltas < 0, -deltas, 0)
-        
-        avg_gain = np.mean(gains[:period])
-        avg_loss = np.mean(losses[:period])
-        
-        if avg_loss == 0:
-            return 100
-        
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-        
-        # Calculate for all periods using exponential moving average
-        rsi_values = [rsi]
-        for i in range(period, len(deltas)):
-            avg_gain = (avg_gain * (period - 1) + gains[i]) / period
-            avg_loss = (avg_loss * (period - 1) + losses[i]) / period
-            
-            if avg_loss == 0:
-                rsi_values.append(100)
-            else:
-                rs = avg_gain / avg_loss
-                rsi_values.append(100 - (100 / (1 + rs)))
-        
-        return rsi_values[-1] if rsi_values else 50
+        return rsi_last(prices, period)[0]
     
     def find_support_resistance(self, df, threshold=0.02):
         """
         Find support and resistance levels using pivot points
         Returns list of (level, type) tuples
         """
-        levels = []
-        
-        # Find local maxima (resistance) and minima (support)
-        highs = df['high'].values
-        lows = df['low'].values
-        closes = df['close'].values
-        
-        # Use a window to find local extrema
-        window = 5
-        
-        for i in range(window, len(df) - window):
-            # Check for local maximum (resistance)
-            if highs[i] == max(highs[i-window:i+window+1]):
-                levels.append((highs[i], 'resistance'))
-            
-            # Check for local minimum (support)
-            if lows[i] == min(lows[i-window:i+window+1]):
-                levels.append((lows[i], 'support'))
-        
-        # Cluster nearby levels
-        if not levels:
-            return []
-        
-        levels.sort(key=lambda x: x[0])
-        clustered = []
-        current_cluster = [levels[0]]
-        
-        for level in levels[1:]:
-            if abs(level[0] - current_cluster[0][0]) / current_cluster[0][0] < threshold:
-                current_cluster.append(level)
-            else:
-                # Average the cluster
-                avg_price = np.mean([l[0] for l in current_cluster])
-                level_type = max(set([l[1] for l in current_cluster]), 
-                               key=[l[1] for l in current_cluster].count)
-                clustered.append((avg_price, level_type))
-                current_cluster = [level]
-        
-        # Add last cluster
-        if current_cluster:
-            avg_price = np.mean([l[0] for l in current_cluster])
-            level_type = max(set([l[1] for l in current_cluster]), 
-                           key=[l[1] for l in current_cluster].count)
-            clustered.append((avg_price, level_type))
-        
-        return clustered
+        return support_resistance(df['high'], df['low'], threshold)
     
     def is_near_level(self, current_price, level, threshold=0.02):
         """Check if current price is near a support/resistance level"""
@@ -141,41 +110,40 @@ class CryptoMonitor:
     
     def check_symbol(self, symbol):
         """Check a single symbol for alert conditions"""
-        logger.info(f"Checking {symbol}...")
+        logger.info("Checking %s...", symbol)
         
         try:
-            # Fetch data for different timeframes
-            df_1w = self.fetch_ohlcv(symbol, '1w', limit=100)
-            df_1M = self.fetch_ohlcv(symbol, '1M', limit=100)
-            df_4h = self.fetch_ohlcv(symbol, '4h', limit=100)
-            df_1d = self.fetch_ohlcv(symbol, '1d', limit=100)
+            # Fetch 4h and 1d, weekly and monthly candles are resampled from daily
+            candles_4h = self.fetch_candles(symbol, '4h', limit=self.fetch_limits['4h'])
+            candles_1d = self.fetch_candles(symbol, '1d', limit=self.fetch_limits['1d'])
             
-            if any(df is None for df in [df_1w, df_1M, df_4h, df_1d]):
-                logger.warning(f"Could not fetch all data for {symbol}")
+            if candles_4h is None or candles_1d is None:
+                logger.warning("Could not fetch all data for %s", symbol)
                 return
             
-            current_price = df_4h['close'].iloc[-1]
+            candles_4h = Candles(candles_4h)
+            candles_1d = Candles(candles_1d)
             
-            # Find support/resistance levels on weekly and monthly timeframes
-            sr_1w = self.find_support_resistance(df_1w, self.sr_threshold)
-            sr_1M = self.find_support_resistance(df_1M, self.sr_threshold)
+            current_price = candles_4h.close[-1]
             
-            all_sr_levels = sr_1w + sr_1M
+            # Support/resistance levels on weekly and monthly timeframes,
+            # only pivots near newly arrived bars are re-evaluated
+            for timeframe in ('1w', '1M'):
+                self.level_index.update(symbol, timeframe, resample_candles(candles_1d, timeframe)[-100:], self.sr_threshold)
             
             # Calculate RSI on 4H and 1D timeframes
-            rsi_4h = self.calculate_rsi(df_4h['close'].values, period=6)
-            rsi_1d = self.calculate_rsi(df_1d['close'].values, period=6)
+            rsi_4h = self.calculate_rsi(candles_4h.close, period=6)
+            rsi_1d = self.calculate_rsi(candles_1d.close[-100:], period=6)
             
-            logger.info(f"{symbol} - Price: ${current_price:.2f}, RSI(4H): {rsi_4h:.2f}, RSI(1D): {rsi_1d:.2f}")
+            logger.info("%s - Price: $%.2f, RSI(4H): %.2f, RSI(1D): %.2f", symbol, current_price, rsi_4h, rsi_1d)
             
             # Check for alert conditions
             alerts = []
             
             # Check if near support/resistance
-            near_levels = []
-            for level, level_type in all_sr_levels:
-                if self.is_near_level(current_price, level, self.sr_threshold):
-                    near_levels.append((level, level_type))
+            near_levels = (self.level_index.near(symbol, '1w', current_price, self.sr_threshold)
+                           + self.level_index.near(symbol, '1M', current_price, self.sr_threshold))
+            log_check(check='full', symbol=symbol, price=current_price, rsi_4h=rsi_4h, rsi_1d=rsi_1d, near=near_levels)
             
             # Check RSI conditions
             is_oversold = rsi_4h > self.rsi_overbought or rsi_1d > self.rsi_overbought
@@ -185,13 +153,10 @@ class CryptoMonitor:
             if near_levels and (is_oversold or is_overbought):
                 for level, level_type in near_levels:
                     condition = "OVERSOLD" if is_oversold else "OVERBOUGHT"
-                    alert_key = f"{symbol}_{level_type}_{condition}"
                     
-                    # Check if we already sent this alert recently (within 1 hour)
-                    if alert_key in self.last_alerts:
-                        time_diff = time.time() - self.last_alerts[alert_key]
-                        if time_diff < 3600:  # 1 hour
-                            continue
+                    # Check if we already sent this alert recently
+                    if not self.alert_store.claim(symbol, level_type, condition):
+                        continue
                     
                     alert_msg = (
                         f"{symbol} Alert!\n"
@@ -202,30 +167,21 @@ class CryptoMonitor:
                     )
                     
                     alerts.append(alert_msg)
-                    self.last_alerts[alert_key] = time.time()
             
             # Send notifications
             for alert in alerts:
                 self.send_notification(f"{symbol} Trading Alert", alert)
-                logger.warning(f"ALERT: {alert}")
+                logger.warning("ALERT: %s", alert)
             
             if not alerts:
-                logger.info(f"{symbol} - No alerts at this time")
+                logger.info("%s - No alerts at this time", symbol)
                 
         except Exception as e:
-            logger.error(f"Error checking {symbol}: {e}")
+            logger.error("Error checking %s: %s", symbol, e)
     
-    def send_notification(self, title, message):
-        """Send desktop notification"""
-        try:
-            notification.notify(
-                title=title,
-                message=message,
-                app_name='Crypto Monitor',
-                timeout=10
-            )
-        except Exception as e:
-            logger.error(f"Error sending notification: {e}")
+    def send_notification(self, title, message, summary=None):
+        """Queue a notification for the sinks, returns without waiting for delivery"""
+        self.notifier.submit(title, message, summary)
     
     def run(self):
         """Main monitoring loop"""
@@ -233,18 +189,22 @@ class CryptoMonitor:
         logger.info(f"Monitoring: {', '.join(self.symbols)}")
         logger.info(f"Check interval: {self.check_interval} seconds")
         
+        # Warm up from the on-disk candle store, no network calls
+        self.candle_cache.warm_up([s.strip() for s in self.symbols], self.fetch_limits)
+        
         while True:
             try:
                 for symbol in self.symbols:
                     symbol = symbol.strip()
                     self.check_symbol(symbol)
-                    time.sleep(2)  # Small delay between symbols to avoid rate limits
+                self.notifier.flush()
                 
                 logger.info(f"Waiting {self.check_interval} seconds until next check...")
                 time.sleep(self.check_interval)
                 
             except KeyboardInterrupt:
                 logger.info("Stopping Crypto Monitor...")
+                self.notifier.close()
                 break
             except Exception as e:
                 logger.error(f"Error in main loop: {e}")
@@ -0,0 +1,278 @@
+"""
+Cryptocurrency Price Monitor - asyncio mode
+Watches hundreds of symbols from one event loop using ccxt.async_support
+"""
+import asyncio
+import logging
+import os
+import ssl
+import time
+
+from crypto_monitor_auto import AutoCryptoMonitor
+from markets_cache import load_markets_async
+from metrics import stage, observe
+from rate_limiter import AsyncRateLimitedExchange, create_exchange, get_limiter
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCryptoMonitor(AutoCryptoMonitor):
+    """
+    Same discovery, check and alert semantics as AutoCryptoMonitor, but all
+    exchange I/O runs as coroutines on a single event loop over one pooled
+    HTTP session. Pass a list of symbols to skip auto-discovery.
+    """
+    
+    # Create a ccxt.pro client instead of a ccxt.async_support one
+    streaming = False
+    
+    def __init__(self, symbols=None):
+        super().__init__()
+        
+        self.fixed_symbols = [s.strip() for s in symbols] if symbols else None
+        
+        # Created inside the running loop by open()
+        self.async_exchange = None
+        self.session = None
+        self.fetch_semaphore = None
+        
+        # Used by stop() to cancel the loop from another thread (e.g. the GUI)
+        self._loop = None
+        self._main_task = None
+        
+        # Background warm-up of symbols added by a refresh
+        self.warm_up_task = None
+    
+    def open_exchange(self):
+        """No sync client or fetch thread pool, open() creates the async client inside the loop"""
+        self.exchange = None
+        self.fetch_engine = None
+    
+    async def open(self):
+        """Create the async exchange client and its pooled HTTP session"""
+        import aiohttp
+        import certifi
+        
+        # One keep-alive connection pool shared by every request
+        ssl_context = ssl.create_default_context(cafile=certifi.where())
+        connector = aiohttp.TCPConnector(limit=self.fetch_concurrency, ttl_dns_cache=300, ssl=ssl_context)
+        self.session = aiohttp.ClientSession(connector=connector, trust_env=True)
+        exchange = create_exchange(self.exchange_name, {'session': self.session}, async_support=True,
+                                   streaming=self.streaming)
+        # Same process-wide bucket as the sync monitors
+        self.async_exchange = AsyncRateLimitedExchange(exchange, get_limiter(self.exchange_name, exchange))
+        self.fetch_semaphore = asyncio.Semaphore(self.fetch_concurrency)
+    
+    async def close(self):
+        """Deliver queued notifications, close the exchange client and the HTTP session"""
+        await asyncio.get_running_loop().run_in_executor(None, self.notifier.close)
+        if self.async_exchange is not None:
+            await self.async_exchange.close()
+            self.async_exchange = None
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+    
+    async def discover_symbols_async(self):
+        """Async version of discover_symbols, shares the same filtering"""
+        logger.info("Discovering available cryptocurrencies...")
+        
+        try:
+            with stage('discovery'):
+                markets = await load_markets_async(self.async_exchange, self.exchange_name, self.markets_cache_ttl)
+                
+                logger.info("Fetching market data for volume filtering...")
+                tickers = await self.async_exchange.fetch_tickers()
+                
+                return self.select_symbols(markets, tickers)
+        
+        except Exception as e:
+            logger.error(f"Error discovering symbols: {e}")
+            return self.load_symbol_cache()
+    
+    async def refresh_symbols_async(self):
+        """Reload the watch list (fixed list or auto-discovery), survivors keep their state"""
+        if self.fixed_symbols is not None:
+            self.active_symbols = list(self.fixed_symbols)
+        elif not self.active_symbols:
+            self.active_symbols = await self.discover_symbols_async()
+        else:
+            symbols = await self.discover_symbols_async()
+            if symbols:
+                self.update_symbols(symbols)
+        self.last_symbol_refresh = time.time()
+    
+    def start_warm_up(self, symbols):
+        """Warm up new symbols in a background task on the running loop"""
+        self.warm_up_task = asyncio.ensure_future(self.warm_up_symbols_async(symbols))
+    
+    async def warm_up_symbols_async(self, symbols):
+        """Async warm_up_symbols: disk first, then every timeframe downloaded concurrently"""
+        try:
+            self.candle_cache.warm_up(symbols, self.fetch_limits)
+            await asyncio.gather(*(self.fetch_symbol_async(symbol) for symbol in symbols))
+        except Exception as e:
+            logger.error(f"Error warming up new symbols: {e}")
+        
+        with self.warmed_lock:
+            self.warmed_symbols.extend(symbols)
+        logger.info(f"Warmed up {len(symbols)} new symbols")
+    
+    async def fetch_ohlcv_async(self, symbol, timeframe, limit=100):
+        """Fetch OHLCV candles through the shared candle cache, returns None on error"""
+        async with self.fetch_semaphore:
+            try:
+                return await self.candle_cache.fetch_async(self.async_exchange, symbol, timeframe, limit)
+            except Exception as e:
+                logger.debug("Error fetching data for %s %s: %s", symbol, timeframe, e)
+                return None
+    
+    async def fetch_symbol_async(self, symbol):
+        """Fetch all timeframes of a symbol concurrently"""
+        timeframes = list(self.fetch_limits)
+        candles = await asyncio.gather(*(self.fetch_ohlcv_async(symbol, tf, limit=self.fetch_limits[tf]) for tf in timeframes))
+        return symbol, dict(zip(timeframes, candles))
+    
+    async def run_cycle(self, symbols=None):
+        """Check every active symbol (or only `symbols`) once"""
+        if symbols is None:
+            symbols = self.active_symbols
+        fetch_start = time.perf_counter()
+        tasks = [asyncio.ensure_future(self.fetch_symbol_async(symbol)) for symbol in symbols]
+        frames_by_symbol = {}
+        try:
+            for task in asyncio.as_completed(tasks):
+                symbol, frames = await task
+                frames_by_symbol[symbol] = frames
+                
+                # Progress update every 50 symbols
+                if len(frames_by_symbol) % 50 == 0:
+                    logger.info(f"Progress: {len(frames_by_symbol)}/{len(tasks)} symbols fetched")
+        finally:
+            for task in tasks:
+                task.cancel()
+        observe('stage_seconds', time.perf_counter() - fetch_start, stage='fetch')
+        
+        # RSI for every symbol at once, then the shared alert check
+        with stage('rsi'):
+            rsi_by_symbol = self.compute_rsi_batch(frames_by_symbol)
+        for symbol, frames in frames_by_symbol.items():
+            self.check_symbol(symbol, frames, rsi_by_symbol.get(symbol))
+        self.notifier.flush()
+        self.save_rsi_states()
+    
+    async def run_price_check_async(self):
+        """Async run_price_check: one fetch_tickers screen, 4h candles only for candidates"""
+        try:
+            symbols = self.screen_tickers(await self.async_exchange.fetch_tickers())
+            logger.info(f"Screened {len(self.active_symbols)} symbols, {len(symbols)} near a level")
+        except Exception as e:
+            logger.error(f"Error screening tickers: {e}")
+            symbols = list(self.active_symbols)
+        
+        limit = self.fetch_limits['4h']
+        candles = await asyncio.gather(*(self.fetch_ohlcv_async(symbol, '4h', limit=limit) for symbol in symbols))
+        for symbol, candles_4h in zip(symbols, candles):
+            self.quick_check(symbol, candles_4h)
+        self.notifier.flush()
+    
+    async def run_async(self):
+        """Main monitoring loop, runs until cancelled"""
+        self._loop = asyncio.get_running_loop()
+        self._main_task = asyncio.current_task()
+        
+        logger.info("Starting Async Crypto Monitor...")
+        logger.info(f"Exchange: {self.exchange_name}")
+        logger.info(f"Check interval: {self.check_interval} seconds, full checks on candle closes")
+        logger.info(f"Fetch concurrency: {self.fetch_concurrency}")
+        self.start_metrics_server()
+        
+        await self.open()
+        try:
+            await self.refresh_symbols_async()
+            
+            if not self.active_symbols:
+                logger.error("No symbols discovered! Check your configuration.")
+                return
+            
+            self.candle_cache.warm_up(self.active_symbols, self.fetch_limits)
+            self.load_rsi_states()
+            
+            cycle_count = 0
+            
+            while True:
+                try:
+                    if self.fixed_symbols is None and self.should_refresh_symbols():
+                        logger.info("Refreshing symbol list...")
+                        await self.refresh_symbols_async()
+                    
+                    # Full check when a candle closed, otherwise a cheap price check
+                    closed = self.scheduler.closed_timeframes()
+                    warmed = self.take_warmed_symbols()
+                    if closed:
+                        if cycle_count:
+                            logger.info(f"Candle close: {', '.join(closed)}")
+                        cycle_count += 1
+                        logger.info(f"=== Cycle {cycle_count}: Checking {len(self.active_symbols)} symbols ===")
+                        
+                        cycle_start = time.time()
+                        await self.run_cycle()
+                        self.scheduler.mark_full(cycle_start)
+                        
+                        elapsed = time.time() - cycle_start
+                        observe('stage_seconds', elapsed, stage='full_cycle')
+                        logger.info(f"Cycle {cycle_count} complete in {elapsed:.1f}s")
+                    elif warmed:
+                        # First full check of symbols added by the last refresh
+                        logger.info(f"Checking {len(warmed)} new symbols")
+                        await self.run_cycle(warmed)
+                    else:
+                        check_start = time.time()
+                        await self.run_price_check_async()
+                        self.scheduler.mark_checked(check_start)
+                        
+                        elapsed = time.time() - check_start
+                        observe('stage_seconds', elapsed, stage='price_check')
+                        logger.info(f"Price check complete in {elapsed:.1f}s")
+                    
+                    self.report_metrics()
+                    delay = self.scheduler.sleep_time()
+                    logger.info(f"Waiting {delay:.0f} seconds...")
+                    await asyncio.sleep(delay)
+                
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error in main loop: {e}")
+                    await asyncio.sleep(60)
+        
+        except asyncio.CancelledError:
+            logger.info("Stopping Async Crypto Monitor...")
+        finally:
+            if self.warm_up_task is not None:
+                self.warm_up_task.cancel()
+                self.warm_up_task = None
+            await self.close()
+            self._main_task = None
+    
+    def run(self):
+        """Run the async loop until Ctrl+C or stop()"""
+        try:
+            asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            logger.info("Stopping Async Crypto Monitor...")
+    
+    def stop(self):
+        """Cancel the running loop, safe to call from any thread"""
+        if self._loop is not None and self._main_task is not None:
+            self._loop.call_soon_threadsafe(self._main_task.cancel)
+
+
+def async_mode_enabled():
+    """Check the ASYNC_MODE setting"""
+    return os.getenv('ASYNC_MODE', 'false').strip().lower() in ('1', 'true', 'yes')
+
+
+if __name__ == "__main__":
+    monitor = AsyncCryptoMonitor()
+    monitor.run()
@@ -2,26 +2,32 @@
 Cryptocurrency Price Monitor with Automatic Symbol Discovery
 Monitors ALL cryptocurrencies on the exchange in real-time
 """
-import ccxt
-import pandas as pd
-import numpy as np
-from datetime import datetime
 import time
 import os
 from dotenv import load_dotenv
-from plyer import notification
 import logging
 import json
+import threading
+from fetch_engine import OHLCVFetchEngine
+from rate_limiter import RateLimitedExchange, create_exchange, get_limiter
+from candle_cache import CandleCache, Candles, timeframe_ms
+from candle_store import CandleStore
+from markets_cache import load_markets
+from resample import resample_candles
+from level_index import LevelIndex
+from scheduler import CandleScheduler, candle_open
+from indicators import rsi_last, support_resistance, RSIState, RSI_WINDOW
+from universe import diff_symbols
+from discovery import market_table, filter_mask, top_by_volume
+from alert_store import AlertStore, parse_cooldowns
+from notifier import NotificationDispatcher, create_sinks
+from log_setup import setup_logging, log_check
+from metrics import stage, observe, set_gauge, log_summary, start_server
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('crypto_monitor.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configure logging: records are queued and written by a background thread
+# to the console and a rotating crypto_monitor.log
+load_dotenv()
+setup_logging()
 logger = logging.getLogger(__name__)
 
 
@@ -32,6 +38,8 @@ class AutoCryptoMonitor:
         # Configuration
         self.exchange_name = os.getenv('EXCHANGE', 'binance')
         self.check_interval = int(os.getenv('CHECK_INTERVAL', 300))
+        # Seconds after a candle close before the full check runs
+        self.candle_close_grace = int(os.getenv('CANDLE_CLOSE_GRACE', 10))
         self.rsi_overbought = float(os.getenv('RSI_OVERBOUGHT', 90))
         self.rsi_oversold = float(os.getenv('RSI_OVERSOLD', 10))
         self.sr_threshold = float(os.getenv('SR_THRESHOLD', 0.02))
@@ -41,165 +49,102 @@ class AutoCryptoMonitor:
         self.min_volume_24h = float(os.getenv('MIN_VOLUME_24H', 1000000))  # $1M minimum
         self.min_price = float(os.getenv('MIN_PRICE', 0.000001))
         self.max_symbols = int(os.getenv('MAX_SYMBOLS', 100))  # Limit to prevent overload
+        # Optional: maximum relative bid/ask spread, minimum days since listing
+        self.max_spread = float(os.getenv('MAX_SPREAD')) if os.getenv('MAX_SPREAD') else None
+        self.min_listing_days = float(os.getenv('MIN_LISTING_DAYS', 0))
         self.refresh_symbols_interval = int(os.getenv('REFRESH_SYMBOLS_HOURS', 24)) * 3600
+        # Markets metadata is reused from memory/disk until it is this old
+        self.markets_cache_ttl = float(os.getenv('MARKETS_CACHE_HOURS', 24)) * 3600
+        self.fetch_concurrency = int(os.getenv('FETCH_CONCURRENCY', 10))
+        self.candle_store_dir = os.getenv('CANDLE_STORE_DIR', 'candle_data')
+        # Daily bars kept per symbol, weekly/monthly candles are built from them
+        self.daily_history = int(os.getenv('DAILY_HISTORY', 3100))
+        self.fetch_limits = {'4h': 100, '1d': self.daily_history}
+        self.rsi_state_file = os.getenv('RSI_STATE_FILE', 'rsi_state.json')
+        # Seconds before the same alert is repeated, optionally per alert kind
+        self.alert_cooldown = float(os.getenv('ALERT_COOLDOWN', 3600))
+        self.alert_cooldowns = parse_cooldowns(os.getenv('ALERT_COOLDOWNS'))
+        self.alert_store_file = os.getenv('ALERT_STORE_FILE', 'alerts.db')
+        # Where alerts are delivered: desktop, file and/or webhook, coalesced per check cycle
+        self.notify_sinks = os.getenv('NOTIFY_SINKS', 'desktop').split(',')
+        self.notify_file = os.getenv('NOTIFY_FILE', 'alerts.log')
+        self.notify_webhook_url = os.getenv('NOTIFY_WEBHOOK_URL')
+        self.notify_window = float(os.getenv('NOTIFY_COALESCE_SECONDS', 2))
+        self.notify_queue_size = int(os.getenv('NOTIFY_QUEUE_SIZE', 500))
+        self.notify_retries = int(os.getenv('NOTIFY_RETRIES', 3))
+        # Prometheus metrics on 127.0.0.1:METRICS_PORT (0 disables), summary log every METRICS_LOG_MINUTES
+        self.metrics_port = int(os.getenv('METRICS_PORT', 0))
+        self.metrics_log_interval = float(os.getenv('METRICS_LOG_MINUTES', 60)) * 60
+        self.last_metrics_log = time.time()
         
-        # Initialize exchange
-        self.exchange = getattr(ccxt, self.exchange_name)()
+        # Candles are cached (and persisted to disk) so each cycle only downloads the newest bars
+        store = CandleStore(self.candle_store_dir) if self.candle_store_dir else None
+        self.candle_cache = CandleCache(self.exchange_name, store)
+        self.open_exchange()
         
         # Symbol management
         self.active_symbols = []
         self.last_symbol_refresh = 0
         self.symbol_cache_file = 'active_symbols.json'
         
-        # Alert tracking to avoid duplicate notifications
-        self.last_alerts = {}
+        # Symbols added by a refresh, warmed up in the background before their first check
+        self.warm_up_thread = None
+        self.warmed_symbols = []
+        self.warmed_lock = threading.Lock()
+        
+        # Streaming RSI per (symbol, timeframe), advanced one closed candle at a time
+        self.rsi_states = {}
+        
+        # Support/resistance levels per (symbol, timeframe), updated as candles arrive
+        self.level_index = LevelIndex(min_bars=15)
+        
+        # Full checks on candle closes, price checks every CHECK_INTERVAL in between
+        self.scheduler = CandleScheduler(('4h', '1d', '1w', '1M'), self.check_interval, self.candle_close_grace)
+        
+        # Alert tracking to avoid duplicate notifications, kept across restarts
+        self.alert_store = AlertStore(self.alert_store_file or None, self.alert_cooldown, self.alert_cooldowns)
+        
+        # Alerts are queued here and delivered by background threads, the scan never waits on them
+        self.notifier = NotificationDispatcher(create_sinks(self.notify_sinks, self.notify_file, self.notify_webhook_url),
+                                               self.notify_window, self.notify_queue_size, self.notify_retries)
         
         logger.info(f"Initialized AutoCryptoMonitor on {self.exchange_name}")
         logger.info(f"Auto-discovering symbols with quote currencies: {', '.join(self.quote_currencies)}")
         logger.info(f"Minimum 24h volume: ${self.min_volume_24h:,.0f}")
     
-    def discover_symbols(self):
-        """Automatically discover all tradable symbols on the exchange"""
-        logger.info("Discovering available cryptocurrencies...")
-        
-        try:
-            # Load markets
-            markets = self.exchange.load_markets()
-            
-            # Get tickers for volume filtering
-            logger.info("Fetching market data for volume filtering...")
-            tickers = self.exchange.fetch_tickers()
-            
-            discovered = []
-            
-            for symbol, market in markets.items():
-                # Skip if not active
-                if not market.get('active', True):
-                    continue
-                
-                # Filter by quote currency
-                quote = market.get('quote', '')
-                if quote not in self.quote_currencies:
-                    continue
-                
-                # Check if symbol has ticker data
-                if symbol not in tickers:
-                    continue
-                
-                ticker = tickers[symbol]
-                
-                # Filter by volume
-                volume_24h = ticker.get('quoteVolume', 0)
-                if volume_24h and volume_24h < self.min_volume_24h:
-                    continue
-                
-                # Filter by price (avoid extremely low-priced coins)
-                last_price = ticker.get('last', 0)
-                if last_price and last_price < self.min_price:
-                    continue
-                
-                # Add to discovered list
-                discovered.append({
-                    'symbol': symbol,
-                    'volume': volume_24h,
-                    'price': last_price,
-                    'quote': quote
-                })
-            
-            # Sort by volume (highest first) and limit
-            discovered.sort(key=lambda x: x['volume'], reverse=True)
-            discovered = discovered[:self.max_symbols]
-            
-            self.active_symbols = [item['symbol'] for item in discovered]
-            
-            logger.info(f"Discovered {len(self.active_symbols)} cryptocurrencies to monitor")
-            logger.info(f"Top 10: {', '.join(self.active_symbols[:10])}")
-            
-            # Save to cache
-            self.save_symbol_cache(discovered)
-            
-            return self.active_symbols
-            
-        except Exception as e:
-            logger.error(f"Error discovering symbols: {e}")
-            # Try to load from cache
-            return self.load_symbol_cache()
-    
-    def save_symbol_cache(self, symbols_data):
-        """Save discovered symbols to cache file"""
-        try:
-            cache_data = {
-                'timestamp': time.time(),
-                'exchange': self.exchange_name,
-                'symbols': symbols_data
-            }
-            with open(self.symbol_cache_file, 'w') as f:
-                json.dump(cache_data, f, indent=2)
-            logger.info(f"Saved {len(symbols_data)} symbols to cache")
-        except Exception as e:
-            logger.error(f"Error saving symbol cache: {e}")
-    
-    def load_symbol_cache(self):
-        """Load symbols from cache file"""
-        try:
-            if os.path.exists(self.symbol_cache_file):
-                with open(self.symbol_cache_file, 'r') as f:
-                    cache_data = json.load(f)
-                
-                symbols = [item['symbol'] for item in cache_data.get('symbols', [])]
-                logger.info(f"Loaded {len(symbols)} symbols from cache")
-                return symbols
-        except Exception as e:
-            logger.error(f"Error loading symbol cache: {e}")
-        
-        return []
-    
-    def should_refresh_symbols(self):
-        """Check if it's time to refresh the symbol list"""
-        return (time.time() - self.last_symbol_refresh) > self.refresh_symbols_interval
+    def open_exchange(self):
+        """Create the exchange client, every call goes through the shared rate limiter, and the fetch engine"""
+        exchange = create_exchange(self.exchange_name)
+        self.exchange = RateLimitedExchange(exchange, get_limiter(self.exchange_name, exchange))
+        self.fetch_engine = OHLCVFetchEngine(self.exchange, self.fetch_concurrency, self.candle_cache)
     
     def fetch_ohlcv(self, symbol, timeframe, limit=200):
-        """Fetch OHLCV data from exchange"""
+        """Fetch OHLCV data from exchange as a Candles series"""
         try:
-            ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            return df
+            return Candles(self.fetch_engine.fetch(symbol, timeframe, limit=limit))
         except Exception as e:
-            logger.debug(f"Error fetching data for {symbol} {timeframe}: {e}")
+            logger.debug("Error fetching data for %s %s: %s", symbol, timeframe, e)
+            return None
+    
+    def to_dataframe(self, ohlcv):
+        """Convert OHLCV rows or cached candles to a DataFrame"""
+        if ohlcv is None:
             return None
+        if isinstance(ohlcv, Candles):
+            return ohlcv.to_dataframe()
+        import pandas as pd
+        df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
+    
+    def fetch_symbol_data(self, symbol):
+        """Fetch all timeframes for one symbol concurrently"""
+        frames = self.fetch_engine.fetch_symbols([symbol], self.fetch_limits)
+        return frames.get(symbol, {})
     
     def calculate_rsi(self, prices, period=6):
         """Calculate RSI indicator"""
-        if len(prices) < period + 1:
-            return 50
-        
-        deltas = np.diff(prices)
-        gains = np.where(deltas > 0, deltas, 0)
-        losses = np.where(deltas < 0, -deltas, 0)
-        
-        avg_gain = np.mean(gains[:period])
-        avg_loss = np.mean(losses[:period])
-        
-        if avg_loss == 0:
-            return 100
-        
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-        
-        # Calculate for all periods using exponential moving average
-        rsi_values = [rsi]
-        for i in range(period, len(deltas)):
-            avg_gain = (avg_gain * (period - 1) + gains[i]) / period
-            avg_loss = (avg_loss * (period - 1) + losses[i]) / period
-            
-            if avg_loss == 0:
-                rsi_values.append(100)
-            else:
-                rs = avg_gain / avg_loss
-                rsi_values.append(100 - (100 / (1 + rs)))
-        
-        return rsi_values[-1] if rsi_values else 50
+        return rsi_last(prices, period)[0]
     
     def find_support_resistance(self, df, threshold=0.02):
         """
@@ -209,139 +154,354 @@ class AutoCryptoMonitor:
         if len(df) < 15:
             return []
         
-        levels = []
-        
-        # Find local maxima (resistance) and minima (support)
-        highs = df['high'].values
-        lows = df['low'].values
-        
-        # Use a window to find local extrema
-        window = 5
-        
-        for i in range(window, len(df) - window):
-            # Check for local maximum (resistance)
-            if highs[i] == max(highs[i-window:i+window+1]):
-                levels.append((highs[i], 'resistance'))
-            
-            # Check for local minimum (support)
-            if lows[i] == min(lows[i-window:i+window+1]):
-                levels.append((lows[i], 'support'))
-        
-        # Cluster nearby levels
-        if not levels:
-            return []
-        
-        levels.sort(key=lambda x: x[0])
-        clustered = []
-        current_cluster = [levels[0]]
-        
-        for level in levels[1:]:
-            if abs(level[0] - current_cluster[0][0]) / current_cluster[0][0] < threshold:
-                current_cluster.append(level)
-            else:
-                # Average the cluster
-                avg_price = np.mean([l[0] for l in current_cluster])
-                level_type = max(set([l[1] for l in current_cluster]), 
-                               key=[l[1] for l in current_cluster].count)
-                clustered.append((avg_price, level_type))
-                current_cluster = [level]
-        
-        # Add last cluster
-        if current_cluster:
-            avg_price = np.mean([l[0] for l in current_cluster])
-            level_type = max(set([l[1] for l in current_cluster]), 
-                           key=[l[1] for l in current_cluster].count)
-            clustered.append((avg_price, level_type))
-        
-        return clustered
+        return support_resistance(df['high'], df['low'], threshold)
     
     def is_near_level(self, current_price, level, threshold=0.02):
         """Check if current price is near a support/resistance level"""
         return abs(current_price - level) / level < threshold
     
-    def check_symbol(self, symbol):
-        """Check a single symbol for alert conditions"""
+    def compute_rsi_batch(self, frames_by_symbol, window=RSI_WINDOW):
+        """
+        RSI(4H) and RSI(1D) of many symbols from their streaming RSI states
+        Each state commits the candles that closed since the last cycle and
+        peeks at the forming one. Missing or stale states are seeded from the
+        last `window` bars, one vectorized pass per timeframe.
+        """
+        symbols = [symbol for symbol, frames in frames_by_symbol.items()
+                   if frames.get('4h') is not None and len(frames['4h']) > 1
+                   and frames.get('1d') is not None and len(frames['1d']) > 1]
+        
+        values = {}
+        for timeframe in ('4h', '1d'):
+            to_seed = []
+            for symbol in symbols:
+                candles = frames_by_symbol[symbol][timeframe][-window:]
+                state = self.rsi_states.get((symbol, timeframe))
+                if state is None or not state.advance(candles[:-1]):
+                    to_seed.append((symbol, candles))
+                    continue
+                values[(symbol, timeframe)] = state.peek(float(candles['close'][-1]))
+            
+            if to_seed:
+                states = RSIState.from_history_many(
+                    [candles['close'][:-1] for _, candles in to_seed],
+                    [int(candles['timestamp'][-2]) for _, candles in to_seed],
+                    period=6,
+                    window=window,
+                )
+                for (symbol, candles), state in zip(to_seed, states):
+                    self.rsi_states[(symbol, timeframe)] = state
+                    values[(symbol, timeframe)] = state.peek(float(candles['close'][-1]))
+        
+        return {symbol: (values[(symbol, '4h')], values[(symbol, '1d')]) for symbol in symbols}
+    
+    def save_rsi_states(self):
+        """Persist RSI states so a restart does not replay history"""
+        if not self.rsi_state_file:
+            return
+        try:
+            data = {f"{symbol}|{timeframe}": state.to_dict()
+                    for (symbol, timeframe), state in self.rsi_states.items()}
+            with open(self.rsi_state_file, 'w') as f:
+                json.dump(data, f)
+        except Exception as e:
+            logger.error(f"Error saving RSI state: {e}")
+    
+    def load_rsi_states(self):
+        """Load RSI states saved by a previous run"""
+        if not self.rsi_state_file or not os.path.exists(self.rsi_state_file):
+            return
+        try:
+            with open(self.rsi_state_file, 'r') as f:
+                data = json.load(f)
+            for key, state in data.items():
+                symbol, timeframe = key.rsplit('|', 1)
+                self.rsi_states[(symbol, timeframe)] = RSIState.from_dict(state)
+            logger.info(f"Loaded {len(data)} RSI states")
+        except Exception as e:
+            logger.error(f"Error loading RSI state: {e}")
+    
+    def check_symbol(self, symbol, frames=None, rsi_values=None):
+        """
+        Check a single symbol for alert conditions
+        frames: optional {timeframe: candles} for 4h and 1d already fetched by the engine
+        rsi_values: optional (RSI(4H), RSI(1D)) already computed by compute_rsi_batch
+        """
         try:
-            # Fetch data for different timeframes
-            df_1w = self.fetch_ohlcv(symbol, '1w', limit=100)
-            df_1M = self.fetch_ohlcv(symbol, '1M', limit=100)
-            df_4h = self.fetch_ohlcv(symbol, '4h', limit=100)
-            df_1d = self.fetch_ohlcv(symbol, '1d', limit=100)
+            # Fetch 4h and 1d, weekly and monthly candles are resampled from daily
+            if frames is None:
+                frames = self.fetch_symbol_data(symbol)
+            
+            candles_4h = frames.get('4h')
+            candles_1d = frames.get('1d')
             
-            if any(df is None for df in [df_1w, df_1M, df_4h, df_1d]):
+            if candles_4h is None or candles_1d is None:
                 return
             
-            current_price = df_4h['close'].iloc[-1]
+            candles_4h = Candles(candles_4h)
+            candles_1d = Candles(candles_1d)
             
-            # Find support/resistance levels on weekly and monthly timeframes
-            sr_1w = self.find_support_resistance(df_1w, self.sr_threshold)
-            sr_1M = self.find_support_resistance(df_1M, self.sr_threshold)
+            current_price = candles_4h.close[-1]
             
-            all_sr_levels = sr_1w + sr_1M
+            # Support/resistance levels on weekly and monthly timeframes,
+            # only pivots near newly arrived bars are re-evaluated
+            with stage('levels'):
+                for timeframe in ('1w', '1M'):
+                    self.level_index.update(symbol, timeframe, resample_candles(candles_1d, timeframe)[-100:], self.sr_threshold)
             
             # Calculate RSI on 4H and 1D timeframes
-            rsi_4h = self.calculate_rsi(df_4h['close'].values, period=6)
-            rsi_1d = self.calculate_rsi(df_1d['close'].values, period=6)
-            
-            # Check for alert conditions
-            alerts = []
+            if rsi_values is not None:
+                rsi_4h, rsi_1d = rsi_values
+            else:
+                with stage('rsi'):
+                    rsi_4h = self.calculate_rsi(candles_4h.close, period=6)
+                    rsi_1d = self.calculate_rsi(candles_1d.close[-100:], period=6)
             
             # Check if near support/resistance
-            near_levels = []
-            for level, level_type in all_sr_levels:
-                if self.is_near_level(current_price, level, self.sr_threshold):
-                    near_levels.append((level, level_type))
+            with stage('alerts'):
+                near_levels = self.near_levels(symbol, current_price)
+                log_check(check='full', symbol=symbol, price=current_price, rsi_4h=rsi_4h, rsi_1d=rsi_1d, near=near_levels)
+                self.raise_alerts(symbol, current_price, near_levels, rsi_4h, rsi_1d)
+        
+        except Exception as e:
+            logger.debug("Error checking %s: %s", symbol, e)
+    
+    def near_levels(self, symbol, current_price):
+        """Weekly, then monthly support/resistance levels near the price"""
+        return (self.level_index.near(symbol, '1w', current_price, self.sr_threshold)
+                + self.level_index.near(symbol, '1M', current_price, self.sr_threshold))
+    
+    def evaluate_alerts(self, symbol, current_price, near_levels, rsi_4h, rsi_1d):
+        """
+        Alert candidates for RSI extremes near a support/resistance level,
+        one dict per level, before duplicate suppression
+        """
+        # Check RSI conditions
+        is_oversold = rsi_4h > self.rsi_overbought or rsi_1d > self.rsi_overbought
+        is_overbought = rsi_4h < self.rsi_oversold or rsi_1d < self.rsi_oversold
+        
+        if not near_levels or not (is_oversold or is_overbought):
+            return []
+        
+        condition = "OVERSOLD" if is_oversold else "OVERBOUGHT"
+        return [{
+            'symbol': symbol,
+            'price': current_price,
+            'level': level,
+            'level_type': level_type,
+            'condition': condition,
+            'rsi_4h': rsi_4h,
+            'rsi_1d': rsi_1d,
+        } for level, level_type in near_levels]
+    
+    def dispatch_alerts(self, candidates):
+        """Notify alert candidates, skipping any sent within their cooldown"""
+        alerts = []
+        for candidate in candidates:
+            # Check if we already sent this alert recently
+            if not self.alert_store.claim(candidate['symbol'], candidate['level_type'], candidate['condition']):
+                continue
             
-            # Check RSI conditions
-            is_oversold = rsi_4h > self.rsi_overbought or rsi_1d > self.rsi_overbought
-            is_overbought = rsi_4h < self.rsi_oversold or rsi_1d < self.rsi_oversold
+            alert_msg = (
+                f"{candidate['symbol']} Alert!\n"
+                f"Price: ${candidate['price']:.2f}\n"
+                f"Near {candidate['level_type'].upper()}: ${candidate['level']:.2f}\n"
+                f"Condition: {candidate['condition']}\n"
+                f"RSI(4H): {candidate['rsi_4h']:.2f} | RSI(1D): {candidate['rsi_1d']:.2f}"
+            )
             
-            # Generate alerts
-            if near_levels and (is_oversold or is_overbought):
-                for level, level_type in near_levels:
-                    condition = "OVERSOLD" if is_oversold else "OVERBOUGHT"
-                    alert_key = f"{symbol}_{level_type}_{condition}"
-                    
-                    # Check if we already sent this alert recently (within 1 hour)
-                    if alert_key in self.last_alerts:
-                        time_diff = time.time() - self.last_alerts[alert_key]
-                        if time_diff < 3600:  # 1 hour
-                            continue
-                    
-                    alert_msg = (
-                        f"{symbol} Alert!\n"
-                        f"Price: ${current_price:.2f}\n"
-                        f"Near {level_type.upper()}: ${level:.2f}\n"
-                        f"Condition: {condition}\n"
-                        f"RSI(4H): {rsi_4h:.2f} | RSI(1D): {rsi_1d:.2f}"
-                    )
-                    
-                    alerts.append(alert_msg)
-                    self.last_alerts[alert_key] = time.time()
+            alerts.append((candidate, alert_msg))
+        
+        # Send notifications
+        for candidate, alert in alerts:
+            self.send_notification(f"{candidate['symbol']} Trading Alert", alert,
+                                   summary=f"{candidate['symbol']} {candidate['condition']} near "
+                                           f"{candidate['level_type']} ${candidate['level']:.2f}")
+            logger.warning("ALERT: %s", alert)
+        
+        # Log the state of every symbol that alerted
+        logged = set()
+        for candidate, _ in alerts:
+            if candidate['symbol'] not in logged:
+                logged.add(candidate['symbol'])
+                logger.info("%s - Price: $%.2f, RSI(4H): %.2f, RSI(1D): %.2f",
+                            candidate['symbol'], candidate['price'], candidate['rsi_4h'], candidate['rsi_1d'])
+    
+    def raise_alerts(self, symbol, current_price, near_levels, rsi_4h, rsi_1d):
+        """Alert on RSI extremes near a support/resistance level"""
+        self.dispatch_alerts(self.evaluate_alerts(symbol, current_price, near_levels, rsi_4h, rsi_1d))
+    
+    def peek_rsi(self, symbol, price):
+        """
+        Provisional (RSI(4H), RSI(1D)) at a price from the RSI states, or None
+        if a state is missing or behind the last closed candle
+        """
+        now = int(time.time() * 1000)
+        values = []
+        for timeframe in ('4h', '1d'):
+            state = self.rsi_states.get((symbol, timeframe))
+            if state is None or state.timestamp != candle_open(timeframe, now) - timeframe_ms(timeframe):
+                return None
+            values.append(state.peek(price))
+        return tuple(values)
+    
+    def screen_tickers(self, tickers):
+        """
+        Active symbols whose ticker price is near a cached support/resistance
+        level, with an RSI extreme or RSI state that cannot tell yet
+        """
+        candidates = []
+        for symbol in self.active_symbols:
+            price = (tickers.get(symbol) or {}).get('last')
+            if not price or not self.near_levels(symbol, price):
+                continue
+            
+            rsi_values = self.peek_rsi(symbol, price)
+            if rsi_values is not None and not (max(rsi_values) > self.rsi_overbought
+                                               or min(rsi_values) < self.rsi_oversold):
+                continue
+            candidates.append(symbol)
+        return candidates
+    
+    def quick_check(self, symbol, candles_4h):
+        """
+        Cheap check between candle closes: the latest 4h price against the
+        cached support/resistance levels and the RSI states
+        """
+        try:
+            state_4h = self.rsi_states.get((symbol, '4h'))
+            state_1d = self.rsi_states.get((symbol, '1d'))
+            if candles_4h is None or len(candles_4h) < 2 or state_1d is None:
+                return
             
-            # Send notifications
-            for alert in alerts:
-                self.send_notification(f"{symbol} Trading Alert", alert)
-                logger.warning(f"ALERT: {alert}")
+            # The daily state has to end at yesterday's candle, otherwise wait for the next full check
+            today = candle_open('1d', int(candles_4h['timestamp'][-1]))
+            if state_1d.timestamp != today - timeframe_ms('1d'):
+                return
+            candles_4h = candles_4h[-RSI_WINDOW:]
+            if state_4h is None or not state_4h.advance(candles_4h[:-1]):
+                state_4h = RSIState.from_history(candles_4h['close'][:-1], int(candles_4h['timestamp'][-2]))
+                self.rsi_states[(symbol, '4h')] = state_4h
             
-            # Only log if there's an alert or every 10th check
-            if alerts:
-                logger.info(f"{symbol} - Price: ${current_price:.2f}, RSI(4H): {rsi_4h:.2f}, RSI(1D): {rsi_1d:.2f}")
+            current_price = float(candles_4h['close'][-1])
+            rsi_4h = state_4h.peek(current_price)
+            rsi_1d = state_1d.peek(current_price)
+            with stage('alerts'):
+                near_levels = self.near_levels(symbol, current_price)
+                log_check(check='quick', symbol=symbol, price=current_price, rsi_4h=rsi_4h, rsi_1d=rsi_1d, near=near_levels)
+                self.raise_alerts(symbol, current_price, near_levels, rsi_4h, rsi_1d)
+        
+        except Exception as e:
+            logger.debug("Error checking %s: %s", symbol, e)
+    
+    def send_notification(self, title, message, summary=None):
+        """Queue a notification for the sinks, returns without waiting for delivery"""
+        self.notifier.submit(title, message, summary)
+    
+    def run_full_cycle(self, symbols=None):
+        """Fetch every timeframe of every active symbol (or only `symbols`) and check them all"""
+        if symbols is None:
+            symbols = self.active_symbols
+        frames_by_symbol = {}
+        with stage('fetch'):
+            for symbol, frames in self.fetch_engine.iter_symbols(symbols, self.fetch_limits):
+                frames_by_symbol[symbol] = frames
                 
+                # Progress update every 10 symbols
+                if len(frames_by_symbol) % 10 == 0:
+                    logger.info(f"Progress: {len(frames_by_symbol)}/{len(symbols)} symbols fetched")
+        
+        # RSI for every symbol at once, then check each symbol
+        with stage('rsi'):
+            rsi_by_symbol = self.compute_rsi_batch(frames_by_symbol)
+        for symbol, frames in frames_by_symbol.items():
+            self.check_symbol(symbol, frames, rsi_by_symbol.get(symbol))
+        self.notifier.flush()
+        self.save_rsi_states()
+    
+    def run_price_check(self, tickers=None):
+        """
+        Screen every active symbol with one fetch_tickers call (unless tickers
+        are given), then fetch the newest 4h candles and quick-check only the
+        symbols that passed
+        """
+        try:
+            if tickers is None:
+                tickers = self.exchange.fetch_tickers()
+            candidates = self.screen_tickers(tickers)
+            logger.info(f"Screened {len(self.active_symbols)} symbols, {len(candidates)} near a level")
         except Exception as e:
-            logger.debug(f"Error checking {symbol}: {e}")
+            logger.error(f"Error screening tickers: {e}")
+            candidates = self.active_symbols
+        
+        for symbol, frames in self.fetch_engine.iter_symbols(candidates, {'4h': self.fetch_limits['4h']}):
+            self.quick_check(symbol, frames.get('4h'))
+        self.notifier.flush()
+    
+    def forget_symbol(self, symbol):
+        """
+        Release the candles and indicator state of a dropped symbol. Its
+        alert history expires with the cooldowns, so a symbol that comes
+        straight back does not repeat its alerts.
+        """
+        self.candle_cache.evict(symbol)
+        self.level_index.evict(symbol)
+        for key in [k for k in self.rsi_states if k[0] == symbol]:
+            del self.rsi_states[key]
+    
+    def update_symbols(self, symbols):
+        """
+        Switch to a rediscovered watch list, keeping all state of surviving
+        symbols. Dropped symbols are released and new ones are warmed up in
+        the background, returns the SymbolDiff
+        """
+        diff = diff_symbols(self.active_symbols, symbols)
+        logger.info(f"Symbol refresh: {diff.summary()}")
+        if diff.added:
+            logger.info(f"Added: {', '.join(diff.added)}")
+        if diff.removed:
+            logger.info(f"Removed: {', '.join(diff.removed)}")
+        
+        for symbol in diff.removed:
+            self.forget_symbol(symbol)
+        self.active_symbols = list(symbols)
+        
+        if diff.added:
+            self.start_warm_up(diff.added)
+        return diff
+    
+    def start_warm_up(self, symbols):
+        """Warm up new symbols on a background thread"""
+        self.warm_up_thread = threading.Thread(target=self.warm_up_symbols, args=(symbols,),
+                                               name='symbol-warm-up', daemon=True)
+        self.warm_up_thread.start()
     
-    def send_notification(self, title, message):
-        """Send desktop notification"""
+    def warm_up_symbols(self, symbols):
+        """
+        Load new symbols' candles from disk and download the rest, then hand
+        them to the main loop (take_warmed_symbols) for their first full check
+        """
         try:
-            notification.notify(
-                title=title,
-                message=message,
-                app_name='Crypto Monitor',
-                timeout=10
-            )
+            self.candle_cache.warm_up(symbols, self.fetch_limits)
+            for _ in self.fetch_engine.iter_symbols(symbols, self.fetch_limits):
+                pass
         except Exception as e:
-            logger.error(f"Error sending notification: {e}")
+            logger.error(f"Error warming up new symbols: {e}")
+        
+        with self.warmed_lock:
+            self.warmed_symbols.extend(symbols)
+        logger.info(f"Warmed up {len(symbols)} new symbols")
+    
+    def take_warmed_symbols(self):
+        """Warmed-up new symbols still on the watch list, since the last call"""
+        with self.warmed_lock:
+            warmed, self.warmed_symbols = self.warmed_symbols, []
+        active = set(self.active_symbols)
+        for symbol in warmed:
+            # Dropped again by a refresh while it was warming up
+            if symbol not in active:
+                self.forget_symbol(symbol)
+        return [symbol for symbol in warmed if symbol in active]
     
     def run(self):
         """Main monitoring loop with automatic symbol discovery"""
@@ -350,7 +510,9 @@ class AutoCryptoMonitor:
         logger.info(f"Quote currencies: {', '.join(self.quote_currencies)}")
         logger.info(f"Minimum 24h volume: ${self.min_volume_24h:,.0f}")
         logger.info(f"Max symbols to monitor: {self.max_symbols}")
-        logger.info(f"Check interval: {self.check_interval} seconds")
+        logger.info(f"Check interval: {self.check_interval} seconds, full checks on candle closes")
+        logger.info(f"Fetch concurrency: {self.fetch_concurrency}")
+        self.start_metrics_server()
         
         # Initial symbol discovery
         self.active_symbols = self.discover_symbols()
@@ -360,109 +522,123 @@ class AutoCryptoMonitor:
             logger.error("No symbols discovered! Check your configuration.")
             return
         
+        # Warm up from the on-disk candle store, no network calls
+        self.candle_cache.warm_up(self.active_symbols, self.fetch_limits)
+        self.load_rsi_states()
+        
         cycle_count = 0
         
         while True:
             try:
-                # Refresh symbol list periodically
+                # Refresh symbol list periodically, survivors keep their state
                 if self.should_refresh_symbols():
                     logger.info("Refreshing symbol list...")
-                    self.active_symbols = self.discover_symbols()
+                    symbols = self.discover_symbols()
+                    if symbols:
+                        self.update_symbols(symbols)
                     self.last_symbol_refresh = time.time()
                 
-                cycle_count += 1
-                logger.info(f"=== Cycle {cycle_count}: Checking {len(self.active_symbols)} symbols ===")
-                
-                # Check each symbol
-                checked = 0
-                for symbol in self.active_symbols:
-                    self.check_symbol(symbol)
-                    checked += 1
+                # Full check when a candle closed, otherwise a cheap price check
+                closed = self.scheduler.closed_timeframes()
+                warmed = self.take_warmed_symbols()
+                if closed:
+                    if cycle_count:
+                        logger.info(f"Candle close: {', '.join(closed)}")
+                    cycle_count += 1
+                    logger.info(f"=== Cycle {cycle_count}: Checking {len(self.active_symbols)} symbols ===")
+                    
+                    cycle_start = time.time()
+                    self.run_full_cycle()
+                    self.scheduler.mark_full(cycle_start)
                     
-                    # Progress update every 10 symbols
-                    if checked % 10 == 0:
-                        logger.info(f"Progress: {checked}/{len(self.active_symbols)} symbols checked")
+                    elapsed = time.time() - cycle_start
+                    observe('stage_seconds', elapsed, stage='full_cycle')
+                    logger.info(f"Cycle {cycle_count} complete in {elapsed:.1f}s")
+                elif warmed:
+                    # First full check of symbols added by the last refresh
+                    logger.info(f"Checking {len(warmed)} new symbols")
+                    self.run_full_cycle(warmed)
+                else:
+                    check_start = time.time()
+                    self.run_price_check()
+                    self.scheduler.mark_checked(check_start)
                     
-                    time.sleep(1)  # Small delay to avoid rate limits
+                    elapsed = time.time() - check_start
+                    observe('stage_seconds', elapsed, stage='price_check')
+                    logger.info(f"Price check complete in {elapsed:.1f}s")
                 
-                logger.info(f"Cycle {cycle_count} complete. Waiting {self.check_interval} seconds...")
-                time.sleep(self.check_interval)
+                self.report_metrics()
+                delay = self.scheduler.sleep_time()
+                logger.info(f"Waiting {delay:.0f} seconds...")
+                time.sleep(delay)
                 
             except KeyboardInterrupt:
                 logger.info("Stopping Auto Crypto Monitor...")
+                self.notifier.close()
                 break
             except Exception as e:
                 logger.error(f"Error in main loop: {e}")
                 time.sleep(60)
     
+    def start_metrics_server(self):
+        """Serve the Prometheus metrics if METRICS_PORT is set"""
+        if self.metrics_port:
+            try:
+                start_server(self.metrics_port)
+            except OSError as e:
+                logger.error(f"Error starting metrics server on port {self.metrics_port}: {e}")
+    
+    def report_metrics(self):
+        """Update gauges, and log the metrics summary every METRICS_LOG_MINUTES"""
+        set_gauge('active_symbols', len(self.active_symbols))
+        if self.metrics_log_interval and time.time() - self.last_metrics_log >= self.metrics_log_interval:
+            self.last_metrics_log = time.time()
+            log_summary()
+    
     def discover_symbols(self):
         """Automatically discover all tradable symbols on the exchange"""
         logger.info("Discovering available cryptocurrencies...")
         
         try:
-            # Load markets
-            markets = self.exchange.load_markets()
-            
-            # Get tickers for volume filtering
-            logger.info("Fetching market data for volume filtering...")
-            tickers = self.exchange.fetch_tickers()
-            
-            discovered = []
-            
-            for symbol, market in markets.items():
-                # Skip if not active
-                if not market.get('active', True):
-                    continue
-                
-                # Filter by quote currency
-                quote = market.get('quote', '')
-                if quote not in self.quote_currencies:
-                    continue
-                
-                # Check if symbol has ticker data
-                if symbol not in tickers:
-                    continue
-                
-                ticker = tickers[symbol]
-                
-                # Filter by volume
-                volume_24h = ticker.get('quoteVolume', 0)
-                if volume_24h and volume_24h < self.min_volume_24h:
-                    continue
+            with stage('discovery'):
+                # Load markets, from the shared cache unless it has expired
+                markets = load_markets(self.exchange, self.exchange_name, self.markets_cache_ttl)
                 
-                # Filter by price (avoid extremely low-priced coins)
-                last_price = ticker.get('last', 0)
-                if last_price and last_price < self.min_price:
-                    continue
+                # Get tickers for volume filtering
+                logger.info("Fetching market data for volume filtering...")
+                tickers = self.exchange.fetch_tickers()
                 
-                # Add to discovered list
-                discovered.append({
-                    'symbol': symbol,
-                    'volume': volume_24h,
-                    'price': last_price,
-                    'quote': quote
-                })
-            
-            # Sort by volume (highest first) and limit
-            discovered.sort(key=lambda x: x['volume'], reverse=True)
-            discovered = discovered[:self.max_symbols]
-            
-            active_symbols = [item['symbol'] for item in discovered]
-            
-            logger.info(f"Discovered {len(active_symbols)} cryptocurrencies to monitor")
-            if active_symbols:
-                logger.info(f"Top 10 by volume: {', '.join(active_symbols[:10])}")
-            
-            # Save to cache
-            self.save_symbol_cache(discovered)
-            
-            return active_symbols
+                return self.select_symbols(markets, tickers)
             
         except Exception as e:
             logger.error(f"Error discovering symbols: {e}")
             # Try to load from cache
             return self.load_symbol_cache()
     
+    def select_symbols(self, markets, tickers):
+        """
+        Filter markets by quote currency, volume, price and the optional
+        spread/listing-age limits, keep the top MAX_SYMBOLS by volume
+        """
+        table = market_table(markets, tickers, self.quote_currencies)
+        mask = filter_mask(table, self.min_volume_24h, self.min_price, self.max_spread, self.min_listing_days)
+        selected = top_by_volume(table['volume'], mask, self.max_symbols)
+        
+        columns = [table[name][selected].tolist() for name in ('symbol', 'volume', 'last', 'quote')]
+        discovered = [{'symbol': symbol, 'volume': volume, 'price': price, 'quote': quote}
+                      for symbol, volume, price, quote in zip(*columns)]
+        
+        active_symbols = [item['symbol'] for item in discovered]
+        
+        logger.info(f"Discovered {len(active_symbols)} cryptocurrencies to monitor")
+        if active_symbols:
+            logger.info(f"Top 10 by volume: {', '.join(active_symbols[:10])}")
+        
+        # Save to cache
+        self.save_symbol_cache(discovered)
+        
+        return active_symbols
+    
     def save_symbol_cache(self, symbols_data):
         """Save discovered symbols to cache file"""
         try:
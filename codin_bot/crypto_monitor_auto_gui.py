@@ -6,6 +6,7 @@ from tkinter import ttk, scrolledtext, messagebox
 import threading
 import queue
 from crypto_monitor_auto import AutoCryptoMonitor
+from crypto_monitor_async import AsyncCryptoMonitor, async_mode_enabled
 import logging
 import os
 from dotenv import load_dotenv, set_key
@@ -252,7 +253,11 @@ class AutoCryptoMonitorGUI:
     def run_monitor(self):
         """Run the monitor in a separate thread"""
         try:
-            self.monitor = AutoCryptoMonitor()
+            # Async mode can be cancelled cleanly from the Stop button
+            if async_mode_enabled():
+                self.monitor = AsyncCryptoMonitor()
+            else:
+                self.monitor = AutoCryptoMonitor()
             self.monitor.run()
         
         except Exception as e:
@@ -268,6 +273,9 @@ class AutoCryptoMonitorGUI:
         self.is_running = False
         self.log_message("Stopping crypto monitor...")
         
+        if self.monitor and hasattr(self.monitor, 'stop'):
+            self.monitor.stop()
+        
         self.update_stopped_state()
     
     def update_stopped_state(self):
@@ -283,9 +291,9 @@ class AutoCryptoMonitorGUI:
         if self.is_running:
             self.update_symbols_display()
             
-            # Update alert count
-            if self.monitor and hasattr(self.monitor, 'last_alerts'):
-                alert_count = len(self.monitor.last_alerts)
+            # Update alert count: notifications actually delivered this session
+            if self.monitor and hasattr(self.monitor, 'notifier'):
+                alert_count = self.monitor.notifier.delivered()
                 self.alerts_count_label.config(text=f"Alerts Sent: {alert_count}")
             
             # Schedule next update
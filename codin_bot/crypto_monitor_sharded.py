@@ -0,0 +1,184 @@
+"""
+Cryptocurrency Price Monitor - sharded multi-process mode
+Splits the watch list across worker processes, each with its own exchange
+client, caches and RSI state. The coordinator schedules the checks, merges
+the workers' alert candidates and suppresses duplicates in one place.
+"""
+import logging
+import multiprocessing
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from crypto_monitor_auto import AutoCryptoMonitor
+from markets_cache import cached_markets
+from rate_limiter import set_budget_share
+from log_setup import listen_to_workers, log_to_queue, stop_listener
+
+logger = logging.getLogger(__name__)
+
+# Worker of the current process, created by _init_worker
+_worker = None
+
+
+def shard_of(symbol, shard_count):
+    """Stable shard index, so a symbol keeps its worker (and caches) across refreshes"""
+    return zlib.crc32(symbol.encode('utf-8')) % shard_count
+
+
+class ShardWorker(AutoCryptoMonitor):
+    """Checks one shard of symbols and hands alert candidates back instead of notifying"""
+    
+    def __init__(self, shard):
+        super().__init__()
+        self.shard = shard
+        if self.rsi_state_file:
+            base, ext = os.path.splitext(self.rsi_state_file)
+            self.rsi_state_file = f"{base}.shard{shard}{ext}"
+        self.load_rsi_states()
+        self.pending = []
+        
+        # Markets from the coordinator's cache file, instead of one download per worker
+        markets = cached_markets(self.exchange_name, self.markets_cache_ttl)
+        if markets:
+            self.exchange.set_markets(markets)
+    
+    def raise_alerts(self, symbol, current_price, near_levels, rsi_4h, rsi_1d):
+        self.pending.extend(self.evaluate_alerts(symbol, current_price, near_levels, rsi_4h, rsi_1d))
+    
+    def set_symbols(self, symbols):
+        """Take over the shard's symbols, warming up new ones from disk and releasing dropped ones"""
+        known = set(self.active_symbols)
+        current = set(symbols)
+        for symbol in known - current:
+            self.forget_symbol(symbol)
+        self.candle_cache.warm_up([s for s in symbols if s not in known], self.fetch_limits)
+        self.active_symbols = list(symbols)
+    
+    def take_pending(self):
+        """Alert candidates collected since the last call"""
+        pending, self.pending = self.pending, []
+        return pending
+
+
+def _init_worker(shard, shard_count, log_records):
+    global _worker
+    # Log through the coordinator, so one process writes (and rotates) the log files
+    log_to_queue(log_records)
+    # Every worker and the coordinator get an equal share of the exchange budget
+    set_budget_share(1.0 / (shard_count + 1))
+    _worker = ShardWorker(shard)
+
+
+def _full_cycle(symbols, check=None):
+    _worker.set_symbols(symbols)
+    _worker.run_full_cycle(check)
+    return _worker.take_pending()
+
+
+def _price_check(symbols, tickers):
+    _worker.set_symbols(symbols)
+    _worker.run_price_check(tickers)
+    return _worker.take_pending()
+
+
+class ShardedCryptoMonitor(AutoCryptoMonitor):
+    """
+    Same discovery, scheduling and alert semantics as AutoCryptoMonitor, with
+    the per-symbol work spread over PROCESS_SHARDS worker processes
+    """
+    
+    def __init__(self):
+        self.shard_count = max(1, int(os.getenv('PROCESS_SHARDS', 0)) or os.cpu_count() or 1)
+        set_budget_share(1.0 / (self.shard_count + 1))
+        super().__init__()
+        
+        # Candles and RSI state live in the workers
+        self.candle_cache.store = None
+        self.rsi_state_file = None
+        self.executors = []
+        self.log_listener = None
+    
+    def start_workers(self):
+        """One single-process pool per shard, so each shard always lands on the same worker"""
+        context = multiprocessing.get_context('spawn')
+        log_records = context.Queue()
+        self.log_listener = listen_to_workers(log_records)
+        self.executors = [
+            ProcessPoolExecutor(max_workers=1, mp_context=context,
+                                initializer=_init_worker, initargs=(shard, self.shard_count, log_records))
+            for shard in range(self.shard_count)
+        ]
+    
+    def stop_workers(self):
+        for executor in self.executors:
+            executor.shutdown(wait=True, cancel_futures=True)
+        self.executors = []
+        if self.log_listener is not None:
+            stop_listener(self.log_listener)
+            self.log_listener = None
+    
+    def shard_symbols(self, symbols):
+        """Split symbols into shard_count lists"""
+        shards = [[] for _ in range(self.shard_count)]
+        for symbol in symbols:
+            shards[shard_of(symbol, self.shard_count)].append(symbol)
+        return shards
+    
+    def gather(self, function, arguments):
+        """Run function(*args) on every shard in parallel, returns all alert candidates"""
+        futures = [executor.submit(function, *args) for executor, args in zip(self.executors, arguments)]
+        candidates = []
+        for shard, future in enumerate(futures):
+            try:
+                candidates.extend(future.result())
+            except Exception as e:
+                logger.error(f"Error in shard {shard}: {e}")
+        return candidates
+    
+    def run_full_cycle(self, symbols=None):
+        """Full check of every shard (or only `symbols`) in parallel, then central dedup and notification"""
+        shards = self.shard_symbols(self.active_symbols)
+        if symbols is None:
+            arguments = [(shard,) for shard in shards]
+        else:
+            arguments = list(zip(shards, self.shard_symbols(symbols)))
+        self.dispatch_alerts(self.gather(_full_cycle, arguments))
+        self.notifier.flush()
+    
+    def start_warm_up(self, symbols):
+        """Workers warm up their new symbols themselves, on the next set_symbols"""
+        with self.warmed_lock:
+            self.warmed_symbols.extend(symbols)
+    
+    def run_price_check(self, tickers=None):
+        """One fetch_tickers call for all shards, each worker screens its own symbols"""
+        try:
+            if tickers is None:
+                tickers = self.exchange.fetch_tickers()
+            # Workers only need the last price
+            tickers = {symbol: {'last': ticker.get('last')} for symbol, ticker in tickers.items()}
+        except Exception as e:
+            logger.error(f"Error fetching tickers: {e}")
+            tickers = None
+        
+        arguments = []
+        for symbols in self.shard_symbols(self.active_symbols):
+            shard_tickers = None if tickers is None else {s: tickers[s] for s in symbols if s in tickers}
+            arguments.append((symbols, shard_tickers))
+        self.dispatch_alerts(self.gather(_price_check, arguments))
+        self.notifier.flush()
+    
+    def run(self):
+        """Main monitoring loop, per-symbol work runs in the worker processes"""
+        logger.info(f"Starting {self.shard_count} worker processes...")
+        self.start_workers()
+        try:
+            super().run()
+        finally:
+            self.stop_workers()
+
+
+if __name__ == "__main__":
+    monitor = ShardedCryptoMonitor()
+    monitor.run()
@@ -0,0 +1,190 @@
+"""
+Cryptocurrency Price Monitor - WebSocket streaming mode
+Subscribes to kline streams with ccxt.pro (watch_ohlcv) instead of polling:
+every update is merged into the in-memory candles and checked against the
+RSI states and support/resistance levels as it lands, so alerts follow the
+price within seconds instead of up to CHECK_INTERVAL
+"""
+import asyncio
+import logging
+import os
+
+from crypto_monitor_async import AsyncCryptoMonitor
+from rate_limiter import AsyncRateLimitedExchange, get_limiter
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingCryptoMonitor(AsyncCryptoMonitor):
+    """
+    AsyncCryptoMonitor fed by WebSocket kline streams. REST is only used for
+    the initial history, for symbols added by a refresh and to catch up
+    after a reconnect. Pass a ready-made exchange client (for example
+    mock_exchange.MockStreamExchange) to stream from somewhere else than
+    ccxt.pro.
+    """
+    
+    streaming = True
+    
+    # 4h updates carry the live price, 1d closes move the RSI(1D) and the levels
+    stream_timeframes = ('4h', '1d')
+    
+    def __init__(self, symbols=None, exchange=None):
+        super().__init__(symbols)
+        self.stream_exchange = exchange
+        # Seconds before the first reconnect attempt, doubled up to the maximum
+        self.reconnect_delay = float(os.getenv('STREAM_RECONNECT_DELAY', 1))
+        self.max_reconnect_delay = float(os.getenv('STREAM_MAX_RECONNECT_DELAY', 60))
+        
+        # One task per (symbol, timeframe) stream
+        self.stream_tasks = {}
+        self.updates = 0
+    
+    async def open(self):
+        """Use the given exchange client, or create a ccxt.pro one"""
+        if self.stream_exchange is None:
+            await super().open()
+            return
+        exchange = self.stream_exchange
+        self.async_exchange = AsyncRateLimitedExchange(exchange, get_limiter(exchange.id, exchange))
+        self.fetch_semaphore = asyncio.Semaphore(self.fetch_concurrency)
+    
+    def check_cached(self, symbol):
+        """Full check of a symbol on its cached candles, no requests"""
+        frames = {timeframe: self.candle_cache.get(symbol, timeframe) for timeframe in self.fetch_limits}
+        self.check_symbol(symbol, frames, self.compute_rsi_batch({symbol: frames}).get(symbol))
+    
+    def on_candles(self, symbol, timeframe, rows):
+        """
+        Merge a streamed kline update and check the symbol right away: a full
+        check when a candle closed, a quick check on a 4h price update
+        Returns False if the update does not connect to the cached candles
+        """
+        cached = self.candle_cache.get(symbol, timeframe)
+        candles = self.candle_cache.merge(symbol, timeframe, rows[-2:], self.fetch_limits[timeframe])
+        if candles is None:
+            return False
+        self.updates += 1
+        
+        if candles['timestamp'][-1] > cached['timestamp'][-1]:
+            # A new candle opened, so the previous one is final
+            if self.candle_cache.store is not None:
+                self.candle_cache.store.write(self.exchange_name, symbol, timeframe, candles[-2:])
+            self.check_cached(symbol)
+        elif timeframe == '4h':
+            self.quick_check(symbol, candles)
+        return True
+    
+    async def catch_up(self, symbol, timeframe):
+        """Fetch candles missed while not streaming, full check if one closed meanwhile"""
+        before = self.candle_cache.get(symbol, timeframe)
+        candles = await self.fetch_ohlcv_async(symbol, timeframe, limit=self.fetch_limits[timeframe])
+        if candles is not None and len(candles) and (before is None or len(before) == 0
+                                                     or candles['timestamp'][-1] > before['timestamp'][-1]):
+            self.check_cached(symbol)
+    
+    async def stream_symbol(self, symbol, timeframe):
+        """Watch one kline stream forever, reconnecting with backoff"""
+        delay = self.reconnect_delay
+        while True:
+            try:
+                rows = await self.async_exchange.watch_ohlcv(symbol, timeframe)
+                delay = self.reconnect_delay
+                if not self.on_candles(symbol, timeframe, rows):
+                    await self.catch_up(symbol, timeframe)
+            
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("%s %s stream lost (%s), reconnecting in %.1fs", symbol, timeframe, e, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                # The next watch_ohlcv reconnects and subscribes again
+                try:
+                    await self.catch_up(symbol, timeframe)
+                except Exception as e:
+                    logger.debug("Error catching up %s %s: %s", symbol, timeframe, e)
+    
+    def start_streams(self, symbols):
+        """Subscribe to the kline streams of symbols not streamed yet"""
+        for symbol in symbols:
+            for timeframe in self.stream_timeframes:
+                if (symbol, timeframe) not in self.stream_tasks:
+                    self.stream_tasks[(symbol, timeframe)] = asyncio.ensure_future(self.stream_symbol(symbol, timeframe))
+    
+    def stop_streams(self, symbols=None):
+        """Cancel the streams of symbols, or all of them"""
+        for key in [k for k in self.stream_tasks if symbols is None or k[0] in symbols]:
+            self.stream_tasks.pop(key).cancel()
+    
+    def forget_symbol(self, symbol):
+        self.stop_streams([symbol])
+        super().forget_symbol(symbol)
+    
+    async def run_async(self):
+        """Initial REST cycle, then stream until cancelled"""
+        self._loop = asyncio.get_running_loop()
+        self._main_task = asyncio.current_task()
+        
+        logger.info("Starting Streaming Crypto Monitor...")
+        logger.info(f"Exchange: {self.exchange_name}")
+        logger.info(f"Streams: {', '.join(self.stream_timeframes)} klines per symbol")
+        self.start_metrics_server()
+        
+        await self.open()
+        try:
+            await self.refresh_symbols_async()
+            
+            if not self.active_symbols:
+                logger.error("No symbols discovered! Check your configuration.")
+                return
+            
+            self.candle_cache.warm_up(self.active_symbols, self.fetch_limits)
+            self.load_rsi_states()
+            
+            # History, RSI states and levels over REST once, then streams keep them current
+            await self.run_cycle()
+            self.start_streams(self.active_symbols)
+            logger.info(f"Streaming {len(self.stream_tasks)} kline feeds for {len(self.active_symbols)} symbols")
+            
+            while True:
+                try:
+                    await asyncio.sleep(self.check_interval)
+                    
+                    if self.fixed_symbols is None and self.should_refresh_symbols():
+                        logger.info("Refreshing symbol list...")
+                        await self.refresh_symbols_async()
+                    
+                    # Symbols added by a refresh start streaming after their first check
+                    warmed = self.take_warmed_symbols()
+                    if warmed:
+                        logger.info(f"Checking {len(warmed)} new symbols")
+                        await self.run_cycle(warmed)
+                        self.start_streams(warmed)
+                    
+                    self.save_rsi_states()
+                    self.report_metrics()
+                    logger.info(f"{self.updates} kline updates from {len(self.stream_tasks)} feeds")
+                    self.updates = 0
+                
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error in main loop: {e}")
+        
+        except asyncio.CancelledError:
+            logger.info("Stopping Streaming Crypto Monitor...")
+        finally:
+            tasks = list(self.stream_tasks.values())
+            self.stop_streams()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if self.warm_up_task is not None:
+                self.warm_up_task.cancel()
+                self.warm_up_task = None
+            await self.close()
+            self._main_task = None
+
+
+if __name__ == "__main__":
+    monitor = StreamingCryptoMonitor()
+    monitor.run()
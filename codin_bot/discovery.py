@@ -0,0 +1,109 @@
+"""
+Vectorized symbol discovery
+Market metadata is read into columns once per markets dict (it is cached
+for hours, see markets_cache.py), so each discovery only reads the tickers
+of active markets in the wanted quote currencies. Every filter is a numpy
+mask and the top-N by volume is a partial selection instead of a full sort.
+"""
+import threading
+import time
+import numpy as np
+
+DAY_MS = 86400 * 1000
+
+# Columns of the last markets dict seen, reused while it is the same object
+_market_columns = {'markets': None, 'columns': None}
+_market_columns_lock = threading.Lock()
+
+
+def _column(rows, field):
+    """One float column from a list of dicts, missing or None values as 0"""
+    return np.fromiter((row.get(field) or 0 for row in rows), dtype=np.float64, count=len(rows))
+
+
+def market_columns(markets):
+    """symbol, quote, active and created (listing time in ms, 0 if unknown) of every market"""
+    with _market_columns_lock:
+        if _market_columns['markets'] is markets:
+            return _market_columns['columns']
+        
+        rows = list(markets.values())
+        columns = {
+            'symbol': np.array(list(markets), dtype=object),
+            'quote': np.array([market.get('quote', '') for market in rows], dtype=object),
+            'active': np.fromiter((bool(market.get('active', True)) for market in rows),
+                                  dtype=bool, count=len(rows)),
+            'created': _column(rows, 'created'),
+        }
+        _market_columns['markets'] = markets
+        _market_columns['columns'] = columns
+        return columns
+
+
+def market_table(markets, tickers, quote_currencies):
+    """
+    One row per active market quoted in one of quote_currencies that has a
+    ticker, in markets order. Adds volume (quoteVolume) and last from the
+    tickers to market_columns, missing numbers are 0, and keeps the ticker
+    dicts in 'tickers' for filters on other fields
+    """
+    columns = market_columns(markets)
+    rows = np.flatnonzero(columns['active'] & np.isin(columns['quote'], list(quote_currencies)))
+    rows = np.array([row for row, symbol in zip(rows.tolist(), columns['symbol'][rows].tolist())
+                     if symbol in tickers], dtype=np.intp)
+    
+    table = {name: column[rows] for name, column in columns.items()}
+    table['tickers'] = [tickers[symbol] for symbol in table['symbol'].tolist()]
+    table['volume'] = _column(table['tickers'], 'quoteVolume')
+    table['last'] = _column(table['tickers'], 'last')
+    return table
+
+
+def filter_mask(table, min_volume=0, min_price=0, max_spread=None, min_listing_days=None, now_ms=None):
+    """
+    Rows passing the volume, price and optional spread/listing-age filters
+    Missing volume, price, bid/ask or listing time never exclude a market,
+    only known values beyond a limit do
+    """
+    volume = table['volume']
+    last = table['last']
+    mask = (volume == 0) | (volume >= min_volume)
+    mask &= (last == 0) | (last >= min_price)
+    
+    if max_spread is not None:
+        bid, ask = _column(table['tickers'], 'bid'), _column(table['tickers'], 'ask')
+        quoted = (bid > 0) & (ask > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            spread = (ask - bid) / ((ask + bid) / 2)
+        mask &= ~quoted | (spread <= max_spread)
+    
+    if min_listing_days:
+        created = table['created']
+        now_ms = time.time() * 1000 if now_ms is None else now_ms
+        listed_before = now_ms - min_listing_days * DAY_MS
+        mask &= (created == 0) | (created <= listed_before)
+    
+    return mask
+
+
+def top_by_volume(volume, mask, count):
+    """
+    Indices of the `count` highest-volume rows passing the mask, highest
+    first. Equal volumes keep table order, like a stable sort, but only the
+    selected rows are ever sorted.
+    """
+    candidates = np.flatnonzero(mask)
+    if count <= 0 or len(candidates) == 0:
+        return candidates[:0]
+    
+    values = volume[candidates]
+    if len(candidates) > count:
+        # Volume of the count-th row, then every row above it plus the first ties
+        kth = np.partition(values, len(values) - count)[len(values) - count]
+        above = values > kth
+        ties = np.flatnonzero(values == kth)[:count - int(above.sum())]
+        keep = np.concatenate([np.flatnonzero(above), ties])
+        candidates, values = candidates[keep], values[keep]
+    
+    order = np.lexsort((candidates, -values))
+    return candidates[order]
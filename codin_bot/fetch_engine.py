@@ -0,0 +1,71 @@
+"""
+Concurrent OHLCV fetch engine
+Runs many fetch_ohlcv requests in parallel under a concurrency limit
+Rate limiting is left to the exchange wrapper (see rate_limiter.py), and
+with a CandleCache only candles newer than the cached ones are downloaded
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+
+class OHLCVFetchEngine:
+    def __init__(self, exchange, max_workers=10, cache=None):
+        self.exchange = exchange
+        self.cache = cache
+        self.max_workers = max(1, int(max_workers))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                           thread_name_prefix='ohlcv-fetch')
+        
+    
+    def fetch(self, symbol, timeframe, limit=100):
+        """Fetch OHLCV candles for one symbol/timeframe"""
+        if self.cache is not None:
+            return self.cache.fetch(self.exchange, symbol, timeframe, limit)
+        return self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+    
+    def iter_symbols(self, symbols, timeframes, limit=100):
+        """
+        Fetch every timeframe of every symbol concurrently
+        timeframes may be a list, or a {timeframe: limit} dict
+        Yields (symbol, {timeframe: rows or None}) as soon as all timeframes
+        of a symbol have arrived
+        """
+        if not isinstance(timeframes, dict):
+            timeframes = {timeframe: limit for timeframe in timeframes}
+        futures = {}
+        pending = {}
+        
+        for symbol in symbols:
+            pending[symbol] = {}
+            for timeframe, window in timeframes.items():
+                future = self.executor.submit(self.fetch, symbol, timeframe, window)
+                futures[future] = (symbol, timeframe)
+        
+        try:
+            for future in as_completed(futures):
+                symbol, timeframe = futures[future]
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    logger.debug("Error fetching data for %s %s: %s", symbol, timeframe, e)
+                    rows = None
+                
+                frames = pending[symbol]
+                frames[timeframe] = rows
+                if len(frames) == len(timeframes):
+                    del pending[symbol]
+                    yield symbol, frames
+        finally:
+            # Drop queued requests if the consumer stops early
+            for future in futures:
+                future.cancel()
+    
+    def fetch_symbols(self, symbols, timeframes, limit=100):
+        """Fetch every timeframe of every symbol, returns {symbol: {timeframe: rows}}"""
+        return dict(self.iter_symbols(symbols, timeframes, limit))
+    
+    def shutdown(self):
+        """Stop the worker threads"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,397 @@
+"""
+Vectorized technical indicators shared by the monitors
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Closes the monitors compute RSI over, the forming candle included
+RSI_WINDOW = 100
+
+
+def wilder_averages(closes, period=6):
+    """
+    Wilder-smoothed average gain and loss after the last bar, for every row
+    of a 2-D array (symbols x bars). The smoothing runs once over the bars
+    for all symbols together, with the same operations in the same order as
+    the original per-symbol loop, so results are identical to it.
+    Returns (avg_gain, avg_loss, pinned), pinned marking rows whose first
+    `period` deltas had no losses, or None if there are too few bars
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    if closes.ndim == 1:
+        closes = closes[np.newaxis, :]
+    
+    if closes.shape[1] < period + 1:
+        return None
+    
+    deltas = np.diff(closes, axis=1)
+    gains = np.where(deltas > 0, deltas, 0)
+    losses = np.where(deltas < 0, -deltas, 0)
+    
+    avg_gain = np.mean(gains[:, :period], axis=1)
+    avg_loss = np.mean(losses[:, :period], axis=1)
+    pinned = avg_loss == 0
+    
+    for i in range(period, deltas.shape[1]):
+        avg_gain = (avg_gain * (period - 1) + gains[:, i]) / period
+        avg_loss = (avg_loss * (period - 1) + losses[:, i]) / period
+    
+    return avg_gain, avg_loss, pinned
+
+
+def rsi_last(closes, period=6):
+    """
+    Wilder RSI of the last bar for every row of a 2-D array (symbols x bars)
+    Identical to the original per-symbol loop: rows whose first `period`
+    deltas had no losses are pinned at 100, and arrays too short for one
+    RSI value give 50
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    if closes.ndim == 1:
+        closes = closes[np.newaxis, :]
+    
+    averages = wilder_averages(closes, period)
+    if averages is None:
+        return np.full(closes.shape[0], 50.0)
+    avg_gain, avg_loss, pinned = averages
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+    rsi[avg_loss == 0] = 100
+    rsi[pinned] = 100
+    return rsi
+
+
+def rsi_last_many(series, period=6):
+    """
+    Last RSI value of each close series in a list of any lengths
+    Series of equal length are stacked and computed in one rsi_last call
+    """
+    results = np.empty(len(series))
+    by_length = {}
+    for i, closes in enumerate(series):
+        by_length.setdefault(len(closes), []).append(i)
+    
+    for indices in by_length.values():
+        results[indices] = rsi_last(np.stack([series[i] for i in indices]), period)
+    return results
+
+
+def rsi_series(closes, period=6, window=RSI_WINDOW):
+    """
+    RSI after every bar of a close series as the monitors compute it: the
+    rsi_last of the last `window` closes up to that bar, or of all of them
+    while there are fewer
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    rsi = np.empty(len(closes))
+    head = min(window - 1, len(closes))
+    rsi[:head] = rsi_last_many([closes[:i + 1] for i in range(head)], period)
+    if len(closes) >= window:
+        rsi[head:] = rsi_last(sliding_window_view(closes, window), period)
+    return rsi
+
+
+def rsi_peek_series(closes, committed, prices, period=6, window=RSI_WINDOW):
+    """
+    Provisional RSI for many (committed bar, price) pairs of one series:
+    RSI of the last `window` closes if the bar after closes[committed]
+    closed at price, what the monitors give for the forming candle
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    committed = np.asarray(committed, dtype=np.intp)
+    prices = np.asarray(prices, dtype=np.float64)
+    rsi = np.empty(len(committed))
+    
+    # Full windows: window - 1 committed closes, then the price
+    full = committed >= window - 2
+    if full.any():
+        past = sliding_window_view(closes, window - 1)[committed[full] - (window - 2)]
+        rsi[full] = rsi_last(np.column_stack([past, prices[full]]), period)
+    
+    short = np.flatnonzero(~full)
+    if len(short):
+        rsi[short] = rsi_last_many([np.r_[closes[:committed[i] + 1], prices[i]] for i in short], period)
+    return rsi
+
+
+def pivot_bars(highs, lows, window=5):
+    """
+    Indices of pivot highs and pivot lows: bars whose high/low is the
+    extreme of the 2 * window + 1 bars centred on them
+    """
+    highs = np.asarray(highs, dtype=np.float64)
+    lows = np.asarray(lows, dtype=np.float64)
+    span = 2 * window + 1
+    if len(highs) < span:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    
+    centre = slice(window, len(highs) - window)
+    peaks = np.flatnonzero(highs[centre] == sliding_window_view(highs, span).max(axis=1)) + window
+    troughs = np.flatnonzero(lows[centre] == sliding_window_view(lows, span).min(axis=1)) + window
+    return peaks, troughs
+
+
+def sort_levels(prices, bars, is_resistance):
+    """
+    Order pivots by price, then bar, resistance before support on the same
+    bar: the order a bar-by-bar scan followed by a stable sort gives
+    """
+    order = np.lexsort((~is_resistance, bars, prices))
+    return prices[order], is_resistance[order]
+
+
+def pivot_levels(highs, lows, window=5):
+    """
+    Pivot highs (resistance) and pivot lows (support)
+    Returns (prices, is_resistance) sorted with sort_levels
+    """
+    highs = np.asarray(highs, dtype=np.float64)
+    lows = np.asarray(lows, dtype=np.float64)
+    peaks, troughs = pivot_bars(highs, lows, window)
+    
+    prices = np.concatenate([highs[peaks], lows[troughs]])
+    bars = np.concatenate([peaks, troughs])
+    is_resistance = np.r_[np.ones(len(peaks), dtype=bool), np.zeros(len(troughs), dtype=bool)]
+    return sort_levels(prices, bars, is_resistance)
+
+
+def cluster_levels(prices, is_resistance, threshold=0.02):
+    """
+    Merge sorted levels lying within `threshold` of the first level of their
+    cluster, in one pass. Each cluster becomes (mean price, majority type);
+    an even split takes the type of its lowest level.
+    """
+    if len(prices) == 0:
+        return []
+    
+    starts = [0]
+    anchor = prices[0]
+    for i, price in enumerate(prices.tolist()[1:], 1):
+        if abs(price - anchor) / anchor >= threshold:
+            starts.append(i)
+            anchor = price
+    
+    ends = starts[1:] + [len(prices)]
+    resistance_counts = np.add.reduceat(is_resistance.astype(np.int64), starts)
+    
+    clustered = []
+    for start, end, resistances in zip(starts, ends, resistance_counts.tolist()):
+        supports = end - start - resistances
+        if resistances == supports:
+            level_type = 'resistance' if is_resistance[start] else 'support'
+        else:
+            level_type = 'resistance' if resistances > supports else 'support'
+        clustered.append((np.mean(prices[start:end]), level_type))
+    return clustered
+
+
+def support_resistance(highs, lows, threshold=0.02, window=5):
+    """
+    Support and resistance levels from pivot points
+    Returns list of (level, type) tuples sorted by level
+    """
+    prices, is_resistance = pivot_levels(highs, lows, window)
+    return cluster_levels(prices, is_resistance, threshold)
+
+
+def _loss_free(closes, period):
+    """True if the first `period` deltas of closes have no losses, rsi_last pins such a window at 100"""
+    head = np.asarray(closes[:period + 1], dtype=np.float64)
+    return len(head) == period + 1 and bool((np.diff(head) >= 0).all())
+
+
+class RSIState:
+    """
+    Streaming Wilder RSI for one symbol/timeframe
+    update() commits a closed candle in O(1); peek() gives the provisional
+    RSI for the still-forming candle without changing the committed state.
+    Like rsi_last over the last `window` closes, RSI is 100 while the first
+    `period` deltas of that window have no losses; otherwise it is the
+    Wilder RSI, which matches rsi_last exactly as long as the closes fit in
+    `window` and converges to the RSI of the last `window` closes after.
+    """
+    
+    __slots__ = ('period', 'window', 'avg_gain', 'avg_loss', 'pinned', 'next_pinned', 'bars',
+                 'last_close', 'timestamp', 'seed')
+    
+    def __init__(self, period=6, window=RSI_WINDOW):
+        self.period = period
+        self.window = window
+        self.avg_gain = None
+        self.avg_loss = None
+        # The window of the last committed close, and of the forming candle,
+        # opens with `period` loss-free deltas; None when not known
+        self.pinned = False
+        self.next_pinned = False
+        # Closes committed since the first one of the seed
+        self.bars = 0
+        self.last_close = None
+        # Open time of the last committed candle
+        self.timestamp = None
+        # (gain, loss) of the first deltas until `period` of them are known
+        self.seed = []
+    
+    @classmethod
+    def from_history(cls, closes, timestamp, period=6, window=RSI_WINDOW):
+        """State after committing a series of closed candles"""
+        return cls.from_history_many([closes], [timestamp], period, window)[0]
+    
+    @classmethod
+    def from_history_many(cls, series, timestamps, period=6, window=RSI_WINDOW):
+        """
+        States for many close series at once, series of equal length are
+        seeded with one vectorized wilder_averages call
+        """
+        states = [cls(period, window) for _ in series]
+        by_length = {}
+        for i, closes in enumerate(series):
+            by_length.setdefault(len(closes), []).append(i)
+        
+        for indices in by_length.values():
+            stacked = np.stack([np.asarray(series[i], dtype=np.float64) for i in indices])
+            averages = wilder_averages(stacked, period)
+            for row, i in enumerate(indices):
+                state = states[i]
+                if averages is None:
+                    # Too short to seed, replay the few closes there are
+                    for close in stacked[row]:
+                        state.update(close)
+                else:
+                    state.avg_gain = averages[0][row]
+                    state.avg_loss = averages[1][row]
+                    state.bars = stacked.shape[1]
+                    state.pinned = _loss_free(stacked[row, -window:], period)
+                    state.next_pinned = state._window_pinned(stacked[row])
+                    state.last_close = stacked[row, -1]
+                state.timestamp = timestamps[i]
+        return states
+    
+    def _window_pinned(self, closes):
+        """
+        Pin of the forming candle after the committed `closes` (all of them
+        since the seed, or at least the last window - 1), None if they do
+        not reach back to the start of its window
+        """
+        if self.bars < self.window:
+            # The window still opens with the seed
+            return _loss_free(closes[-self.bars:], self.period)
+        if len(closes) < self.window - 1:
+            return None
+        return _loss_free(closes[-(self.window - 1):], self.period)
+    
+    def _step(self, close):
+        """Averages after one more close, without mutating the state"""
+        delta = close - self.last_close
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        
+        if self.avg_gain is None:
+            seed = self.seed + [(gain, loss)]
+            if len(seed) < self.period:
+                return None, None, seed
+            avg_gain = np.mean([g for g, _ in seed])
+            avg_loss = np.mean([l for _, l in seed])
+            return avg_gain, avg_loss, []
+        
+        avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+        avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+        return avg_gain, avg_loss, self.seed
+    
+    @staticmethod
+    def _rsi(avg_gain, avg_loss, pinned):
+        if avg_gain is None:
+            return 50.0
+        if pinned or avg_loss == 0:
+            return 100.0
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+    
+    def update(self, close, timestamp=None):
+        """
+        Commit a closed candle. Once the seed no longer opens the window,
+        the next pin is only known when advance() sets it from the candles.
+        """
+        if self.last_close is not None:
+            self.avg_gain, self.avg_loss, self.seed = self._step(close)
+        self.pinned = self.next_pinned
+        self.bars += 1
+        self.last_close = close
+        if self.bars == self.period + 1:
+            # The seed is complete, its window opens with it until `window` closes
+            self.next_pinned = self.avg_loss == 0
+        elif self.bars >= self.window:
+            self.next_pinned = None
+        if timestamp is not None:
+            self.timestamp = timestamp
+    
+    def value(self):
+        """RSI as of the last committed candle"""
+        return self._rsi(self.avg_gain, self.avg_loss, self.pinned)
+    
+    def peek(self, close):
+        """Provisional RSI if the forming candle closed at `close`"""
+        if self.last_close is None:
+            return 50.0
+        return self._rsi(*self._step(close)[:2], self.next_pinned)
+    
+    def advance(self, candles):
+        """
+        Commit closed candles (OHLCV_DTYPE array) newer than the state, and
+        pin the forming candle from the first deltas of its window
+        Returns False if the last committed candle is not among them, or
+        they do not reach back to the start of the window, in which case
+        the state has to be seeded again
+        """
+        if self.timestamp is None or len(candles) == 0:
+            return False
+        timestamps = candles['timestamp']
+        index = int(np.searchsorted(timestamps, self.timestamp))
+        if index == len(timestamps) or timestamps[index] != self.timestamp:
+            return False
+        
+        closes = candles['close']
+        # First candle whose window starts after the seed, the pins come from the candles from there on
+        first = index + 1 + max(0, self.window - self.bars)
+        if first <= len(candles) < self.window - 1:
+            return False
+        for i in range(index + 1, len(candles)):
+            if i >= first:
+                self.next_pinned = self._window_pinned(closes[:i])
+            self.update(float(closes[i]), int(timestamps[i]))
+        if len(candles) >= first:
+            self.next_pinned = self._window_pinned(closes)
+        return True
+    
+    def to_dict(self):
+        """JSON-serializable snapshot"""
+        return {
+            'period': self.period,
+            'window': self.window,
+            'avg_gain': None if self.avg_gain is None else float(self.avg_gain),
+            'avg_loss': None if self.avg_loss is None else float(self.avg_loss),
+            'pinned': None if self.pinned is None else bool(self.pinned),
+            'next_pinned': None if self.next_pinned is None else bool(self.next_pinned),
+            'bars': self.bars,
+            'last_close': None if self.last_close is None else float(self.last_close),
+            'timestamp': None if self.timestamp is None else int(self.timestamp),
+            'seed': [[float(g), float(l)] for g, l in self.seed],
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Restore a snapshot made by to_dict()"""
+        state = cls(data.get('period', 6), data.get('window', RSI_WINDOW))
+        state.avg_gain = data.get('avg_gain')
+        state.avg_loss = data.get('avg_loss')
+        state.last_close = data.get('last_close')
+        state.timestamp = data.get('timestamp')
+        state.seed = [tuple(pair) for pair in data.get('seed', [])]
+        if 'next_pinned' in data:
+            state.pinned = data['pinned']
+            state.next_pinned = data['next_pinned']
+            state.bars = data['bars']
+        else:
+            # Older snapshots: the pins are taken from the candles on the next advance()
+            state.pinned = state.next_pinned = None
+            state.bars = state.window
+        return state
@@ -0,0 +1,136 @@
+"""
+Incrementally maintained support/resistance levels
+A pivot only depends on the bars within `window` of it, so when new candles
+arrive only the pivots near them are re-evaluated. Levels are kept sorted
+so finding the ones near a price is a binary search.
+"""
+import numpy as np
+
+from indicators import pivot_bars, sort_levels, cluster_levels
+
+
+class SeriesLevels:
+    """Pivots and clustered levels of one symbol/timeframe"""
+    
+    __slots__ = ('first_ts', 'last_ts', 'last_high', 'last_low',
+                 'pivot_ts', 'pivot_prices', 'pivot_is_resistance',
+                 'threshold', 'levels', 'prices')
+    
+    def __init__(self):
+        self.first_ts = None
+        self.last_ts = None
+        self.last_high = None
+        self.last_low = None
+        self.pivot_ts = np.empty(0, dtype=np.int64)
+        self.pivot_prices = np.empty(0)
+        self.pivot_is_resistance = np.empty(0, dtype=bool)
+        self.threshold = None
+        # [(level, type)] sorted by level, and the level prices alone
+        self.levels = []
+        self.prices = np.empty(0)
+
+
+class LevelIndex:
+    def __init__(self, window=5, min_bars=0):
+        self.window = window
+        # Series shorter than this have no levels
+        self.min_bars = min_bars
+        self._series = {}
+    
+    def levels(self, symbol, timeframe):
+        """Current [(level, type)] of a symbol/timeframe"""
+        entry = self._series.get((symbol, timeframe))
+        return entry.levels if entry is not None else []
+    
+    def evict(self, symbol):
+        """Drop every timeframe indexed for a symbol"""
+        for key in [k for k in self._series if k[0] == symbol]:
+            del self._series[key]
+    
+    def update(self, symbol, timeframe, candles, threshold=0.02):
+        """
+        Bring the levels of a symbol/timeframe up to date with `candles`
+        (OHLCV_DTYPE array, oldest first). Returns [(level, type)], the same
+        as support_resistance() over the whole array.
+        """
+        key = (symbol, timeframe)
+        entry = self._series.get(key)
+        if entry is None or len(candles) < max(self.min_bars, 1):
+            entry = self._series[key] = SeriesLevels()
+            if len(candles) < max(self.min_bars, 1):
+                return entry.levels
+        
+        changed = self._changed_from(entry, candles)
+        if changed is None and threshold == entry.threshold:
+            return entry.levels
+        
+        if changed is not None:
+            self._repivot(entry, candles, changed)
+        prices, is_resistance = sort_levels(entry.pivot_prices, entry.pivot_ts, entry.pivot_is_resistance)
+        entry.levels = cluster_levels(prices, is_resistance, threshold)
+        entry.prices = np.array([level for level, _ in entry.levels])
+        entry.threshold = threshold
+        return entry.levels
+    
+    def near(self, symbol, timeframe, price, threshold=0.02):
+        """Levels within `threshold` of price, [(level, type)] sorted by level"""
+        entry = self._series.get((symbol, timeframe))
+        if entry is None or not entry.levels:
+            return []
+        
+        # abs(price - level) / level < threshold  <=>  price / (1 + t) < level < price / (1 - t)
+        # The bounds only narrow the search, one extra level on each side absorbs rounding
+        low = max(int(np.searchsorted(entry.prices, price / (1 + threshold), side='left')) - 1, 0)
+        upper = price / (1 - threshold) if threshold < 1 else np.inf
+        high = int(np.searchsorted(entry.prices, upper, side='right')) + 1
+        return [(level, level_type) for level, level_type in entry.levels[low:high]
+                if abs(price - level) / level < threshold]
+    
+    def _changed_from(self, entry, candles):
+        """
+        Index of the first bar that differs from what the entry has seen, or
+        None if nothing changed. Bars before the last seen one are closed
+        and assumed unchanged.
+        """
+        timestamps = candles['timestamp']
+        if entry.last_ts is None or timestamps[0] < entry.first_ts:
+            return 0
+        
+        index = int(np.searchsorted(timestamps, entry.last_ts))
+        if index == len(timestamps) or timestamps[index] != entry.last_ts:
+            return 0
+        
+        same_bar = candles['high'][index] == entry.last_high and candles['low'][index] == entry.last_low
+        if same_bar and index == len(candles) - 1 and timestamps[0] == entry.first_ts:
+            return None
+        return index + 1 if same_bar else index
+    
+    def _repivot(self, entry, candles, changed):
+        """Keep pivots unaffected by bars from `changed` on, re-evaluate the rest"""
+        window = self.window
+        count = len(candles)
+        timestamps = candles['timestamp']
+        
+        # Centre bars whose window reaches a changed bar
+        redo_from = max(window, changed - window)
+        
+        bars = np.searchsorted(timestamps, entry.pivot_ts)
+        inside = np.minimum(bars, count - 1)
+        keep = ((bars >= window) & (bars < min(redo_from, count - window))
+                & (timestamps[inside] == entry.pivot_ts))
+        
+        offset = redo_from - window
+        recent = candles[offset:]
+        peaks, troughs = pivot_bars(recent['high'], recent['low'], window)
+        
+        entry.pivot_ts = np.concatenate([
+            entry.pivot_ts[keep], timestamps[peaks + offset], timestamps[troughs + offset]])
+        entry.pivot_prices = np.concatenate([
+            entry.pivot_prices[keep], recent['high'][peaks], recent['low'][troughs]])
+        entry.pivot_is_resistance = np.concatenate([
+            entry.pivot_is_resistance[keep], np.ones(len(peaks), dtype=bool), np.zeros(len(troughs), dtype=bool)])
+        
+        entry.first_ts = int(timestamps[0])
+        entry.last_ts = int(timestamps[-1])
+        entry.last_high = candles['high'][-1]
+        entry.last_low = candles['low'][-1]
@@ -0,0 +1,123 @@
+"""
+Non-blocking logging for the monitors
+A log call only puts the record on a queue; a QueueListener thread formats
+it and writes it to the console and a size-rotated log file, so disk and
+terminal I/O never run on the scan path. Optionally every symbol check is
+also written as one compact JSON line to CHECK_LOG_FILE.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Per-check JSON records, kept out of the main log and off unless CHECK_LOG_FILE is set
+check_logger = logging.getLogger('crypto_monitor.checks')
+check_logger.propagate = False
+check_logger.setLevel(logging.CRITICAL + 1)
+
+_listeners = []
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line: the record time and its `check` fields"""
+    
+    def format(self, record):
+        data = {'ts': round(record.created, 3)}
+        data.update(getattr(record, 'check', None) or {'message': record.getMessage()})
+        return json.dumps(data, separators=(',', ':'), default=str)
+
+
+class _Forward(logging.Handler):
+    """Hands records from worker processes to the logger they were logged on"""
+    
+    def emit(self, record):
+        logging.getLogger(record.name).handle(record)
+
+
+def _listen(source, handlers):
+    listener = logging.handlers.QueueListener(source, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+    return listener
+
+
+def _queue_to(logger, handlers):
+    """Route the logger's records through a queue to a listener thread writing to handlers"""
+    records = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    _listen(records, handlers)
+
+
+def setup_logging(log_file=None, max_bytes=None, backups=None, check_log_file=None, level=None):
+    """
+    Configure logging once per process; like basicConfig, nothing changes if
+    the root logger already has handlers. Unset arguments come from LOG_FILE,
+    LOG_MAX_BYTES, LOG_BACKUPS, CHECK_LOG_FILE and LOG_LEVEL.
+    """
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    
+    log_file = log_file if log_file is not None else os.getenv('LOG_FILE', 'crypto_monitor.log')
+    max_bytes = max_bytes if max_bytes is not None else int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+    backups = backups if backups is not None else int(os.getenv('LOG_BACKUPS', 5))
+    check_log_file = check_log_file if check_log_file is not None else os.getenv('CHECK_LOG_FILE', '')
+    root.setLevel(level or os.getenv('LOG_LEVEL', 'INFO').upper())
+    
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backups,
+                                                             encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    _queue_to(root, handlers)
+    
+    if check_log_file:
+        handler = logging.handlers.RotatingFileHandler(check_log_file, maxBytes=max_bytes, backupCount=backups,
+                                                       encoding='utf-8')
+        handler.setFormatter(JsonLinesFormatter())
+        check_logger.setLevel(logging.INFO)
+        _queue_to(check_logger, [handler])
+
+
+def stop_logging():
+    """Write out every queued record and stop the listener threads"""
+    while _listeners:
+        listener = _listeners.pop()
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+atexit.register(stop_logging)
+
+
+def log_check(**fields):
+    """One JSON-lines record for a symbol check, free when CHECK_LOG_FILE is not set"""
+    if check_logger.isEnabledFor(logging.INFO):
+        check_logger.info('check', extra={'check': fields})
+
+
+def listen_to_workers(records):
+    """Log records that worker processes put on `records` (see log_to_queue) here"""
+    return _listen(records, [_Forward()])
+
+
+def stop_listener(listener):
+    """Stop one listener started by listen_to_workers"""
+    if listener in _listeners:
+        _listeners.remove(listener)
+        listener.stop()
+
+
+def log_to_queue(records):
+    """In a worker process: send every record, check records included, to the parent"""
+    stop_logging()
+    for logger in (logging.getLogger(), check_logger):
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        logger.addHandler(logging.handlers.QueueHandler(records))
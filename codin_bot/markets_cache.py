@@ -0,0 +1,87 @@
+"""
+Exchange markets metadata cache
+load_markets() is the largest response an exchange sends (several MB on
+Binance) and rarely changes, so markets are shared by every monitor in the
+process and persisted to disk until they are older than a TTL
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# exchange name -> (loaded_at, markets), shared by every monitor instance
+_markets = {}
+_markets_lock = threading.Lock()
+
+
+def cache_path(exchange_name):
+    """File the markets of an exchange are persisted to"""
+    return f"markets_{exchange_name}.json"
+
+
+def cached_markets(exchange_name, ttl):
+    """Markets loaded less than `ttl` seconds ago, from memory or disk, or None"""
+    with _markets_lock:
+        entry = _markets.get(exchange_name)
+        if entry is not None and time.time() - entry[0] < ttl:
+            return entry[1]
+        
+        path = cache_path(exchange_name)
+        try:
+            if os.path.exists(path) and time.time() - os.path.getmtime(path) < ttl:
+                with open(path, 'r') as f:
+                    data = json.load(f)
+                if time.time() - data['timestamp'] < ttl:
+                    _markets[exchange_name] = (data['timestamp'], data['markets'])
+                    logger.info(f"Loaded {len(data['markets'])} markets from cache")
+                    return data['markets']
+        except Exception as e:
+            logger.error(f"Error loading markets cache: {e}")
+        return None
+
+
+def store_markets(exchange_name, markets):
+    """Keep freshly loaded markets in memory and on disk"""
+    loaded_at = time.time()
+    with _markets_lock:
+        _markets[exchange_name] = (loaded_at, markets)
+        path = cache_path(exchange_name)
+        try:
+            # Written to a temporary file first so readers never see half a file
+            with open(path + '.tmp', 'w') as f:
+                json.dump({'timestamp': loaded_at, 'exchange': exchange_name, 'markets': markets}, f)
+            os.replace(path + '.tmp', path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"Error saving markets cache: {e}")
+
+
+def load_markets(exchange, exchange_name, ttl):
+    """
+    Markets of an exchange, installed with set_markets() from the cache when
+    it is fresh, otherwise downloaded with load_markets() and cached
+    """
+    markets = cached_markets(exchange_name, ttl)
+    if markets is not None:
+        if not exchange.markets:
+            exchange.set_markets(markets)
+        return exchange.markets
+    
+    markets = exchange.load_markets(reload=True)
+    store_markets(exchange_name, markets)
+    return markets
+
+
+async def load_markets_async(exchange, exchange_name, ttl):
+    """load_markets() for ccxt.async_support exchanges"""
+    markets = cached_markets(exchange_name, ttl)
+    if markets is not None:
+        if not exchange.markets:
+            exchange.set_markets(markets)
+        return exchange.markets
+    
+    markets = await exchange.load_markets(reload=True)
+    store_markets(exchange_name, markets)
+    return markets
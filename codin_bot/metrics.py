@@ -0,0 +1,200 @@
+"""
+Process-wide timing histograms and counters
+Every stage of a cycle (discovery, exchange requests per method and
+timeframe, RSI, support/resistance, alerts, notifications) records its
+latency here. The numbers are served in the Prometheus text format on
+127.0.0.1:METRICS_PORT and summarized in the log every METRICS_LOG_MINUTES.
+"""
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'crypto_monitor_'
+
+# Upper bounds (seconds) of the latency buckets, from cached lookups to slow paginated downloads
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+HELP = {
+    'stage_seconds': 'Time spent per monitor stage',
+    'request_seconds': 'Exchange request latency, rate limiter wait excluded',
+    'requests_total': 'Exchange requests sent',
+    'request_errors_total': 'Exchange requests that failed',
+    'request_retries_total': 'Exchange requests retried after a rate limit',
+    'response_bytes_total': 'Size of exchange responses',
+    'notification_seconds': 'Delivery time of one notification batch',
+    'notifications_total': 'Notifications delivered',
+    'notification_errors_total': 'Notification deliveries that failed',
+    'notification_retries_total': 'Notification deliveries retried',
+    'notifications_dropped_total': 'Notifications dropped because a sink fell behind',
+    'active_symbols': 'Symbols currently monitored',
+}
+
+_lock = threading.Lock()
+# name -> {labels: [bucket counts..., sum, count]}
+_histograms = {}
+# name -> {labels: value}, gauges included
+_counters = {}
+_gauges = set()
+
+
+def _labels(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def observe(name, seconds, **labels):
+    """Record one latency in the `name` histogram"""
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        values = series.get(_labels(labels))
+        if values is None:
+            values = series[_labels(labels)] = [0] * (len(LATENCY_BUCKETS) + 2)
+        index = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        if index < len(LATENCY_BUCKETS):
+            values[index] += 1
+        values[-2] += seconds
+        values[-1] += 1
+
+
+def inc(name, value=1, **labels):
+    """Add to the `name` counter"""
+    with _lock:
+        series = _counters.setdefault(name, {})
+        key = _labels(labels)
+        series[key] = series.get(key, 0) + value
+
+
+def set_gauge(name, value, **labels):
+    with _lock:
+        _gauges.add(name)
+        _counters.setdefault(name, {})[_labels(labels)] = value
+
+
+@contextmanager
+def timer(name, **labels):
+    """Time the with-block into the `name` histogram"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def stage(name):
+    """Time one monitor stage, e.g. `with stage('rsi'):`"""
+    return timer('stage_seconds', stage=name)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _gauges.clear()
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    with _lock:
+        for name in sorted(_histograms):
+            lines.append(f"# HELP {PREFIX}{name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {PREFIX}{name} histogram")
+            for labels, values in sorted(_histograms[name].items()):
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, values):
+                    cumulative += count
+                    lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {values[-1]}")
+                lines.append(f"{PREFIX}{name}_sum{_format_labels(labels)} {values[-2]:.6f}")
+                lines.append(f"{PREFIX}{name}_count{_format_labels(labels)} {values[-1]}")
+        for name in sorted(_counters):
+            kind = 'gauge' if name in _gauges else 'counter'
+            lines.append(f"# HELP {PREFIX}{name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+            for labels, value in sorted(_counters[name].items()):
+                lines.append(f"{PREFIX}{name}{_format_labels(labels)} {value}")
+    return '\n'.join(lines) + '\n'
+
+
+def _quantile(values, q):
+    """Upper bucket bound holding the q-quantile, None past the last bucket"""
+    target = q * values[-1]
+    cumulative = 0
+    for bound, count in zip(LATENCY_BUCKETS, values):
+        cumulative += count
+        if cumulative >= target:
+            return bound
+    return None
+
+
+def summary():
+    """Log lines with count, mean and p95 of every histogram, then the counters"""
+    lines = []
+    with _lock:
+        for name in sorted(_histograms):
+            for labels, values in sorted(_histograms[name].items()):
+                count = values[-1]
+                p95 = _quantile(values, 0.95)
+                p95_text = f"<={p95 * 1000:g}ms" if p95 is not None else f">{LATENCY_BUCKETS[-1]}s"
+                label_text = ' '.join(f"{key}={value}" for key, value in labels)
+                lines.append(f"{name} {label_text}: {count} x mean {values[-2] / count * 1000:.1f}ms, p95 {p95_text}")
+        counters = [f"{name}{_format_labels(labels)}={value:g}" for name in sorted(_counters)
+                    for labels, value in sorted(_counters[name].items())]
+        if counters:
+            lines.append(', '.join(counters))
+    return lines
+
+
+def log_summary():
+    for line in summary():
+        logger.info("Metrics: %s", line)
+
+
+_server = None
+
+
+def start_server(port, host='127.0.0.1'):
+    """Serve /metrics on a daemon thread (once per process), returns the bound port"""
+    global _server
+    if _server is not None:
+        return _server.server_address[1]
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            body = render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    _server = ThreadingHTTPServer((host, port), MetricsHandler)
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, name='metrics-http', daemon=True).start()
+    logger.info("Metrics served on http://%s:%s/metrics", host, _server.server_address[1])
+    return _server.server_address[1]
+
+
+def stop_server():
+    global _server
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
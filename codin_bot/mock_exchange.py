@@ -0,0 +1,227 @@
+"""
+Local stand-in exchange for testing the streaming monitor offline
+MockExchangeServer serves candles over HTTP and pushes kline updates over a
+WebSocket on 127.0.0.1; MockStreamExchange is the client side with the
+subset of the ccxt.pro interface the monitors use (load_markets,
+fetch_ohlcv, fetch_tickers, watch_ohlcv, close)
+"""
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MockExchangeServer:
+    """
+    Candle history per (symbol, timeframe), pushed to WebSocket subscribers
+    as it changes. drop_connections() simulates the exchange closing every
+    stream, clients have to reconnect and subscribe again.
+    """
+    
+    def __init__(self, candles=None, host='127.0.0.1', port=0):
+        # {(symbol, timeframe): [[ts, o, h, l, c, v], ...]} oldest first
+        self.candles = {key: [list(row) for row in rows] for key, rows in (candles or {}).items()}
+        self.host = host
+        self.port = port
+        self.url = None
+        self.connections = 0
+        self._sockets = {}
+        self._runner = None
+    
+    async def start(self):
+        from aiohttp import web
+        
+        app = web.Application()
+        app.router.add_get('/markets', self._markets)
+        app.router.add_get('/tickers', self._tickers)
+        app.router.add_get('/ohlcv', self._ohlcv)
+        app.router.add_get('/ws', self._stream)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        self.url = f"http://{self.host}:{self.port}"
+        return self
+    
+    async def stop(self):
+        await self.drop_connections()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+    
+    def symbols(self):
+        return sorted({symbol for symbol, _ in self.candles})
+    
+    async def push(self, symbol, timeframe, row):
+        """Update or append a candle and send it to every subscriber"""
+        rows = self.candles.setdefault((symbol, timeframe), [])
+        if rows and rows[-1][0] == row[0]:
+            rows[-1] = list(row)
+        else:
+            rows.append(list(row))
+        
+        message = json.dumps({'symbol': symbol, 'timeframe': timeframe, 'ohlcv': [list(row)]})
+        for ws, subscriptions in list(self._sockets.items()):
+            if (symbol, timeframe) in subscriptions and not ws.closed:
+                await ws.send_str(message)
+    
+    async def drop_connections(self):
+        for ws in list(self._sockets):
+            await ws.close()
+        self._sockets.clear()
+    
+    async def _markets(self, request):
+        from aiohttp import web
+        markets = {symbol: {'symbol': symbol, 'base': symbol.split('/')[0], 'quote': symbol.split('/')[1],
+                            'active': True} for symbol in self.symbols()}
+        return web.json_response(markets)
+    
+    async def _tickers(self, request):
+        from aiohttp import web
+        tickers = {}
+        for symbol in self.symbols():
+            rows = self.candles.get((symbol, '4h')) or self.candles.get((symbol, '1d'))
+            last = rows[-1][4] if rows else None
+            tickers[symbol] = {'symbol': symbol, 'last': last, 'quoteVolume': 1e9}
+        return web.json_response(tickers)
+    
+    async def _ohlcv(self, request):
+        from aiohttp import web
+        query = request.query
+        rows = self.candles.get((query['symbol'], query['timeframe']), [])
+        if 'since' in query:
+            rows = [row for row in rows if row[0] >= int(query['since'])]
+            rows = rows[:int(query.get('limit', len(rows)))]
+        else:
+            rows = rows[-int(query.get('limit', len(rows))):]
+        return web.json_response(rows)
+    
+    async def _stream(self, request):
+        from aiohttp import web, WSMsgType
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        subscriptions = self._sockets[ws] = set()
+        
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                break
+            data = json.loads(message.data)
+            if data.get('op') == 'subscribe':
+                subscriptions.add((data['symbol'], data['timeframe']))
+        
+        self._sockets.pop(ws, None)
+        return ws
+
+
+class MockStreamExchange:
+    """
+    Client for MockExchangeServer behaving like a ccxt.pro exchange:
+    watch_ohlcv() resolves with the cached candles on the next update, and
+    raises if the connection drops; the next call reconnects and
+    resubscribes everything that was watched before
+    """
+    
+    id = 'mock'
+    rateLimit = 50
+    
+    def __init__(self, url, max_candles=1000):
+        self.url = url
+        self.max_candles = max_candles
+        self.markets = None
+        self.enableRateLimit = True
+        self.session = None
+        self.ws = None
+        self._reader = None
+        self._subscriptions = set()
+        self._cache = {}
+        self._waiters = {}
+        self._connect_lock = None
+    
+    async def _session(self):
+        if self.session is None:
+            import aiohttp
+            self.session = aiohttp.ClientSession()
+        return self.session
+    
+    async def _get(self, path, **params):
+        session = await self._session()
+        async with session.get(self.url + path, params={k: str(v) for k, v in params.items() if v is not None}) as response:
+            response.raise_for_status()
+            return await response.json()
+    
+    def set_markets(self, markets):
+        self.markets = markets
+    
+    async def load_markets(self, reload=False, params={}):
+        if self.markets is None or reload:
+            self.markets = await self._get('/markets')
+        return self.markets
+    
+    async def fetch_tickers(self, symbols=None, params={}):
+        return await self._get('/tickers')
+    
+    async def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params={}):
+        return await self._get('/ohlcv', symbol=symbol, timeframe=timeframe, since=since, limit=limit)
+    
+    async def _connect(self):
+        session = await self._session()
+        self.ws = await session.ws_connect(self.url + '/ws')
+        for symbol, timeframe in self._subscriptions:
+            await self.ws.send_json({'op': 'subscribe', 'symbol': symbol, 'timeframe': timeframe})
+        self._reader = asyncio.ensure_future(self._read(self.ws))
+    
+    async def _read(self, ws):
+        error = ConnectionError('stream closed')
+        try:
+            async for message in ws:
+                data = json.loads(message.data)
+                key = (data['symbol'], data['timeframe'])
+                rows = self._cache.setdefault(key, [])
+                for row in data['ohlcv']:
+                    if rows and rows[-1][0] == row[0]:
+                        rows[-1] = row
+                    else:
+                        rows.append(row)
+                del rows[:-self.max_candles]
+                waiter = self._waiters.pop(key, None)
+                if waiter is not None and not waiter.done():
+                    waiter.set_result(list(rows))
+        except Exception as e:
+            error = ConnectionError(f"stream failed: {e}")
+        finally:
+            if self.ws is ws:
+                self.ws = None
+            for waiter in self._waiters.values():
+                if not waiter.done():
+                    waiter.set_exception(error)
+            self._waiters.clear()
+    
+    async def watch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params={}):
+        key = (symbol, timeframe)
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self.ws is None:
+                await self._connect()
+        if key not in self._subscriptions:
+            self._subscriptions.add(key)
+            await self.ws.send_json({'op': 'subscribe', 'symbol': symbol, 'timeframe': timeframe})
+        
+        waiter = self._waiters.get(key)
+        if waiter is None or waiter.done():
+            waiter = self._waiters[key] = asyncio.get_running_loop().create_future()
+        return await waiter
+    
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+            self.ws = None
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+            self._reader = None
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
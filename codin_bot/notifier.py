@@ -0,0 +1,256 @@
+"""
+Background alert delivery
+The scan only queues notifications; one thread per sink delivers them. Each
+sink coalesces whatever queued up while it waited (a cycle's alerts, or
+everything that arrived while a slow sink was busy) into one delivery,
+retries failures with backoff and, when it falls too far behind, drops the
+oldest alerts instead of slowing the scan down.
+"""
+import json
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+
+from metrics import observe, inc
+
+logger = logging.getLogger(__name__)
+
+Notification = namedtuple('Notification', ['title', 'message', 'summary', 'created'])
+
+# Lines listed in a desktop digest, desktop notifications are short
+DIGEST_LINES = 5
+
+
+class DesktopSink:
+    """plyer desktop notifications, one pop-up per batch"""
+    
+    name = 'desktop'
+    
+    def send(self, notifications, dropped=0):
+        from plyer import notification
+        if len(notifications) == 1 and not dropped:
+            title, message = notifications[0].title, notifications[0].message
+        else:
+            title, message = digest(notifications, dropped)
+        notification.notify(title=title, message=message, app_name='Crypto Monitor', timeout=10)
+
+
+class FileSink:
+    """Appends every alert to a text file, one line each"""
+    
+    name = 'file'
+    
+    def __init__(self, path='alerts.log'):
+        self.path = path
+    
+    def send(self, notifications, dropped=0):
+        lines = []
+        for note in notifications:
+            when = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(note.created))
+            lines.append(f"{when} {note.title}: {note.message.replace(chr(10), ' | ')}\n")
+        if dropped:
+            lines.append(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {dropped} alerts dropped, delivery fell behind\n")
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.writelines(lines)
+
+
+class WebhookSink:
+    """POSTs each batch as JSON, e.g. to a chat bot or a local relay"""
+    
+    name = 'webhook'
+    
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+    
+    def send(self, notifications, dropped=0):
+        from urllib.request import Request, urlopen
+        body = json.dumps({
+            'alerts': [{'title': note.title, 'message': note.message, 'summary': note.summary,
+                        'time': note.created} for note in notifications],
+            'dropped': dropped,
+        }).encode('utf-8')
+        request = Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        # urlopen raises on connection errors and non-2xx responses, which triggers a retry
+        with urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+def digest(notifications, dropped=0):
+    """(title, message) summarizing a batch in a few lines"""
+    count = len(notifications) + dropped
+    lines = [note.summary or note.title for note in notifications[:DIGEST_LINES]]
+    if count > len(lines):
+        lines.append(f"... and {count - len(lines)} more")
+    return f"{count} Trading Alerts", '\n'.join(lines)
+
+
+def create_sinks(names, file_path='alerts.log', webhook_url=None):
+    """Sinks from a list of names (desktop, file, webhook)"""
+    sinks = []
+    for name in names:
+        name = name.strip().lower()
+        if name == 'desktop':
+            sinks.append(DesktopSink())
+        elif name == 'file':
+            sinks.append(FileSink(file_path))
+        elif name == 'webhook':
+            if webhook_url:
+                sinks.append(WebhookSink(webhook_url))
+            else:
+                logger.error("Webhook notifications need NOTIFY_WEBHOOK_URL, skipped")
+        elif name:
+            logger.error(f"Unknown notification sink: {name}")
+    return sinks
+
+
+class SinkWorker:
+    """Queue and delivery thread of one sink"""
+    
+    def __init__(self, sink, window, max_pending, retries, retry_delay):
+        self.sink = sink
+        self.window = window
+        self.retries = retries
+        self.retry_delay = retry_delay
+        
+        self.pending = deque(maxlen=max_pending)
+        self.condition = threading.Condition()
+        self.flushing = False
+        self.closed = False
+        self.busy = False
+        self.thread = None
+        
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.unreported = 0
+    
+    def submit(self, note):
+        with self.condition:
+            if len(self.pending) == self.pending.maxlen:
+                # Full: the oldest alert goes, the next batch reports it
+                self.dropped += 1
+                self.unreported += 1
+                inc('notifications_dropped_total', sink=self.sink.name)
+            self.pending.append(note)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name=f"notify-{self.sink.name}", daemon=True)
+                self.thread.start()
+            self.condition.notify()
+    
+    def flush(self):
+        with self.condition:
+            self.flushing = True
+            self.condition.notify()
+    
+    def close(self, timeout):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join(timeout)
+    
+    def idle(self):
+        with self.condition:
+            return not self.pending and not self.busy
+    
+    def next_batch(self):
+        """Wait for alerts, then for the rest of the cycle: a flush, the window or close"""
+        with self.condition:
+            while not self.pending and not self.closed:
+                self.flushing = False
+                self.condition.wait()
+            if not self.pending:
+                return None, 0
+            
+            deadline = self.pending[0].created + self.window
+            while not self.flushing and not self.closed and time.time() < deadline:
+                self.condition.wait(deadline - time.time())
+            
+            batch, dropped = list(self.pending), self.unreported
+            self.pending.clear()
+            self.unreported = 0
+            self.flushing = False
+            self.busy = True
+            return batch, dropped
+    
+    def run(self):
+        while True:
+            batch, dropped = self.next_batch()
+            if batch is None:
+                return
+            try:
+                self.deliver(batch, dropped)
+            finally:
+                with self.condition:
+                    self.busy = False
+    
+    def deliver(self, batch, dropped):
+        delay = self.retry_delay
+        name = self.sink.name
+        for attempt in range(self.retries + 1):
+            start = time.perf_counter()
+            try:
+                self.sink.send(batch, dropped)
+                observe('notification_seconds', time.perf_counter() - start, sink=name)
+                inc('notifications_total', len(batch), sink=name)
+                self.sent += len(batch)
+                return
+            except Exception as e:
+                observe('notification_seconds', time.perf_counter() - start, sink=name)
+                if attempt == self.retries or self.closed:
+                    logger.error(f"Error sending {len(batch)} notifications to {name}: {e}")
+                    inc('notification_errors_total', len(batch), sink=name)
+                    self.failed += len(batch)
+                    return
+                inc('notification_retries_total', sink=name)
+                logger.warning(f"Notification to {name} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                delay *= 2
+
+
+class NotificationDispatcher:
+    """
+    Non-blocking notification queue in front of one or more sinks. submit()
+    never waits on delivery; flush() marks the end of a check cycle so its
+    alerts go out as one batch right away instead of after the window.
+    """
+    
+    def __init__(self, sinks, window=2.0, max_pending=500, retries=3, retry_delay=1.0):
+        # Threads start with the first notification, monitors that never alert have none
+        self.workers = [SinkWorker(sink, window, max_pending, retries, retry_delay) for sink in sinks]
+    
+    def submit(self, title, message, summary=None):
+        note = Notification(title, message, summary, time.time())
+        for worker in self.workers:
+            worker.submit(note)
+    
+    def flush(self):
+        for worker in self.workers:
+            worker.flush()
+    
+    def wait_idle(self, timeout=10):
+        """Block until every queued notification was delivered (or gave up), for tests and shutdown"""
+        deadline = time.time() + timeout
+        self.flush()
+        while not all(worker.idle() for worker in self.workers):
+            if time.time() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+    
+    def close(self, timeout=5):
+        """Deliver what is queued, waiting at most about `timeout` seconds, and stop the threads"""
+        self.wait_idle(timeout)
+        for worker in self.workers:
+            worker.close(timeout)
+    
+    def delivered(self):
+        """Notifications delivered so far, by the sink that delivered the most"""
+        return max((worker.sent for worker in self.workers), default=0)
+    
+    def stats(self):
+        """{sink name: {'sent', 'failed', 'dropped'}}"""
+        return {worker.sink.name: {'sent': worker.sent, 'failed': worker.failed, 'dropped': worker.dropped}
+                for worker in self.workers}
@@ -0,0 +1,305 @@
+"""
+Weight-aware token-bucket rate limiter shared by every exchange call
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from metrics import observe, inc
+
+logger = logging.getLogger(__name__)
+
+# Documented request budgets: `limit` weight per `window` seconds
+EXCHANGE_LIMITS = {
+    'binance': {'limit': 6000, 'window': 60},   # REQUEST_WEIGHT per minute per IP
+    'bybit': {'limit': 600, 'window': 5},       # requests per 5s per IP
+    'okx': {'limit': 20, 'window': 2},          # market data endpoints, per 2s
+    'kucoin': {'limit': 2000, 'window': 30},    # public resource pool
+    'kraken': {'limit': 1, 'window': 1},        # public endpoints, ~1 req/s
+}
+
+# Documented weight of each unified call (anything missing costs 1)
+REQUEST_WEIGHTS = {
+    'binance': {
+        'load_markets': 20,     # GET /api/v3/exchangeInfo
+        'fetch_tickers': 80,    # GET /api/v3/ticker/24hr without symbol
+        'fetch_ticker': 2,      # GET /api/v3/ticker/24hr with symbol
+        'fetch_ohlcv': 2,       # GET /api/v3/klines
+    },
+    'kucoin': {
+        'load_markets': 4,      # GET /api/v2/symbols
+        'fetch_tickers': 15,    # GET /api/v1/market/allTickers
+        'fetch_ticker': 2,
+        'fetch_ohlcv': 3,       # GET /api/v1/market/candles
+    },
+}
+
+# Response headers that report the weight already used in the current window
+USED_WEIGHT_HEADERS = {
+    'binance': 'x-mbx-used-weight-1m',
+}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. acquire() reserves tokens up front and sleeps
+    off any debt, so concurrent callers are served in arrival order.
+    The refill rate is cut in half on every 429/418 and recovers linearly
+    back to the documented ceiling over `recovery_seconds`.
+    """
+    
+    def __init__(self, rate, capacity, min_rate=None, recovery_seconds=60):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.min_rate = float(min_rate) if min_rate else self.max_rate / 20
+        self.recovery_per_second = (self.max_rate - self.min_rate) / max(recovery_seconds, 1)
+        
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def _refill(self, now):
+        elapsed = max(0.0, now - self.updated)
+        self.updated = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + elapsed * self.recovery_per_second)
+    
+    def reserve(self, weight=1):
+        """Take `weight` tokens, returns how many seconds the caller must wait"""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= weight
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+    
+    def acquire(self, weight=1):
+        """Block until `weight` tokens are available"""
+        wait = self.reserve(weight)
+        if wait > 0:
+            time.sleep(wait)
+    
+    async def acquire_async(self, weight=1):
+        """Wait without blocking the event loop until `weight` tokens are available"""
+        wait = self.reserve(weight)
+        if wait > 0:
+            await asyncio.sleep(wait)
+    
+    def penalize(self, retry_after=None):
+        """Back off after a 429/418 response"""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate / 2)
+            # Empty the bucket, and go into debt for the whole Retry-After period
+            pause = float(retry_after) if retry_after else 0.0
+            self.tokens = min(self.tokens, 0.0) - pause * self.rate
+            logger.warning(f"Rate limited by exchange, slowing to {self.rate:.1f} weight/s"
+                           + (f" and pausing {pause:.0f}s" if pause else ""))
+    
+    def sync_used(self, used, limit):
+        """Align with the server's own count of weight used in this window"""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, float(limit - used))
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+# Fraction of every exchange budget this process may use
+_budget_share = 1.0
+
+
+def set_budget_share(share):
+    """
+    Give this process `share` of each exchange's budget, for processes that
+    split one budget between them (e.g. sharded workers). Buckets created
+    earlier, or inherited from a forked parent, are dropped.
+    """
+    global _budget_share
+    with _limiters_lock:
+        _budget_share = share
+        _limiters.clear()
+
+
+def get_limiter(exchange_name, exchange=None):
+    """
+    Return the process-wide bucket for an exchange, creating it on first use
+    Unknown exchanges fall back to ccxt's rateLimit (milliseconds per request)
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(exchange_name)
+        if limiter is None:
+            utilization = float(os.getenv('RATE_LIMIT_UTILIZATION', 0.9))
+            limits = EXCHANGE_LIMITS.get(exchange_name)
+            if limits:
+                rate = limits['limit'] / limits['window']
+                window = limits['window']
+            else:
+                rate_limit_ms = getattr(exchange, 'rateLimit', None) or 1000
+                rate = 1000.0 / rate_limit_ms
+                window = 1
+            rate *= utilization * _budget_share
+            limiter = TokenBucket(rate, capacity=max(1.0, rate * min(window, 10)))
+            _limiters[exchange_name] = limiter
+        return limiter
+
+
+def create_exchange(exchange_name, config=None, async_support=False, streaming=False):
+    """
+    Instantiate the configured ccxt exchange class
+    streaming gives the ccxt.pro class (async REST plus watch_* WebSocket calls)
+    ccxt is imported here, on first use, instead of when the monitors are
+    imported, so the GUIs and tests start without paying for it
+    """
+    if streaming:
+        import ccxt.pro as ccxt_module
+    elif async_support:
+        import ccxt.async_support as ccxt_module
+    else:
+        import ccxt as ccxt_module
+    return getattr(ccxt_module, exchange_name)(config or {})
+
+
+def _throttled_errors():
+    """ccxt's rate-limit exceptions, only looked up once a request has failed"""
+    from ccxt.base.errors import RateLimitExceeded, DDoSProtection
+    return (RateLimitExceeded, DDoSProtection)
+
+
+def _retry_after(exchange):
+    """Read Retry-After (seconds) from the last response, if any"""
+    headers = getattr(exchange, 'last_response_headers', None) or {}
+    for key, value in headers.items():
+        if key.lower() == 'retry-after':
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+class RateLimitedExchange:
+    """
+    Proxy around a ccxt exchange that charges every limited call's documented
+    weight to the shared token bucket before sending it. Everything else is
+    passed straight through to the wrapped exchange.
+    """
+    
+    def __init__(self, exchange, limiter=None, max_retries=2):
+        self._exchange = exchange
+        self._exchange_name = getattr(exchange, 'id', type(exchange).__name__)
+        self.limiter = limiter or get_limiter(self._exchange_name, exchange)
+        self.weights = REQUEST_WEIGHTS.get(self._exchange_name, {})
+        self.used_weight_header = USED_WEIGHT_HEADERS.get(self._exchange_name)
+        self.max_retries = max_retries
+        
+        # The bucket replaces ccxt's own (not thread-safe) throttle
+        exchange.enableRateLimit = False
+    
+    def __getattr__(self, name):
+        return getattr(self._exchange, name)
+    
+    def weight(self, method):
+        """Documented weight of a unified call"""
+        return self.weights.get(method, 1)
+    
+    def _after_response(self):
+        if not self.used_weight_header:
+            return
+        headers = getattr(self._exchange, 'last_response_headers', None) or {}
+        for key, value in headers.items():
+            if key.lower() == self.used_weight_header:
+                limits = EXCHANGE_LIMITS.get(self._exchange_name)
+                if limits:
+                    self.limiter.sync_used(int(value), limits['limit'])
+                return
+    
+    def _labels(self, method, args, kwargs):
+        """Metric labels of a call: the method, plus the timeframe of candle requests"""
+        if method == 'fetch_ohlcv':
+            return {'method': method, 'timeframe': kwargs.get('timeframe', args[1] if len(args) > 1 else '1m')}
+        return {'method': method}
+    
+    def _record(self, labels, start):
+        """Request latency (rate limiter wait excluded) and response size"""
+        observe('request_seconds', time.perf_counter() - start, **labels)
+        inc('requests_total', **labels)
+        body = getattr(self._exchange, 'last_http_response', None)
+        if isinstance(body, (str, bytes)):
+            inc('response_bytes_total', len(body), **labels)
+    
+    def _call(self, method, *args, **kwargs):
+        labels = self._labels(method, args, kwargs)
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(self.weight(method))
+            start = time.perf_counter()
+            try:
+                result = getattr(self._exchange, method)(*args, **kwargs)
+            except _throttled_errors():
+                self._record(labels, start)
+                self.limiter.penalize(_retry_after(self._exchange))
+                if attempt == self.max_retries:
+                    inc('request_errors_total', **labels)
+                    raise
+                inc('request_retries_total', **labels)
+                continue
+            except Exception:
+                self._record(labels, start)
+                inc('request_errors_total', **labels)
+                raise
+            self._record(labels, start)
+            self._after_response()
+            return result
+    
+    def load_markets(self, reload=False, params={}):
+        # Markets already loaded are served from memory without a request
+        if self._exchange.markets and not reload:
+            return self._exchange.markets
+        return self._call('load_markets', reload, params)
+    
+    def fetch_tickers(self, *args, **kwargs):
+        return self._call('fetch_tickers', *args, **kwargs)
+    
+    def fetch_ticker(self, *args, **kwargs):
+        return self._call('fetch_ticker', *args, **kwargs)
+    
+    def fetch_ohlcv(self, *args, **kwargs):
+        return self._call('fetch_ohlcv', *args, **kwargs)
+
+
+class AsyncRateLimitedExchange(RateLimitedExchange):
+    """Same as RateLimitedExchange for ccxt.async_support exchanges"""
+    
+    async def _call(self, method, *args, **kwargs):
+        labels = self._labels(method, args, kwargs)
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire_async(self.weight(method))
+            start = time.perf_counter()
+            try:
+                result = await getattr(self._exchange, method)(*args, **kwargs)
+            except _throttled_errors():
+                self._record(labels, start)
+                self.limiter.penalize(_retry_after(self._exchange))
+                if attempt == self.max_retries:
+                    inc('request_errors_total', **labels)
+                    raise
+                inc('request_retries_total', **labels)
+                continue
+            except Exception:
+                self._record(labels, start)
+                inc('request_errors_total', **labels)
+                raise
+            self._record(labels, start)
+            self._after_response()
+            return result
+    
+    async def load_markets(self, reload=False, params={}):
+        if self._exchange.markets and not reload:
+            return self._exchange.markets
+        return await self._call('load_markets', reload, params)
@@ -0,0 +1,50 @@
+"""
+Resample daily candles into weekly and monthly candles
+Bucket boundaries follow the exchanges' own candles: weeks open on
+Monday 00:00 UTC, months on the 1st at 00:00 UTC
+"""
+import numpy as np
+
+from candle_cache import OHLCV_DTYPE
+
+DAY_MS = 86400 * 1000
+WEEK_MS = 7 * DAY_MS
+
+# 1970-01-01 was a Thursday, the first Monday is 4 days later
+WEEK_ORIGIN_MS = 4 * DAY_MS
+
+
+def bucket_starts(timestamps, timeframe):
+    """Open time of the weekly/monthly bucket each timestamp falls in"""
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if timeframe == '1w':
+        return (timestamps - WEEK_ORIGIN_MS) // WEEK_MS * WEEK_MS + WEEK_ORIGIN_MS
+    if timeframe == '1M':
+        months = timestamps.astype('datetime64[ms]').astype('datetime64[M]')
+        return months.astype('datetime64[ms]').astype(np.int64)
+    raise ValueError(f"Cannot resample to {timeframe}")
+
+
+def resample_candles(candles, timeframe):
+    """
+    Aggregate daily candles (OHLCV_DTYPE array) into '1w' or '1M' candles
+    A leading bucket that is only partly covered by the input is dropped
+    """
+    if candles is None or len(candles) == 0:
+        return np.empty(0, dtype=OHLCV_DTYPE)
+    
+    buckets = bucket_starts(candles['timestamp'], timeframe)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(candles)] - 1
+    
+    resampled = np.empty(len(starts), dtype=OHLCV_DTYPE)
+    resampled['timestamp'] = buckets[starts]
+    resampled['open'] = candles['open'][starts]
+    resampled['high'] = np.maximum.reduceat(candles['high'], starts)
+    resampled['low'] = np.minimum.reduceat(candles['low'], starts)
+    resampled['close'] = candles['close'][ends]
+    resampled['volume'] = np.add.reduceat(candles['volume'], starts)
+    
+    if candles['timestamp'][0] != buckets[0]:
+        resampled = resampled[1:]
+    return resampled
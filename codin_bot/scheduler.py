@@ -0,0 +1,72 @@
+"""
+Candle-close-aware scheduling
+Exchange candles close on fixed UTC boundaries: 4h bars every four hours
+from midnight, daily bars at midnight, weekly bars on Monday and monthly
+bars on the 1st. Full checks run right after a close, cheap price checks
+in between.
+"""
+import time
+import numpy as np
+
+from candle_cache import timeframe_ms
+from resample import bucket_starts
+
+
+def candle_open(timeframe, timestamp_ms):
+    """Open time of the candle containing timestamp_ms"""
+    if timeframe in ('1w', '1M'):
+        return int(bucket_starts([timestamp_ms], timeframe)[0])
+    period = timeframe_ms(timeframe)
+    return int(timestamp_ms) // period * period
+
+
+def candle_close(timeframe, timestamp_ms):
+    """Close time of the candle containing timestamp_ms (the next candle's open)"""
+    if timeframe == '1M':
+        month = np.datetime64(int(timestamp_ms), 'ms').astype('datetime64[M]') + 1
+        return int(month.astype('datetime64[ms]').astype(np.int64))
+    return candle_open(timeframe, timestamp_ms) + timeframe_ms(timeframe)
+
+
+class CandleScheduler:
+    def __init__(self, timeframes, check_interval=300, grace=10):
+        self.timeframes = list(timeframes)
+        # Seconds between cheap price checks
+        self.check_interval = check_interval
+        # Seconds to wait after a close for the exchange to publish the candle
+        self.grace = grace
+        # Open time of the candle each timeframe was forming at the last full check
+        self._seen = {}
+        self.last_check = 0
+    
+    def _effective_ms(self, now):
+        """Wall-clock time as candles see it, `grace` seconds behind"""
+        return int(((time.time() if now is None else now) - self.grace) * 1000)
+    
+    def closed_timeframes(self, now=None):
+        """Timeframes with a candle closed since the last full check"""
+        effective = self._effective_ms(now)
+        return [tf for tf in self.timeframes if self._seen.get(tf) != candle_open(tf, effective)]
+    
+    def mark_full(self, now=None):
+        """Record a full check of every timeframe"""
+        now = time.time() if now is None else now
+        effective = self._effective_ms(now)
+        for tf in self.timeframes:
+            self._seen[tf] = candle_open(tf, effective)
+        self.last_check = now
+    
+    def mark_checked(self, now=None):
+        """Record a price check"""
+        self.last_check = time.time() if now is None else now
+    
+    def next_wakeup(self, now=None):
+        """Time of the next candle close (plus grace) or price check, whichever comes first"""
+        effective = self._effective_ms(now)
+        next_close = min(candle_close(tf, effective) for tf in self.timeframes) / 1000 + self.grace
+        return min(next_close, self.last_check + self.check_interval)
+    
+    def sleep_time(self, now=None):
+        """Seconds until next_wakeup()"""
+        now = time.time() if now is None else now
+        return max(0.0, self.next_wakeup(now) - now)
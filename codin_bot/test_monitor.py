@@ -109,6 +109,1508 @@ def test_support_resistance():
         return False
 
 
+def test_fetch_engine():
+    """Test concurrent OHLCV fetching"""
+    print("\nTesting concurrent fetch engine...")
+    
+    try:
+        import time
+        from fetch_engine import OHLCVFetchEngine
+        
+        class SlowExchange:
+            rateLimit = 0
+            
+            def fetch_ohlcv(self, symbol, timeframe, limit=100):
+                time.sleep(0.05)
+                return [[0, 1, 2, 0.5, 1.5, 10]] * limit
+        
+        engine = OHLCVFetchEngine(SlowExchange(), max_workers=20)
+        symbols = [f"SYM{i}/USDT" for i in range(20)]
+        
+        start = time.time()
+        results = engine.fetch_symbols(symbols, ['1w', '1M', '4h', '1d'], limit=5)
+        elapsed = time.time() - start
+        engine.shutdown()
+        
+        assert len(results) == 20
+        assert all(len(frames) == 4 for frames in results.values())
+        # 80 requests of 50ms each would take 4s one after another
+        assert elapsed < 1.5, f"took {elapsed:.2f}s"
+        
+        print(f"✓ Fetch engine working!")
+        print(f"  80 requests in {elapsed:.2f}s")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Fetch engine failed: {e}")
+        return False
+
+
+def test_async_monitor():
+    """Test the asyncio monitor loop and its cancellation"""
+    print("\nTesting async monitor...")
+    
+    try:
+        import asyncio
+        import threading
+        import time
+        from crypto_monitor_async import AsyncCryptoMonitor
+        
+        class FakeAsyncExchange:
+            async def fetch_ohlcv(self, symbol, timeframe, since=None, limit=100):
+                await asyncio.sleep(0.01)
+                return [[i * 60000, 1, 2, 0.5, 1.5, 10] for i in range(limit)]
+            
+            async def close(self):
+                pass
+        
+        class OfflineAsyncMonitor(AsyncCryptoMonitor):
+            async def open(self):
+                self.async_exchange = FakeAsyncExchange()
+                self.fetch_semaphore = asyncio.Semaphore(self.fetch_concurrency)
+        
+        symbols = [f"SYM{i}/USDT" for i in range(200)]
+        monitor = OfflineAsyncMonitor(symbols=symbols)
+        monitor.candle_cache.store = None
+        monitor.rsi_state_file = None
+        checked = []
+        monitor.check_symbol = lambda symbol, frames, rsi_values=None: checked.append((symbol, len(frames)))
+        
+        thread = threading.Thread(target=monitor.run, daemon=True)
+        thread.start()
+        
+        deadline = time.time() + 10
+        while len(checked) < len(symbols) and time.time() < deadline:
+            time.sleep(0.05)
+        
+        monitor.stop()
+        thread.join(timeout=5)
+        
+        assert len(checked) == len(symbols)
+        assert all(count == 2 for _, count in checked)
+        assert not thread.is_alive(), "monitor did not stop"
+        assert monitor.exchange is None and monitor.fetch_engine is None, "async mode built a sync client"
+        
+        print(f"✓ Async monitor working!")
+        print(f"  Checked {len(checked)} symbols and stopped cleanly")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Async monitor failed: {e}")
+        return False
+
+
+def test_rate_limiter():
+    """Test the token-bucket rate limiter"""
+    print("\nTesting rate limiter...")
+    
+    try:
+        import time
+        import ccxt
+        from rate_limiter import TokenBucket, RateLimitedExchange
+        
+        # 10 burst + 50 more at 100 weight/s should take about 0.5s
+        bucket = TokenBucket(rate=100, capacity=10)
+        start = time.time()
+        for _ in range(30):
+            bucket.acquire(2)
+        elapsed = time.time() - start
+        assert 0.4 < elapsed < 0.8, f"took {elapsed:.2f}s"
+        
+        class FlakyExchange:
+            id = 'binance'
+            markets = None
+            last_response_headers = {'Retry-After': '0'}
+            
+            def __init__(self):
+                self.calls = 0
+            
+            def fetch_ohlcv(self, symbol, timeframe, limit=100):
+                self.calls += 1
+                if self.calls == 1:
+                    raise ccxt.RateLimitExceeded('429 Too Many Requests')
+                return [[0, 1, 2, 0.5, 1.5, 10]]
+        
+        limiter = TokenBucket(rate=1000, capacity=100)
+        exchange = RateLimitedExchange(FlakyExchange(), limiter)
+        rows = exchange.fetch_ohlcv('BTC/USDT', '1d')
+        
+        assert rows and exchange.calls == 2
+        assert limiter.rate < limiter.max_rate
+        assert exchange.weight('fetch_tickers') == 80
+        
+        print(f"✓ Rate limiter working!")
+        print(f"  Backed off to {limiter.rate:.0f}/s after a 429")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Rate limiter failed: {e}")
+        return False
+
+
+def test_candle_cache():
+    """Test incremental candle caching"""
+    print("\nTesting candle cache...")
+    
+    try:
+        from candle_cache import CandleCache
+        
+        hour = 3600 * 1000
+        
+        class FakeExchange:
+            def __init__(self):
+                self.bars = [[i * hour, 1, 2, 0.5, 1.5, 10] for i in range(150)]
+                self.requests = []
+            
+            def fetch_ohlcv(self, symbol, timeframe, since=None, limit=100):
+                self.requests.append(since)
+                if since is None:
+                    return self.bars[-limit:]
+                return [bar for bar in self.bars if bar[0] >= since][:limit]
+        
+        exchange = FakeExchange()
+        cache = CandleCache('fake')
+        
+        first = cache.fetch(exchange, 'BTC/USDT', '1h', limit=100)
+        assert len(first) == 100 and exchange.requests == [None]
+        
+        # The forming bar changes and one new bar closes
+        exchange.bars[-1][4] = 1.7
+        exchange.bars.append([150 * hour, 1, 2, 0.5, 1.6, 10])
+        second = cache.fetch(exchange, 'BTC/USDT', '1h', limit=100)
+        
+        assert exchange.requests[-1] == 149 * hour
+        assert len(second) == 100
+        assert second['timestamp'][-1] == 150 * hour
+        assert second['close'][-2] == 1.7
+        assert (second['timestamp'][1:] > second['timestamp'][:-1]).all()
+        
+        print(f"✓ Candle cache working!")
+        print(f"  Second fetch downloaded only the newest bars")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Candle cache failed: {e}")
+        return False
+
+
+def test_candle_store():
+    """Test the on-disk candle store"""
+    print("\nTesting candle store...")
+    
+    try:
+        import tempfile
+        import numpy as np
+        from candle_cache import CandleCache, rows_to_array
+        from candle_store import CandleStore
+        
+        day = 86400 * 1000
+        bars = [[i * day, 1, 2, 0.5, 1.0 + i, 10] for i in range(120)]
+        
+        with tempfile.TemporaryDirectory() as root:
+            store = CandleStore(root)
+            store.write('fake', 'BTC/USDT', '1d', rows_to_array(bars[:100]))
+            
+            # Forming bar updated plus one new bar, overwrites the tail only
+            update = rows_to_array([bars[99][:4] + [5.0, 10], bars[100]])
+            store.write('fake', 'BTC/USDT', '1d', update)
+            
+            stored = store.read('fake', 'BTC/USDT', '1d')
+            assert isinstance(stored, np.memmap)
+            assert len(stored) == 101
+            assert stored['close'][99] == 5.0
+            
+            # A restarted cache warms up from disk without touching the network
+            cache = CandleCache('fake', store)
+            assert cache.warm_up(['BTC/USDT'], ['1d'], limit=100) == 1
+            assert cache.since('BTC/USDT', '1d', 100) == 100 * day
+            del stored
+            
+            # A gap since the last stored bar starts the series over
+            store.write('fake', 'BTC/USDT', '1d', rows_to_array(bars[110:]))
+            assert store.read('fake', 'BTC/USDT', '1d')['timestamp'][0] == 110 * day
+            del cache
+            
+            # The backtest lists stored series by symbol, not by directory name
+            from backtest import stored_symbols
+            store.write('fake', 'BTC/USDT', '4h', rows_to_array(bars[110:]))
+            assert stored_symbols(store, 'fake') == ['BTC/USDT']
+        
+        print(f"✓ Candle store working!")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Candle store failed: {e}")
+        return False
+
+
+def test_resample():
+    """Test building weekly/monthly candles from daily candles"""
+    print("\nTesting daily to weekly/monthly resampling...")
+    
+    try:
+        import numpy as np
+        import pandas as pd
+        from candle_cache import rows_to_array
+        from resample import resample_candles
+        
+        # 400 random daily candles starting on a Wednesday
+        rng = np.random.default_rng(1)
+        start = pd.Timestamp('2024-01-03').value // 10**6
+        day = 86400 * 1000
+        close = 100 + np.cumsum(rng.normal(0, 1, 400))
+        rows = [[start + i * day, c, c + rng.random(), c - rng.random(), c, rng.random()]
+                for i, c in enumerate(close)]
+        daily = rows_to_array(rows)
+        
+        df = pd.DataFrame(daily)
+        df.index = pd.to_datetime(df['timestamp'], unit='ms')
+        aggregations = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+        
+        for timeframe, rule in [('1w', 'W-MON'), ('1M', 'MS')]:
+            if timeframe == '1w':
+                expected = df.resample(rule, label='left', closed='left').agg(aggregations)
+            else:
+                expected = df.resample(rule).agg(aggregations)
+            expected = expected.iloc[1:]  # first bucket is only partly covered
+            
+            result = resample_candles(daily, timeframe)
+            assert len(result) == len(expected), timeframe
+            assert (pd.to_datetime(result['timestamp'], unit='ms') == expected.index).all(), timeframe
+            for column in aggregations:
+                assert np.allclose(result[column], expected[column].values), (timeframe, column)
+        
+        print(f"✓ Resampling working!")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Resampling failed: {e}")
+        return False
+
+
+def test_rsi_batch():
+    """Test vectorized RSI against the per-symbol loop"""
+    print("\nTesting batched RSI engine...")
+    
+    try:
+        import numpy as np
+        from indicators import rsi_last, rsi_last_many
+        
+        def loop_rsi(prices, period):
+            # The original per-symbol implementation
+            if len(prices) < period + 1:
+                return 50
+            deltas = np.diff(prices)
+            gains = np.where(deltas > 0, deltas, 0)
+            losses = np.where(deltas < 0, -deltas, 0)
+            avg_gain = np.mean(gains[:period])
+            avg_loss = np.mean(losses[:period])
+            if avg_loss == 0:
+                return 100
+            rsi_values = [100 - (100 / (1 + avg_gain / avg_loss))]
+            for i in range(period, len(deltas)):
+                avg_gain = (avg_gain * (period - 1) + gains[i]) / period
+                avg_loss = (avg_loss * (period - 1) + losses[i]) / period
+                rsi_values.append(100 if avg_loss == 0 else 100 - (100 / (1 + avg_gain / avg_loss)))
+            return rsi_values[-1]
+        
+        rng = np.random.default_rng(7)
+        closes = 100 + np.cumsum(rng.normal(0, 1, (300, 100)), axis=1)
+        closes[0, :20] = 100            # flat start, pinned at 100
+        closes[1, -30:] = closes[1, -31]  # flat end
+        
+        for period in (6, 14):
+            batch = rsi_last(closes, period)
+            expected = np.array([loop_rsi(row, period) for row in closes])
+            assert np.array_equal(batch, expected), f"period {period} differs"
+        
+        ragged = [closes[0], closes[1, :50], closes[2, :3]]
+        expected = [loop_rsi(row, 6) for row in ragged]
+        assert np.array_equal(rsi_last_many(ragged, 6), expected)
+        
+        print(f"✓ Batched RSI working!")
+        print(f"  300 symbols match the per-symbol loop exactly")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Batched RSI failed: {e}")
+        return False
+
+
+def test_rsi_state():
+    """Test streaming RSI state against the batched RSI"""
+    print("\nTesting streaming RSI state...")
+    
+    try:
+        import json
+        import numpy as np
+        from candle_cache import OHLCV_DTYPE
+        from indicators import rsi_last, RSIState
+        
+        rng = np.random.default_rng(11)
+        closes = 100 + np.cumsum(rng.normal(0, 1, 300))
+        
+        # Committed closes one at a time, plus seeded from history
+        state = RSIState(period=6)
+        for i, close in enumerate(closes[:-1]):
+            if i in (3, 50, 150):
+                assert state.peek(closes[i]) == rsi_last(closes[:i + 1], 6)[0]
+            state.update(close, timestamp=i)
+        assert state.value() == rsi_last(closes[:-1], 6)[0]
+        
+        # Peeking at the forming candle does not change the state
+        before = state.to_dict()
+        assert state.peek(closes[-1]) == rsi_last(closes, 6)[0]
+        assert state.to_dict() == before
+        
+        seeded = RSIState.from_history(closes[:100], timestamp=99)
+        assert seeded.value() == rsi_last(closes[:100], 6)[0]
+        
+        # Snapshots survive a JSON round trip
+        restored = RSIState.from_dict(json.loads(json.dumps(seeded.to_dict())))
+        
+        # advance() commits only candles after the state's last one
+        candles = np.zeros(200, dtype=OHLCV_DTYPE)
+        candles['timestamp'] = np.arange(200)
+        candles['close'] = closes[:200]
+        assert restored.advance(candles[50:])
+        assert restored.timestamp == 199
+        assert restored.value() == rsi_last(closes[:200], 6)[0]
+        assert not RSIState.from_history(closes[:10], timestamp=9).advance(candles[20:])
+        
+        # A seed without losses holds RSI at 100 only while it opens the 100-close window
+        rising = np.r_[np.arange(100.0, 107.0), 107 + np.cumsum(rng.normal(0, 1, 293))]
+        state = RSIState(period=6)
+        for i, close in enumerate(rising):
+            state.update(close, timestamp=i)
+            if 6 <= i < 100:
+                assert state.value() == rsi_last(rising[:i + 1], 6)[0] == 100
+        window_rsi = rsi_last(rising[-100:], 6)[0]
+        assert window_rsi < 100 and abs(state.value() - window_rsi) < 1e-6, (state.value(), window_rsi)
+        
+        # Seeded from 99 closes the forming candle still peeks at 100, one close later
+        # advance() takes the pin from the first deltas of the new window
+        seeded = RSIState.from_history(rising[:99], timestamp=98)
+        assert seeded.peek(rising[99]) == rsi_last(rising[:100], 6)[0] == 100
+        candles['close'] = rising[:200]
+        assert seeded.advance(candles[:150])
+        window_rsi = rsi_last(rising[50:150], 6)[0]
+        assert window_rsi < 100 and abs(seeded.peek(rising[149]) - window_rsi) < 1e-6
+        assert not seeded.advance(candles[100:160]), "a window start before the candles must re-seed"
+        
+        print(f"✓ Streaming RSI state working!")
+        print(f"  Incremental updates match the batched RSI, pins follow the window")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Streaming RSI state failed: {e}")
+        return False
+
+
+def test_rsi_sliding_window():
+    """Test that full and quick checks give rsi_last of the sliding 100-bar window"""
+    print("\nTesting streaming RSI against sliding windows...")
+    
+    try:
+        import numpy as np
+        from candle_cache import OHLCV_DTYPE
+        from crypto_monitor_auto import AutoCryptoMonitor
+        from indicators import rsi_last
+        
+        day_ms, bar_ms = 86400 * 1000, 4 * 3600 * 1000
+        start = 1_600_000_000_000 // day_ms * day_ms
+        rng = np.random.default_rng(21)
+        
+        def candles(period, count):
+            bars = np.zeros(count, dtype=OHLCV_DTYPE)
+            bars['timestamp'] = start + np.arange(count) * period
+            # An upward drift, so windows often open with loss-free deltas
+            bars['close'] = 1000 + np.cumsum(rng.normal(0.3, 1, count))
+            return bars
+        
+        candles_4h, candles_1d = candles(bar_ms, 3000), candles(day_ms, 500)
+        monitor = AutoCryptoMonitor()
+        monitor.rsi_state_file = None
+        quick = []
+        monitor.raise_alerts = lambda symbol, price, near, rsi_4h, rsi_1d: quick.append(rsi_4h)
+        
+        # Full checks twice a day, quick checks on the 4h closes in between
+        worst, pinned, checks = 0.0, 0, 0
+        for bar in range(9, len(candles_4h)):
+            day = bar // 6
+            window_4h = candles_4h[max(0, bar - 99):bar + 1]
+            expected = rsi_last(window_4h['close'], 6)[0]
+            if bar % 3 == 0:
+                frames = {'4h': window_4h, '1d': candles_1d[max(0, day - 99):day + 1]}
+                rsi_4h, rsi_1d = monitor.compute_rsi_batch({'TEST/USDT': frames})['TEST/USDT']
+                worst = max(worst, abs(rsi_1d - rsi_last(frames['1d']['close'], 6)[0]))
+            else:
+                monitor.quick_check('TEST/USDT', window_4h)
+                rsi_4h = quick.pop()
+            worst = max(worst, abs(rsi_4h - expected))
+            pinned += expected == 100
+            checks += 1
+        
+        assert pinned > 50, f"only {pinned} loss-free windows"
+        # Older seeds than the window's own decay to a few 1e-6 after 94 Wilder steps
+        assert worst < 1e-4, f"off by {worst}"
+        
+        print(f"✓ Streaming RSI follows the sliding window!")
+        print(f"  {checks} full and quick checks, {pinned} loss-free windows pinned at 100")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Streaming RSI sliding window failed: {e}")
+        return False
+
+
+def test_sr_vectorized():
+    """Test vectorized support/resistance against the bar-by-bar loop"""
+    print("\nTesting vectorized support/resistance...")
+    
+    try:
+        import numpy as np
+        from indicators import support_resistance
+        
+        def loop_levels(highs, lows, threshold, window=5):
+            # The original pivot scan and clustering, without the type vote
+            levels = []
+            for i in range(window, len(highs) - window):
+                if highs[i] == max(highs[i-window:i+window+1]):
+                    levels.append(highs[i])
+                if lows[i] == min(lows[i-window:i+window+1]):
+                    levels.append(lows[i])
+            levels.sort()
+            clusters = []
+            for level in levels:
+                if clusters and abs(level - clusters[-1][0]) / clusters[-1][0] < threshold:
+                    clusters[-1].append(level)
+                else:
+                    clusters.append([level])
+            return [np.mean(cluster) for cluster in clusters]
+        
+        rng = np.random.default_rng(3)
+        for trial in range(200):
+            base = 100 + np.cumsum(rng.normal(0, 2, 300))
+            highs = base + rng.uniform(0, 2, 300)
+            lows = base - rng.uniform(0, 2, 300)
+            if trial % 2:
+                # Repeated prices create plateaus and equal pivots
+                highs, lows = np.round(highs), np.round(lows)
+            
+            # threshold=0 keeps every level, equal ones included
+            for threshold in (0.02, 0):
+                levels = support_resistance(highs, lows, threshold)
+                assert [level for level, _ in levels] == loop_levels(highs, lows, threshold)
+        
+        # Clear majorities keep their type
+        highs = np.array([1, 2, 3, 4, 5, 10, 5, 4, 3, 2, 1, 2, 3], dtype=float)
+        lows = highs - 0.5
+        assert support_resistance(highs, lows) == [(10.0, 'resistance')]
+        
+        print(f"✓ Vectorized support/resistance working!")
+        print(f"  Levels match the bar-by-bar loop exactly")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Vectorized support/resistance failed: {e}")
+        return False
+
+
+def test_level_index():
+    """Test incremental support/resistance index against a full recompute"""
+    print("\nTesting incremental support/resistance index...")
+    
+    try:
+        import numpy as np
+        from candle_cache import OHLCV_DTYPE
+        from resample import resample_candles
+        from indicators import support_resistance
+        from level_index import LevelIndex
+        
+        rng = np.random.default_rng(5)
+        days = 900
+        daily = np.zeros(days, dtype=OHLCV_DTYPE)
+        daily['timestamp'] = (np.arange(days) + 4) * 86400000
+        base = np.abs(100 + np.cumsum(rng.normal(0, 2, days))) + 5
+        daily['high'] = np.round(base + rng.uniform(0, 2, days), 1)
+        daily['low'] = np.round(base - rng.uniform(0, 2, days), 1)
+        daily['close'] = base
+        
+        index = LevelIndex(min_bars=15)
+        for end in range(10, days):
+            for step in (1, 2):
+                # The forming daily bar widens during the day
+                candles = daily[:end + 1].copy()
+                candles['high'][-1] = candles['low'][-1] + step * (candles['high'][-1] - candles['low'][-1]) / 2
+                price = float(candles['close'][-1])
+                
+                for timeframe in ('1w', '1M'):
+                    bars = resample_candles(candles, timeframe)[-100:]
+                    expected = support_resistance(bars['high'], bars['low'], 0.02) if len(bars) >= 15 else []
+                    assert index.update('BTC/USDT', timeframe, bars, 0.02) == expected
+                    assert index.near('BTC/USDT', timeframe, price, 0.02) == [
+                        (level, level_type) for level, level_type in expected
+                        if abs(price - level) / level < 0.02]
+        
+        index.evict('BTC/USDT')
+        assert index.levels('BTC/USDT', '1w') == []
+        
+        print(f"✓ Incremental support/resistance index working!")
+        print(f"  Levels match a full recompute after every update")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Incremental support/resistance index failed: {e}")
+        return False
+
+
+def test_scheduler():
+    """Test candle-close-aware scheduling"""
+    print("\nTesting candle-close scheduler...")
+    
+    try:
+        from datetime import datetime, timezone
+        from scheduler import CandleScheduler, candle_open, candle_close
+        
+        def ms(text):
+            return int(datetime.fromisoformat(text).replace(tzinfo=timezone.utc).timestamp() * 1000)
+        
+        now = ms('2026-10-18T13:00:00')  # a Sunday
+        assert candle_open('4h', now) == ms('2026-10-18T12:00:00')
+        assert candle_close('4h', now) == ms('2026-10-18T16:00:00')
+        assert candle_close('1d', now) == ms('2026-10-19T00:00:00')
+        assert candle_open('1w', now) == ms('2026-10-12T00:00:00')
+        assert candle_close('1w', now) == ms('2026-10-19T00:00:00')
+        assert candle_open('1M', now) == ms('2026-10-01T00:00:00')
+        assert candle_close('1M', ms('2026-12-31T23:00:00')) == ms('2027-01-01T00:00:00')
+        
+        scheduler = CandleScheduler(['4h', '1d', '1w', '1M'], check_interval=300, grace=10)
+        start = ms('2026-10-18T15:53:00') / 1000
+        assert scheduler.closed_timeframes(start) == ['4h', '1d', '1w', '1M']
+        scheduler.mark_full(start)
+        assert scheduler.closed_timeframes(start) == []
+        
+        # Price check after CHECK_INTERVAL, then the 4h close plus grace
+        assert scheduler.sleep_time(start) == 300
+        scheduler.mark_checked(start + 300)
+        assert scheduler.sleep_time(start + 300) == 130
+        assert scheduler.closed_timeframes(start + 425) == []
+        assert scheduler.closed_timeframes(start + 430) == ['4h']
+        
+        # Midnight closes daily, weekly (Monday) and monthly candles at once
+        scheduler.mark_full(ms('2026-10-31T23:59:00') / 1000)
+        assert scheduler.closed_timeframes(ms('2026-11-01T00:00:10') / 1000) == ['4h', '1d', '1M']
+        
+        print(f"✓ Candle-close scheduler working!")
+        print(f"  Wakes on 4h/1d/1w/1M closes plus grace, price checks in between")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Candle-close scheduler failed: {e}")
+        return False
+
+
+def test_ticker_screen():
+    """Test the fetch_tickers screen between candle closes"""
+    print("\nTesting ticker screening...")
+    
+    try:
+        import time
+        import numpy as np
+        from candle_cache import OHLCV_DTYPE
+        from fetch_engine import OHLCVFetchEngine
+        from crypto_monitor_auto import AutoCryptoMonitor
+        
+        now = int(time.time() * 1000)
+        rng = np.random.default_rng(9)
+        
+        def candles(period, count):
+            bars = np.zeros(count, dtype=OHLCV_DTYPE)
+            bars['timestamp'] = (now // period - count + 1 + np.arange(count)) * period
+            bars['close'] = 100 + np.cumsum(rng.normal(0, 1, count))
+            bars['high'] = bars['close'] + 1
+            bars['low'] = bars['close'] - 1
+            return bars
+        
+        frames_by_symbol = {symbol: {'4h': candles(4 * 3600000, 100), '1d': candles(86400000, 1500)}
+                            for symbol in ('AAA/USDT', 'BBB/USDT', 'CCC/USDT')}
+        
+        class FakeExchange:
+            def __init__(self):
+                self.ohlcv_requests = []
+            
+            def fetch_tickers(self):
+                near = monitor.level_index.levels('AAA/USDT', '1w')[0][0]
+                return {'AAA/USDT': {'last': near}, 'BBB/USDT': {'last': 1e9}, 'CCC/USDT': {'last': None}}
+            
+            def fetch_ohlcv(self, symbol, timeframe, since=None, limit=100):
+                self.ohlcv_requests.append(symbol)
+                return frames_by_symbol[symbol][timeframe][-limit:].tolist()
+        
+        monitor = AutoCryptoMonitor()
+        monitor.rsi_state_file = None
+        monitor.rsi_overbought = -1  # every RSI counts as extreme
+        monitor.candle_cache.store = None
+        exchange = FakeExchange()
+        monitor.exchange = exchange
+        monitor.fetch_engine = OHLCVFetchEngine(exchange, 4, monitor.candle_cache)
+        monitor.active_symbols = list(frames_by_symbol)
+        
+        alerts = []
+        monitor.raise_alerts = lambda symbol, *args: alerts.append(symbol)
+        
+        # A full check builds levels and RSI states, then one ticker call screens everything
+        rsi_by_symbol = monitor.compute_rsi_batch(frames_by_symbol)
+        for symbol, frames in frames_by_symbol.items():
+            monitor.check_symbol(symbol, frames, rsi_by_symbol[symbol])
+        alerts.clear()
+        
+        monitor.run_price_check()
+        assert exchange.ohlcv_requests == ['AAA/USDT'], exchange.ohlcv_requests
+        assert alerts == ['AAA/USDT']
+        
+        print(f"✓ Ticker screening working!")
+        print(f"  1 of 3 symbols needed candles after one fetch_tickers call")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Ticker screening failed: {e}")
+        return False
+
+
+def test_sharded_monitor():
+    """Test shard assignment and central alert dedup"""
+    print("\nTesting sharded monitor...")
+    
+    try:
+        import os
+        from rate_limiter import set_budget_share
+        from crypto_monitor_sharded import ShardedCryptoMonitor, ShardWorker, shard_of
+        from alert_store import AlertStore
+        
+        os.environ['PROCESS_SHARDS'] = '3'
+        try:
+            monitor = ShardedCryptoMonitor()
+        finally:
+            del os.environ['PROCESS_SHARDS']
+            set_budget_share(1.0)
+        
+        symbols = [f"SYM{i}/USDT" for i in range(300)]
+        shards = monitor.shard_symbols(symbols)
+        assert sorted(sum(shards, [])) == sorted(symbols)
+        assert all(shards), "a shard got no symbols"
+        assert all(shard_of(symbol, 3) == i for i, shard in enumerate(shards) for symbol in shard)
+        
+        # Workers return candidates instead of notifying
+        worker = ShardWorker(0)
+        worker.rsi_overbought = -1
+        worker.raise_alerts('SYM0/USDT', 100.0, [(99.0, 'support'), (101.0, 'resistance')], 50.0, 50.0)
+        candidates = worker.take_pending()
+        assert [c['level_type'] for c in candidates] == ['support', 'resistance']
+        assert worker.take_pending() == []
+        
+        # The coordinator drops duplicates reported by different shards
+        notified = []
+        monitor.send_notification = lambda title, message, summary=None: notified.append(title)
+        monitor.gather = lambda function, arguments: candidates + candidates
+        monitor.alert_store = AlertStore()
+        monitor.executors = [None] * 3
+        monitor.active_symbols = symbols
+        monitor.run_full_cycle()
+        monitor.run_full_cycle()
+        assert len(notified) == 2
+        
+        # A real run: spawned workers start, log through the coordinator and run cycles
+        import logging
+        from crypto_monitor_sharded import _full_cycle, _price_check
+        
+        records = []
+        
+        class Capture(logging.Handler):
+            def emit(self, record):
+                records.append(record)
+        
+        capture = Capture()
+        worker_logger = logging.getLogger('crypto_monitor_auto')
+        worker_logger.addHandler(capture)
+        settings = {'PROCESS_SHARDS': '2', 'CANDLE_STORE_DIR': '', 'RSI_STATE_FILE': '', 'ALERT_STORE_FILE': '',
+                    'LOG_FILE': ''}
+        saved = {key: os.environ.get(key) for key in settings}
+        os.environ.update(settings)
+        try:
+            spawned = ShardedCryptoMonitor()
+            spawned.alert_store = AlertStore()
+            spawned.start_workers()
+            try:
+                results = [executor.submit(_full_cycle, []).result(timeout=120) for executor in spawned.executors]
+                results += [executor.submit(_price_check, [], {}).result(timeout=60) for executor in spawned.executors]
+                pids = [executor.submit(os.getpid).result(timeout=60) for executor in spawned.executors]
+                spawned.run_full_cycle()
+            finally:
+                spawned.stop_workers()
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+            set_budget_share(1.0)
+            worker_logger.removeHandler(capture)
+        
+        assert results == [[], [], [], []]
+        assert len(set(pids)) == 2 and os.getpid() not in pids
+        initialized = {record.process for record in records if record.getMessage().startswith('Initialized')}
+        assert set(pids) <= initialized, "worker logs were not forwarded"
+        
+        print(f"✓ Sharded monitor working!")
+        print(f"  300 symbols over 3 shards, duplicate alerts suppressed centrally, 2 spawned workers ran")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Sharded monitor failed: {e}")
+        return False
+
+
+def test_candles():
+    """Test the array-backed candle container"""
+    print("\nTesting array-backed candles...")
+    
+    try:
+        import numpy as np
+        from candle_cache import Candles, rows_to_array
+        from crypto_monitor import CryptoMonitor
+        
+        rng = np.random.default_rng(4)
+        close = 100 + np.cumsum(rng.normal(0, 1, 500))
+        rows = [[i * 3600000, c, c + 1, c - 1, c, 10.0] for i, c in enumerate(close)]
+        candles = Candles(rows_to_array(rows))
+        
+        # Columns and slices are views of the one array
+        assert np.shares_memory(candles.close, candles.data)
+        assert np.shares_memory(candles[-100:].high, candles.data)
+        assert len(candles[-100:]) == 100 and candles['close'][-1] == close[-1]
+        
+        monitor = CryptoMonitor()
+        df = candles.to_dataframe()
+        assert str(df['timestamp'].dtype).startswith('datetime64')
+        assert monitor.find_support_resistance(candles) == monitor.find_support_resistance(df)
+        assert monitor.calculate_rsi(candles.close) == monitor.calculate_rsi(df['close'].values)
+        
+        print(f"✓ Array-backed candles working!")
+        print(f"  Columns and slices are views, indicators need no DataFrame")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Array-backed candles failed: {e}")
+        return False
+
+
+def test_markets_cache():
+    """Test that markets are downloaded once per TTL and reused across instances"""
+    print("\nTesting markets cache...")
+    
+    try:
+        import os
+        import tempfile
+        import markets_cache
+        
+        class FakeExchange:
+            def __init__(self):
+                self.markets = None
+                self.downloads = 0
+            
+            def load_markets(self, reload=False):
+                self.downloads += 1
+                self.markets = {'BTC/USDT': {'symbol': 'BTC/USDT', 'quote': 'USDT', 'active': True}}
+                return self.markets
+            
+            def set_markets(self, markets):
+                self.markets = markets
+        
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                first = FakeExchange()
+                markets = markets_cache.load_markets(first, 'fake', ttl=3600)
+                assert first.downloads == 1 and 'BTC/USDT' in markets
+                assert os.path.exists(markets_cache.cache_path('fake'))
+                
+                # A second monitor in the same process reuses the memory copy
+                second = FakeExchange()
+                assert markets_cache.load_markets(second, 'fake', ttl=3600) == markets
+                assert second.downloads == 0 and second.markets == markets
+                
+                # A fresh process reads the file instead of downloading
+                markets_cache._markets.clear()
+                third = FakeExchange()
+                assert markets_cache.load_markets(third, 'fake', ttl=3600) == markets
+                assert third.downloads == 0
+                
+                # An expired cache is downloaded again
+                fourth = FakeExchange()
+                markets_cache.load_markets(fourth, 'fake', ttl=0)
+                assert fourth.downloads == 1
+            finally:
+                markets_cache._markets.pop('fake', None)
+                os.chdir(cwd)
+        
+        print(f"✓ Markets cache working!")
+        print(f"  Markets downloaded once, then served from memory and disk until the TTL")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Markets cache failed: {e}")
+        return False
+
+
+def test_universe_diff():
+    """Test that a symbol refresh keeps survivors' state and warms up only new symbols"""
+    print("\nTesting symbol universe diff...")
+    
+    try:
+        import numpy as np
+        from universe import diff_symbols
+        from crypto_monitor_auto import AutoCryptoMonitor
+        from indicators import RSIState
+        from alert_store import AlertStore
+        
+        diff = diff_symbols(['A', 'B', 'C', 'D'], ['B', 'A', 'E', 'D'])
+        assert diff.added == ['E'] and diff.removed == ['C'] and diff.kept == 3
+        assert diff.moved == {'A': (0, 1), 'B': (1, 0)}
+        assert not diff_symbols(['A', 'B'], ['A', 'B'])
+        
+        class FakeEngine:
+            def __init__(self):
+                self.requested = []
+            
+            def iter_symbols(self, symbols, timeframes):
+                self.requested.extend(symbols)
+                return iter([])
+        
+        monitor = AutoCryptoMonitor()
+        monitor.candle_cache.store = None
+        monitor.rsi_state_file = None
+        monitor.alert_store = AlertStore()
+        monitor.fetch_engine = FakeEngine()
+        
+        monitor.active_symbols = ['A/USDT', 'B/USDT', 'C/USDT']
+        candles = np.zeros(3, dtype=[('timestamp', '<i8'), ('close', '<f8')])
+        for symbol in monitor.active_symbols:
+            monitor.candle_cache.put(symbol, '4h', candles)
+            monitor.rsi_states[(symbol, '4h')] = RSIState()
+            monitor.alert_store.claim(symbol, 'support', 'OVERSOLD')
+        
+        diff = monitor.update_symbols(['B/USDT', 'A/USDT', 'D/USDT'])
+        monitor.warm_up_thread.join(timeout=10)
+        assert diff.added == ['D/USDT'] and diff.removed == ['C/USDT']
+        assert monitor.active_symbols == ['B/USDT', 'A/USDT', 'D/USDT']
+        
+        # Survivors keep everything, the dropped symbol only its alert cooldowns
+        for symbol in ('A/USDT', 'B/USDT'):
+            assert monitor.candle_cache.get(symbol, '4h') is candles
+            assert (symbol, '4h') in monitor.rsi_states
+        assert monitor.candle_cache.get('C/USDT', '4h') is None
+        assert ('C/USDT', '4h') not in monitor.rsi_states
+        assert not monitor.alert_store.claim('C/USDT', 'support', 'OVERSOLD')
+        
+        # Only the new symbol is warmed up, then handed over once for its first check
+        assert monitor.fetch_engine.requested == ['D/USDT']
+        assert monitor.take_warmed_symbols() == ['D/USDT']
+        assert monitor.take_warmed_symbols() == []
+        
+        print(f"✓ Symbol universe diff working!")
+        print(f"  Survivors kept their state, 1 symbol warmed up, 1 released")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Symbol universe diff failed: {e}")
+        return False
+
+
+def test_discovery_filter():
+    """Test the vectorized discovery filter against a per-market loop"""
+    print("\nTesting vectorized symbol discovery...")
+    
+    try:
+        import random
+        from discovery import market_table, filter_mask, top_by_volume
+        
+        random.seed(7)
+        markets, tickers = {}, {}
+        for i in range(2500):
+            quote = random.choice(['USDT', 'BTC', 'EUR', 'ETH'])
+            symbol = f"C{i}/{quote}"
+            markets[symbol] = {'quote': quote, 'active': random.random() < 0.9,
+                               'created': random.choice([None, 0, 1_600_000_000_000, 1_700_000_000_000])}
+            if random.random() < 0.95:
+                bid = random.random()
+                tickers[symbol] = {
+                    # Repeated volumes check that ties keep market order
+                    'quoteVolume': random.choice([None, 0, 2e6, 5e5, random.random() * 1e8]),
+                    'last': random.choice([None, 1e-9, bid]),
+                    'bid': bid, 'ask': bid * random.choice([1.001, 1.05]),
+                }
+        
+        quotes = ['USDT', 'BTC', 'ETH']
+        now_ms = 1_700_000_000_000 + 10 * 86400 * 1000
+        
+        expected = []
+        for symbol, market in markets.items():
+            ticker = tickers.get(symbol)
+            if not market['active'] or market['quote'] not in quotes or ticker is None:
+                continue
+            volume = ticker['quoteVolume'] or 0
+            if (volume and volume < 1e6) or (ticker['last'] and ticker['last'] < 1e-6):
+                continue
+            if (ticker['ask'] - ticker['bid']) / ((ticker['ask'] + ticker['bid']) / 2) > 0.01:
+                continue
+            if market['created'] and market['created'] > now_ms - 30 * 86400 * 1000:
+                continue
+            expected.append((symbol, volume))
+        expected.sort(key=lambda item: item[1], reverse=True)
+        
+        table = market_table(markets, tickers, quotes)
+        mask = filter_mask(table, 1e6, 1e-6, max_spread=0.01, min_listing_days=30, now_ms=now_ms)
+        for count in (0, 1, 50, 100, len(expected), len(expected) + 10):
+            selected = table['symbol'][top_by_volume(table['volume'], mask, count)].tolist()
+            assert selected == [symbol for symbol, _ in expected[:count]], f"top {count} differs"
+        
+        print(f"✓ Vectorized symbol discovery working!")
+        print(f"  {len(markets)} markets filtered, {len(expected)} passed, top-N identical to a full sort")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Vectorized symbol discovery failed: {e}")
+        return False
+
+
+def test_streaming_monitor():
+    """Test the WebSocket streaming monitor against the local mock exchange"""
+    print("\nTesting streaming monitor...")
+    
+    try:
+        import asyncio
+        import time
+        import numpy as np
+        from mock_exchange import MockExchangeServer, MockStreamExchange
+        from alert_store import AlertStore
+        from crypto_monitor_stream import StreamingCryptoMonitor
+        
+        day_ms, bar_ms = 86400 * 1000, 4 * 3600 * 1000
+        now_ms = int(time.time() * 1000)
+        rng = np.random.default_rng(11)
+        
+        def history(symbol, timeframe, step, count):
+            last_open = now_ms // step * step
+            closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, count)))
+            return [[last_open - (count - 1 - i) * step, c, c * 1.02, c * 0.98, c, 1.0]
+                    for i, c in enumerate(closes.tolist())]
+        
+        symbols = ['AAA/USDT', 'BBB/USDT']
+        candles = {}
+        for symbol in symbols:
+            candles[(symbol, '4h')] = history(symbol, '4h', bar_ms, 100)
+            candles[(symbol, '1d')] = history(symbol, '1d', day_ms, 800)
+        
+        async def wait_for(condition, timeout=5):
+            deadline = time.time() + timeout
+            while not condition():
+                assert time.time() < deadline, "timed out"
+                await asyncio.sleep(0.02)
+        
+        async def scenario():
+            server = await MockExchangeServer(candles).start()
+            monitor = StreamingCryptoMonitor(symbols, exchange=MockStreamExchange(server.url))
+            monitor.candle_cache.store = None
+            monitor.rsi_state_file = None
+            monitor.alert_store = AlertStore()
+            monitor.reconnect_delay = 0.05
+            monitor.fetch_limits = {'4h': 100, '1d': 800}
+            monitor.rsi_overbought = 1000
+            notified = []
+            monitor.send_notification = lambda title, message, summary=None: notified.append(title)
+            
+            task = asyncio.ensure_future(monitor.run_async())
+            try:
+                await wait_for(lambda: len(monitor.stream_tasks) == 4 and server.connections == 1
+                               and sum(map(len, server._sockets.values())) == 4)
+                
+                # A 4h tick at a weekly level alerts as soon as it arrives
+                monitor.rsi_overbought = -1
+                level = monitor.level_index.levels('AAA/USDT', '1w')[0][0]
+                row = list(candles[('AAA/USDT', '4h')][-1])
+                row[4] = level
+                await server.push('AAA/USDT', '4h', row)
+                await wait_for(lambda: notified)
+                assert notified[0] == 'AAA/USDT Trading Alert'
+                
+                # Dropped streams reconnect, resubscribe and catch up over REST
+                await server.drop_connections()
+                row = list(candles[('BBB/USDT', '4h')][-1])
+                row[4] = 123.0
+                await server.push('BBB/USDT', '4h', row)
+                await wait_for(lambda: server.connections == 2
+                               and monitor.candle_cache.get('BBB/USDT', '4h')['close'][-1] == 123.0)
+                
+                # A new 4h candle commits the closed one to the RSI state
+                row = [row[0] + bar_ms, 124.0, 124.0, 124.0, 124.0, 1.0]
+                await wait_for(lambda: sum(map(len, server._sockets.values())) == 4)
+                await server.push('BBB/USDT', '4h', row)
+                await wait_for(lambda: monitor.rsi_states[('BBB/USDT', '4h')].timestamp == row[0] - bar_ms)
+            finally:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                await server.stop()
+        
+        asyncio.run(asyncio.wait_for(scenario(), 30))
+        
+        print(f"✓ Streaming monitor working!")
+        print(f"  Alert on a streamed tick, reconnect with resubscription and REST catch-up")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Streaming monitor failed: {e!r}")
+        return False
+
+
+def test_alert_store():
+    """Test alert cooldowns, eviction and persistence across restarts"""
+    print("\nTesting alert store...")
+    
+    try:
+        import os
+        import tempfile
+        import time
+        from alert_store import AlertStore, parse_cooldowns
+        
+        # Alerts sent over the last few hours, the newest still in cooldown now
+        start = time.time() - 10000
+        cooldowns = parse_cooldowns('OVERBOUGHT=600, resistance_OVERSOLD=60')
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'alerts.db')
+            store = AlertStore(path, cooldown=3600, cooldowns=cooldowns)
+            
+            # Per-kind cooldowns: the most specific override wins
+            assert store.claim('A/USDT', 'support', 'OVERSOLD', now=start + 1000)
+            assert store.claim('A/USDT', 'resistance', 'OVERSOLD', now=start + 1000)
+            assert store.claim('A/USDT', 'support', 'OVERBOUGHT', now=start + 1000)
+            assert not store.claim('A/USDT', 'support', 'OVERSOLD', now=start + 4000)
+            assert store.claim('A/USDT', 'resistance', 'OVERSOLD', now=start + 1061)
+            assert store.claim('A/USDT', 'support', 'OVERBOUGHT', now=start + 1600)
+            assert store.claim('A/USDT', 'support', 'OVERSOLD', now=start + 4600)
+            
+            # Memory only holds alerts in cooldown, whatever the number of symbols seen
+            for i in range(1000):
+                store.claim(f"S{i}/USDT", 'support', 'OVERBOUGHT', now=start + 5000 + i)
+            store.claim('B/USDT', 'support', 'OVERSOLD', now=start + 6000 + 600)
+            assert len(store.expires) < 1000 and sum(map(len, store.queues)) < 1000
+            
+            # A restart, even without close(), keeps the alerts still in cooldown
+            restarted = AlertStore(path, cooldown=3600, cooldowns=cooldowns)
+            assert not restarted.claim('B/USDT', 'support', 'OVERSOLD')
+            assert restarted.claim('S0/USDT', 'support', 'OVERBOUGHT')
+            store.close()
+            restarted.close()
+        
+        print(f"✓ Alert store working!")
+        print(f"  Cooldowns per kind, expired alerts evicted, history kept across restarts")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Alert store failed: {e}")
+        return False
+
+def test_notification_dispatcher():
+    """Test background delivery: coalescing, retries, backpressure and sinks"""
+    print("\nTesting notification dispatcher...")
+    
+    try:
+        import json
+        import os
+        import tempfile
+        import threading
+        import time
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+        from notifier import NotificationDispatcher, Notification, FileSink, WebhookSink, digest
+        
+        class SlowFlakySink:
+            name = 'slow'
+            
+            def __init__(self):
+                self.batches = []
+                self.calls = 0
+            
+            def send(self, notifications, dropped=0):
+                self.calls += 1
+                time.sleep(0.2)
+                if self.calls == 1:
+                    raise ConnectionError('backend unavailable')
+                self.batches.append(([note.title for note in notifications], dropped))
+        
+        # A slow, failing sink never blocks submit, a cycle's alerts arrive as one batch after a retry
+        sink = SlowFlakySink()
+        dispatcher = NotificationDispatcher([sink], window=60, retry_delay=0.01)
+        start = time.time()
+        for i in range(20):
+            dispatcher.submit(f"A{i}", 'message', summary=f"A{i} summary")
+        dispatcher.flush()
+        assert time.time() - start < 0.1, "submit waited on delivery"
+        assert dispatcher.wait_idle(5)
+        assert sink.calls == 2 and sink.batches == [([f"A{i}" for i in range(20)], 0)]
+        
+        # Past the queue size the oldest alerts are dropped and reported with the next batch
+        sink = SlowFlakySink()
+        sink.calls = 1
+        dispatcher = NotificationDispatcher([sink], window=60, max_pending=5)
+        for i in range(3):
+            dispatcher.submit(f"B{i}", 'message')
+        dispatcher.flush()
+        time.sleep(0.05)
+        for i in range(3, 13):
+            dispatcher.submit(f"B{i}", 'message')
+        assert dispatcher.wait_idle(5)
+        titles, dropped = sink.batches[-1]
+        assert titles == [f"B{i}" for i in range(8, 13)] and dropped == 5, sink.batches
+        assert dispatcher.stats()['slow'] == {'sent': 8, 'failed': 0, 'dropped': 5}
+        assert dispatcher.delivered() == 8 and NotificationDispatcher([]).delivered() == 0
+        
+        # Desktop pop-ups summarize a batch in a few lines
+        notes = [Notification(f"C{i}", 'message', f"C{i} summary", 0) for i in range(7)]
+        title, message = digest(notes, dropped=2)
+        assert title == '9 Trading Alerts' and message.splitlines()[-1] == '... and 4 more'
+        
+        # File and local webhook sinks get every alert of the batch
+        received = []
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                received.append(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+                self.send_response(200)
+                self.end_headers()
+            
+            def log_message(self, *args):
+                pass
+        
+        server = HTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'alerts.log')
+            url = f"http://127.0.0.1:{server.server_address[1]}/hook"
+            dispatcher = NotificationDispatcher([FileSink(path), WebhookSink(url)], window=60)
+            dispatcher.submit('BTC/USDT Trading Alert', 'BTC/USDT Alert!\nPrice: $1.00', summary='BTC/USDT OVERSOLD')
+            dispatcher.submit('ETH/USDT Trading Alert', 'ETH/USDT Alert!\nPrice: $2.00')
+            dispatcher.close()
+            with open(path, encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        server.shutdown()
+        server.server_close()
+        assert len(lines) == 2 and lines[0].endswith('BTC/USDT Trading Alert: BTC/USDT Alert! | Price: $1.00')
+        assert len(received) == 1 and [alert['summary'] for alert in received[0]['alerts']] == ['BTC/USDT OVERSOLD', None]
+        
+        print(f"✓ Notification dispatcher working!")
+        print(f"  20 alerts in one retried batch, overflow dropped oldest-first, file and webhook delivered")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Notification dispatcher failed: {e}")
+        return False
+
+def test_logging_pipeline():
+    """Test queued logging with rotation, JSON check records and worker forwarding"""
+    print("\nTesting logging pipeline...")
+    
+    try:
+        import json
+        import os
+        import subprocess
+        import sys
+        import tempfile
+        
+        # A fresh process, so the root logger is unconfigured like at startup
+        script = (
+            "import logging, queue, sys\n"
+            "from log_setup import setup_logging, stop_logging, log_check, listen_to_workers\n"
+            "log_file, check_file = sys.argv[1], sys.argv[2]\n"
+            "setup_logging(log_file=log_file, max_bytes=4000, backups=2, check_log_file=check_file)\n"
+            "logger = logging.getLogger('scan')\n"
+            "for i in range(200):\n"
+            "    logger.info('%s - Price: $%.2f', 'BTC/USDT', i)\n"
+            "    logger.debug('never formatted %s', i)\n"
+            "log_check(check='full', symbol='BTC/USDT', price=1.5, rsi_4h=91.0, rsi_1d=50.0, near=[(1.49, 'support')])\n"
+            "# A record as a worker process's QueueHandler sends it\n"
+            "records = queue.Queue()\n"
+            "listen_to_workers(records)\n"
+            "records.put(logging.makeLogRecord({'name': 'worker', 'levelno': logging.INFO, 'levelname': 'INFO',\n"
+            "                                   'msg': 'from shard 1'}))\n"
+            "stop_logging()\n"
+        )
+        here = os.path.dirname(os.path.abspath(__file__))
+        with tempfile.TemporaryDirectory() as tmp:
+            log_file, check_file = os.path.join(tmp, 'monitor.log'), os.path.join(tmp, 'checks.jsonl')
+            subprocess.run([sys.executable, '-c', script, log_file, check_file], cwd=here,
+                           capture_output=True, text=True, timeout=60, check=True)
+            
+            # Size-based rotation keeps at most backups + 1 files
+            files = sorted(os.listdir(tmp))
+            assert files == ['checks.jsonl', 'monitor.log', 'monitor.log.1', 'monitor.log.2'], files
+            assert all(os.path.getsize(os.path.join(tmp, name)) <= 4000 for name in files if name.startswith('monitor'))
+            with open(log_file, encoding='utf-8') as f:
+                lines = f.read().splitlines()
+            assert lines[-2].endswith('INFO - BTC/USDT - Price: $199.00'), lines[-2]
+            assert lines[-1].endswith('INFO - from shard 1'), lines[-1]
+            
+            with open(check_file, encoding='utf-8') as f:
+                records = [json.loads(line) for line in f]
+            assert len(records) == 1 and records[0]['symbol'] == 'BTC/USDT'
+            assert records[0]['rsi_4h'] == 91.0 and records[0]['near'] == [[1.49, 'support']]
+        
+        print(f"✓ Logging pipeline working!")
+        print(f"  Log rotated at 4 KB, one JSON check record, worker record forwarded")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Logging pipeline failed: {e}")
+        return False
+
+def test_metrics():
+    """Test stage timers, request metrics from the rate limiter and the /metrics endpoint"""
+    print("\nTesting metrics...")
+    
+    try:
+        import ccxt
+        import metrics
+        from urllib.request import urlopen
+        from rate_limiter import TokenBucket, RateLimitedExchange
+        
+        metrics.reset()
+        with metrics.stage('rsi'):
+            pass
+        metrics.observe('stage_seconds', 3.0, stage='full_cycle')
+        metrics.set_gauge('active_symbols', 42)
+        
+        class FlakyExchange:
+            id = 'binance'
+            markets = None
+            last_response_headers = {'Retry-After': '0'}
+            last_http_response = '[[0,1,2,0.5,1.5,10]]'
+            
+            def __init__(self):
+                self.calls = 0
+            
+            def fetch_ohlcv(self, symbol, timeframe, limit=100):
+                self.calls += 1
+                if self.calls == 1:
+                    raise ccxt.RateLimitExceeded('429 Too Many Requests')
+                return [[0, 1, 2, 0.5, 1.5, 10]]
+            
+            def fetch_ticker(self, symbol):
+                raise ccxt.NetworkError('timeout')
+        
+        exchange = RateLimitedExchange(FlakyExchange(), TokenBucket(rate=1000, capacity=100))
+        exchange.fetch_ohlcv('BTC/USDT', '4h')
+        try:
+            exchange.fetch_ticker('BTC/USDT')
+        except ccxt.NetworkError:
+            pass
+        
+        port = metrics.start_server(0)
+        try:
+            with urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+                body = response.read().decode('utf-8')
+        finally:
+            metrics.stop_server()
+        
+        assert '# TYPE crypto_monitor_stage_seconds histogram' in body
+        assert 'crypto_monitor_stage_seconds_count{stage="rsi"} 1' in body
+        assert 'crypto_monitor_stage_seconds_bucket{stage="full_cycle",le="2.5"} 0' in body
+        assert 'crypto_monitor_stage_seconds_bucket{stage="full_cycle",le="5"} 1' in body
+        assert 'crypto_monitor_request_seconds_count{method="fetch_ohlcv",timeframe="4h"} 2' in body
+        assert 'crypto_monitor_request_retries_total{method="fetch_ohlcv",timeframe="4h"} 1' in body
+        assert 'crypto_monitor_request_errors_total{method="fetch_ticker"} 1' in body
+        assert 'crypto_monitor_response_bytes_total{method="fetch_ohlcv",timeframe="4h"} 40' in body
+        assert '# TYPE crypto_monitor_active_symbols gauge' in body
+        
+        lines = metrics.summary()
+        assert any(line.startswith('stage_seconds stage=full_cycle: 1 x mean 3000.0ms, p95 <=5000ms')
+                   for line in lines), lines
+        metrics.reset()
+        
+        print(f"✓ Metrics working!")
+        print(f"  {len(body.splitlines())} lines served on /metrics")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Metrics failed: {e}")
+        return False
+
+def test_backtest_replay():
+    """Test that the batched replay gives the alerts of a bar-by-bar check_symbol replay"""
+    print("\nTesting backtest replay...")
+    
+    try:
+        import numpy as np
+        from backtest import SymbolHistory, ReplayEngine, replay
+        from candle_cache import rows_to_array
+        from resample import resample_candles
+        from indicators import rsi_last, support_resistance
+        
+        day_ms, bar_ms = 86400 * 1000, 4 * 3600 * 1000
+        start = 1_600_000_000_000 // day_ms * day_ms
+        rng = np.random.default_rng(5)
+        # The history opens with a loss-free RSI seed, RSI is 100 only while it opens the window
+        steps = rng.normal(0, 0.02, 6 * 240)
+        steps[:7] = np.abs(steps[:7]) + 0.001
+        closes = 100 * np.exp(np.cumsum(steps))
+        candles_4h = rows_to_array([[start + i * bar_ms, c, c * 1.01, c * 0.99, c, 1.0]
+                                    for i, c in enumerate(closes)])
+        daily = candles_4h.reshape(-1, 6)
+        candles_1d = rows_to_array([[day[0]['timestamp'], day[0]['open'], day['high'].max(), day['low'].min(),
+                                     day[-1]['close'], 6.0] for day in daily])
+        
+        overbought, oversold, threshold = 65, 35, 0.02
+        history = SymbolHistory('TEST/USDT', candles_4h, candles_1d)
+        timeline = replay(history, overbought, oversold, threshold)
+        
+        # Bar by bar: RSI of the last 100 closes, levels from resampled completed days, first level per type
+        expected = []
+        rsi_4h_bars = []
+        for i, close in enumerate(closes.tolist()):
+            days = i // 6
+            if days == 0:
+                continue
+            rsi_4h = rsi_last(closes[max(0, i - 99):i + 1], 6)[0]
+            rsi_1d = rsi_last(np.r_[candles_1d['close'][max(0, days - 99):days], close], 6)[0]
+            rsi_4h_bars.append(rsi_4h)
+            
+            near = []
+            for timeframe in ('1w', '1M'):
+                bars = resample_candles(candles_1d[:days], timeframe)[-100:]
+                levels = support_resistance(bars['high'], bars['low'], threshold) if len(bars) >= 15 else []
+                near += [(level, kind) for level, kind in levels if abs(close - level) / level < threshold]
+            high = rsi_4h > overbought or rsi_1d > overbought
+            if not near or not (high or rsi_4h < oversold or rsi_1d < oversold):
+                continue
+            sent = set()
+            for level, kind in near:
+                if kind not in sent:
+                    sent.add(kind)
+                    expected.append((i, round(level, 9), kind, 'OVERSOLD' if high else 'OVERBOUGHT'))
+        
+        bars = np.searchsorted(candles_4h['timestamp'], timeline['timestamp'])
+        got = [(int(bar), round(float(level), 9), str(kind), str(condition)) for bar, level, kind, condition
+               in zip(bars, timeline['level'], timeline['level_type'], timeline['condition'])]
+        assert np.array_equal(history.rsi_4h, rsi_4h_bars)
+        assert (history.rsi_4h[:94] == 100).all() and (history.rsi_4h[94:] < 100).mean() > 0.9
+        assert expected and got == expected, f"{len(got)} alerts, expected {len(expected)}"
+        
+        # Many parameter sets at once, statistics per set
+        engine = ReplayEngine([history], workers=1)
+        param_sets = [{'rsi_overbought': ob, 'rsi_oversold': os_, 'sr_threshold': t}
+                      for ob in (65, 80) for os_ in (20, 35) for t in (0.01, 0.02)]
+        results = engine.run(param_sets)
+        stats = results[param_sets.index({'rsi_overbought': 65, 'rsi_oversold': 35, 'sr_threshold': 0.02})]['stats']
+        assert stats['alerts'] == len(expected)
+        assert stats['scored'] <= stats['alerts'] and 0 <= stats['hits'] <= stats['scored']
+        
+        print(f"✓ Backtest replay working!")
+        print(f"  {len(expected)} alerts identical to a bar-by-bar replay on 100-bar windows, "
+              f"{len(param_sets)} parameter sets evaluated")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Backtest replay failed: {e}")
+        return False
+
+
+def test_backtest_sweep():
+    """Test that a grid sweep gives the statistics of replaying each combination"""
+    print("\nTesting backtest parameter sweep...")
+    
+    try:
+        import numpy as np
+        from backtest import SymbolHistory, ReplayEngine
+        from candle_cache import rows_to_array
+        
+        day_ms, bar_ms = 86400 * 1000, 4 * 3600 * 1000
+        start = 1_600_000_000_000 // day_ms * day_ms
+        histories = []
+        for seed in (1, 2):
+            rng = np.random.default_rng(seed)
+            closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 6 * 240)))
+            candles_4h = rows_to_array([[start + i * bar_ms, c, c * 1.01, c * 0.99, c, 1.0]
+                                        for i, c in enumerate(closes)])
+            daily = candles_4h.reshape(-1, 6)
+            candles_1d = rows_to_array([[day[0]['timestamp'], day[0]['open'], day['high'].max(), day['low'].min(),
+                                         day[-1]['close'], 6.0] for day in daily])
+            histories.append(SymbolHistory(f'TEST{seed}/USDT', candles_4h, candles_1d))
+        
+        # Values in no particular order, results come back in the given order
+        overbought, oversold, thresholds = [80, 65, 70], [35, 20, 30], [0.02, 0.01]
+        engine = ReplayEngine(histories, workers=1)
+        grid = engine.sweep(overbought, oversold, thresholds)
+        assert grid['alerts'].shape == (3, 3, 2)
+        
+        for i, ob in enumerate(overbought):
+            for j, os_ in enumerate(oversold):
+                for k, threshold in enumerate(thresholds):
+                    stats = engine.run([{'rsi_overbought': ob, 'rsi_oversold': os_, 'sr_threshold': threshold}])[0]['stats']
+                    for key in ('alerts', 'scored', 'hits'):
+                        assert grid[key][i, j, k] == stats[key], f"{key} differs at {ob}/{os_}/{threshold}"
+                    assert np.isclose(grid['mean_return'][i, j, k], stats['mean_return'], equal_nan=True)
+        assert grid['alerts'].sum() > 0
+        
+        print(f"✓ Backtest sweep working!")
+        print(f"  {grid['alerts'].size} combinations identical to one replay each")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Backtest sweep failed: {e}")
+        return False
+
+# Seconds allowed for importing every entry point, heavy modules excluded
+STARTUP_BUDGET_SECONDS = 0.6
+
+
+def test_startup_time():
+    """Test that entry points import fast, without ccxt, pandas or plyer"""
+    print("\nTesting startup time...")
+    
+    try:
+        import json
+        import os
+        import subprocess
+        import sys
+        
+        script = (
+            "import json, sys, time\n"
+            "start = time.perf_counter()\n"
+            "import crypto_monitor, crypto_monitor_auto, crypto_monitor_async, crypto_monitor_sharded\n"
+            "import crypto_monitor_stream\n"
+            "import crypto_monitor_gui, crypto_monitor_auto_gui\n"
+            "elapsed = time.perf_counter() - start\n"
+            "heavy = [m for m in ('ccxt', 'pandas', 'plyer', 'aiohttp') if m in sys.modules]\n"
+            "print(json.dumps({'elapsed': elapsed, 'heavy': heavy}))\n"
+        )
+        here = os.path.dirname(os.path.abspath(__file__))
+        output = subprocess.run([sys.executable, '-c', script], cwd=here, capture_output=True,
+                                text=True, timeout=60, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        
+        assert result['heavy'] == [], f"loaded at import time: {result['heavy']}"
+        assert result['elapsed'] < STARTUP_BUDGET_SECONDS, \
+            f"imports took {result['elapsed']:.2f}s, budget {STARTUP_BUDGET_SECONDS}s"
+        
+        print(f"✓ Startup time within budget!")
+        print(f"  All entry points imported in {result['elapsed']:.2f}s (budget {STARTUP_BUDGET_SECONDS}s)")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Startup time check failed: {e}")
+        return False
+
+
 def test_notifications():
     """Test desktop notifications"""
     print("\nTesting desktop notifications...")
@@ -144,6 +1646,32 @@ def main():
         ("Exchange Connection", test_exchange_connection),
         ("RSI Calculation", test_rsi_calculation),
         ("Support/Resistance Detection", test_support_resistance),
+        ("Concurrent Fetch Engine", test_fetch_engine),
+        ("Async Monitor", test_async_monitor),
+        ("Rate Limiter", test_rate_limiter),
+        ("Candle Cache", test_candle_cache),
+        ("Candle Store", test_candle_store),
+        ("Weekly/Monthly Resampling", test_resample),
+        ("Batched RSI", test_rsi_batch),
+        ("Streaming RSI State", test_rsi_state),
+        ("Streaming RSI Sliding Window", test_rsi_sliding_window),
+        ("Vectorized Support/Resistance", test_sr_vectorized),
+        ("Support/Resistance Index", test_level_index),
+        ("Candle-Close Scheduler", test_scheduler),
+        ("Ticker Screening", test_ticker_screen),
+        ("Sharded Monitor", test_sharded_monitor),
+        ("Array-Backed Candles", test_candles),
+        ("Markets Cache", test_markets_cache),
+        ("Symbol Universe Diff", test_universe_diff),
+        ("Vectorized Symbol Discovery", test_discovery_filter),
+        ("Streaming Monitor", test_streaming_monitor),
+        ("Alert Store", test_alert_store),
+        ("Notification Dispatcher", test_notification_dispatcher),
+        ("Logging Pipeline", test_logging_pipeline),
+        ("Metrics", test_metrics),
+        ("Backtest Replay", test_backtest_replay),
+        ("Backtest Sweep", test_backtest_sweep),
+        ("Startup Time", test_startup_time),
         ("Desktop Notifications", test_notifications)
     ]
     
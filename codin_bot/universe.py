@@ -0,0 +1,40 @@
+"""
+Symbol universe diffing
+Rediscovery returns a new ranked watch list; comparing it with the old one
+tells which symbols need a warm-up, which can release their state and
+which only changed rank
+"""
+
+
+class SymbolDiff:
+    __slots__ = ('added', 'removed', 'moved', 'kept')
+    
+    def __init__(self, added, removed, moved, kept):
+        # New symbols, in their new rank order
+        self.added = added
+        # Dropped symbols, in their old rank order
+        self.removed = removed
+        # {symbol: (old_rank, new_rank)} for surviving symbols whose rank changed
+        self.moved = moved
+        # Number of symbols in both lists
+        self.kept = kept
+    
+    def __bool__(self):
+        return bool(self.added or self.removed or self.moved)
+    
+    def summary(self):
+        """One-line description for the log"""
+        return (f"{len(self.added)} added, {len(self.removed)} removed, "
+                f"{len(self.moved)} re-ranked, {self.kept} kept")
+
+
+def diff_symbols(old, new):
+    """Compare two ranked symbol lists (rank = position, highest volume first)"""
+    old_ranks = {symbol: rank for rank, symbol in enumerate(old)}
+    new_ranks = {symbol: rank for rank, symbol in enumerate(new)}
+    
+    added = [symbol for symbol in new if symbol not in old_ranks]
+    removed = [symbol for symbol in old if symbol not in new_ranks]
+    moved = {symbol: (old_ranks[symbol], rank) for symbol, rank in new_ranks.items()
+             if symbol in old_ranks and old_ranks[symbol] != rank}
+    return SymbolDiff(added, removed, moved, len(new_ranks) - len(added))